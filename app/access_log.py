@@ -0,0 +1,155 @@
+#access_log.py
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+access_logger = logging.getLogger("app.access")
+sql_logger = logging.getLogger("app.sql")
+
+# Datos de la petición en curso; el dict es mutable para que dependencias y
+# hilos del threadpool (que copian el contexto) escriban en el mismo objeto
+_request_ctx: ContextVar[Optional[dict]] = ContextVar("request_ctx", default=None)
+
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+_listener: Optional[QueueListener] = None
+dropped_records = 0
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro; los campos van en record.fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "logger": record.name,
+        }
+        data.update(getattr(record, "fields", None) or {"message": record.getMessage()})
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler que descarta registros si la cola está llena en vez de bloquear"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # El formateo se hace en el hilo escritor, no en el de la petición
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        global dropped_records
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_records += 1
+
+
+def configure_logging(handler: Optional[logging.Handler] = None):
+    """Arranca el escritor en segundo plano (idempotente)"""
+    global _listener
+    if _listener is not None:
+        return
+    if handler is None:
+        handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    for logger in (access_logger, sql_logger):
+        logger.handlers = [DroppingQueueHandler(_log_queue)]
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    _listener = QueueListener(_log_queue, handler, respect_handler_level=False)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Vacía la cola y detiene el escritor"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def set_request_user(user_id: Optional[int]):
+    """Asocia el usuario autenticado a la petición en curso"""
+    ctx = _request_ctx.get()
+    if ctx is not None:
+        ctx["user_id"] = user_id
+
+
+def _sampled(rate: float) -> bool:
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    ctx = _request_ctx.get()
+    if ctx is not None:
+        ctx["db_seconds"] += elapsed
+    if _sampled(settings.SQL_LOG_SAMPLE_RATE):
+        sql_logger.info("sql", extra={"fields": {
+            "statement": statement,
+            "executemany": executemany,
+            "duration_ms": round(elapsed * 1000, 3),
+        }})
+
+
+class AccessLogMiddleware:
+    """
+    Middleware ASGI puro que registra una línea por petición HTTP.
+
+    Guarda método, ruta, estado, latencia, usuario y tiempo en base de datos.
+    Las peticiones se muestrean con ACCESS_LOG_SAMPLE_RATE salvo los errores
+    5xx, que se registran siempre.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        ctx = {"user_id": None, "db_seconds": 0.0}
+        token = _request_ctx.set(ctx)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_ctx.reset(token)
+            if status_code >= 500 or _sampled(settings.ACCESS_LOG_SAMPLE_RATE):
+                access_logger.info("request", extra={"fields": {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+                    "user_id": ctx["user_id"],
+                    "db_ms": round(ctx["db_seconds"] * 1000, 3),
+                }})
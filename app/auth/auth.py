@@ -1,14 +1,22 @@
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import models, schemas
+from ..access_log import set_request_user
+from ..cache import TTLCache
 from ..config import settings
 from ..db import get_db
+from ..etag import etags_enabled
+from ..metrics import JWT_CLAIMS_CACHE, JWT_DECODE_SECONDS
+from .token_versions import token_versions
 
 # Configuración de seguridad
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -16,6 +24,18 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 # Reutiliza el contexto de hash definido en models
 pwd_context = models.pwd_context
 
+# Caché del usuario autenticado, por (user_id, name_user)
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL
+)
+
+# Claims verificados por digest del token; cada entrada caduca en el `exp` del token
+claims_cache = TTLCache(
+    maxsize=settings.CLAIMS_CACHE_SIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica si una contraseña coincide con su hash"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -40,9 +60,93 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
+async def load_principal(db: AsyncSession, username: str, user_id: int) -> Optional[models.User]:
+    """
+    Busca el usuario del token, usando la caché de principales si es posible.
+
+    En un acierto se devuelve una copia nueva, desligada de toda sesión, para
+    que ninguna petición comparta ni modifique la instancia cacheada. Con
+    varios workers no se usa: invalidate_principal sólo llega al proceso que
+    atendió la escritura y los demás aceptarían al usuario viejo hasta el TTL.
+    """
+    cacheable = etags_enabled()
+    key = (user_id, username)
+    cached = principal_cache.get(key) if cacheable else None
+    if cached is not None:
+        return models.User(**cached)
+
+    user = (await db.exec(
+        select(models.User).where(
+            (models.User.name_user == username) &
+            (models.User.user_id == user_id)
+    ))).first()
+
+    if user is not None and cacheable:
+        principal_cache.set(key, user.model_dump())
+    return user
+
+def invalidate_principal(user_id: int):
+    """Descarta de la caché las entradas de un usuario (tras modificarlo o eliminarlo)"""
+    principal_cache.invalidate_where(lambda key: key[0] == user_id)
+
+def decode_token(token: str) -> Optional[dict]:
+    """
+    Payload del token si la firma es válida y trae sub y user_id; None en otro caso.
+
+    Los tokens ya verificados se sirven desde claims_cache sin volver a
+    comprobar la firma. La entrada caduca cuando el token expira, así que
+    nunca se acepta un token vencido. Los tokens inválidos no se cachean.
+    El payload devuelto se comparte entre peticiones: no debe modificarse.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    payload = claims_cache.get(key)
+    if payload is not None:
+        JWT_CLAIMS_CACHE.inc("hit")
+        return payload
+    JWT_CLAIMS_CACHE.inc("miss")
+
+    try:
+        with JWT_DECODE_SECONDS.time():
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("sub") is None or payload.get("user_id") is None:
+        return None
+
+    exp = payload.get("exp")
+    expires_at = None if exp is None else time.monotonic() + (exp - time.time())
+    claims_cache.set(key, payload, expires_at)
+    return payload
+
+async def _principal_from_claims(db: AsyncSession, payload: dict) -> Optional[models.User]:
+    """
+    Usuario autenticado a partir de un payload ya verificado.
+
+    Con AUTH_STATELESS se confía en sub, role y user_id firmados y sólo se
+    compara `ver` con el mapa de token_version en memoria: no hay consulta.
+    El usuario devuelto sólo tiene user_id, name_user, role y token_version.
+    En otro caso se carga el usuario (caché o base de datos). En ambos modos
+    un token emitido antes del último cambio de versión se rechaza.
+    """
+    username, user_id = payload["sub"], payload["user_id"]
+    version = payload.get("ver", 0)
+    if settings.AUTH_STATELESS:
+        try:
+            role = models.Role(payload.get("role"))
+        except ValueError:
+            return None
+        if await token_versions.current(user_id) != version:
+            return None
+        return models.User(user_id=user_id, name_user=username, role=role, token_version=version)
+
+    user = await load_principal(db, username, user_id)
+    if user is None or user.token_version != version:
+        return None
+    return user
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> models.User:
     """
     Obtiene el usuario actual basado en el token JWT
@@ -63,25 +167,38 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        user_id: int = payload.get("user_id")
-        if username is None or user_id is None:
-            raise credentials_exception
-    except JWTError:
+    payload = decode_token(token)
+    if payload is None:
         raise credentials_exception
 
-    # Buscar usuario en la base de datos
-    user = db.exec(
-        select(models.User).where(
-            (models.User.name_user == username) & 
-            (models.User.user_id == user_id)
-    )).first()
+    # Usuario desde los claims (modo sin estado), la caché o la base de datos
+    user = await _principal_from_claims(db, payload)
     
     if user is None:
         raise credentials_exception
-        
+
+    set_request_user(user.user_id)
+    return user
+
+async def get_current_user_record(
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> models.User:
+    """
+    Usuario actual con todos sus campos.
+
+    En modo sin estado get_current_user sólo trae los claims del token; las
+    rutas que devuelven el perfil completo usan esta dependencia.
+    """
+    if not settings.AUTH_STATELESS:
+        return current_user
+    user = await load_principal(db, current_user.name_user, current_user.user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No se pudieron validar las credenciales",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 async def get_current_active_user(
@@ -142,27 +259,36 @@ async def get_current_professor_user(
         )
     return current_user
 
+async def get_current_staff_user(
+    current_user: models.User = Depends(get_current_user)
+) -> models.User:
+    """
+    Verifica que el usuario actual sea profesor o administrador
+    
+    Args:
+        current_user: Usuario obtenido del token
+        
+    Returns:
+        Modelo de usuario profesor o administrador
+        
+    Raises:
+        HTTPException: Si el usuario es estudiante
+    """
+    if current_user.role not in (models.Role.PROFESSOR, models.Role.ADMIN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Se requieren permisos de profesor o administrador"
+        )
+    return current_user
+
 
 async def get_optional_user(
     token: Optional[str] = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Optional[models.User]:
     if token is None:
         return None
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        user_id: int = payload.get("user_id")
-        if username is None or user_id is None:
-            return None
-    except JWTError:
+    payload = decode_token(token)
+    if payload is None:
         return None
-
-    user = db.exec(
-        select(models.User).where(
-            (models.User.name_user == username) &
-            (models.User.user_id == user_id)
-        )
-    ).first()
-
-    return user
+    return await _principal_from_claims(db, payload)
@@ -0,0 +1,169 @@
+#hashing.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from app import models
+from ..config import settings
+from ..metrics import BCRYPT_SECONDS
+
+
+class HasherBusy(Exception):
+    """Se alcanzó HASH_MAX_PENDING_VERIFY: la verificación se rechaza sin encolarla"""
+
+
+class PasswordHasher:
+    """
+    Servicio de hasheo de contraseñas sobre un pool de hilos acotado.
+
+    bcrypt libera el GIL mientras calcula, así que un ThreadPoolExecutor basta
+    para sacar el trabajo del event loop sin bloquear las demás peticiones.
+    """
+
+    def __init__(self, max_workers: int, max_pending_verify: int = 0):
+        self.max_workers = max(1, max_workers)
+        self.max_pending_verify = max_pending_verify
+        self._verify_pendientes = 0
+        self._verify_rechazadas = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pendientes = 0   # enviadas al pool y aún sin terminar
+        self._en_curso = 0     # ejecutándose en un hilo del pool
+        self._stats = {
+            "hash": {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0},
+            "verify": {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0},
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="hasher"
+                    )
+        return self._executor
+
+    def _run(self, operacion: str, func: Callable, *args):
+        with self._lock:
+            self._en_curso += 1
+        inicio = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            duracion = time.perf_counter() - inicio
+            BCRYPT_SECONDS.observe(duracion, operacion)
+            with self._lock:
+                self._en_curso -= 1
+                stats = self._stats[operacion]
+                stats["count"] += 1
+                stats["total_seconds"] += duracion
+                stats["max_seconds"] = max(stats["max_seconds"], duracion)
+
+    async def _submit(self, operacion: str, func: Callable, *args):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._pendientes += 1
+        try:
+            return await loop.run_in_executor(
+                self._get_executor(), self._run, operacion, func, *args
+            )
+        finally:
+            with self._lock:
+                self._pendientes -= 1
+
+    async def hash(self, password: str) -> str:
+        """Genera el hash de una contraseña fuera del event loop"""
+        return await self._submit("hash", models.pwd_context.hash, password)
+
+    async def _verify_limited(self, func: Callable, *args):
+        """
+        Ejecuta una verificación respetando max_pending_verify.
+
+        Lanza HasherBusy si ya hay ese número de verificaciones en cola o en
+        curso, para que una ráfaga de logins no acumule una cola sin fin.
+        """
+        with self._lock:
+            if self.max_pending_verify and self._verify_pendientes >= self.max_pending_verify:
+                self._verify_rechazadas += 1
+                raise HasherBusy()
+            self._verify_pendientes += 1
+        try:
+            return await self._submit("verify", func, *args)
+        finally:
+            with self._lock:
+                self._verify_pendientes -= 1
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Verifica una contraseña contra su hash fuera del event loop"""
+        return await self._verify_limited(models.pwd_context.verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """
+        Verifica y, si el hash usa otro coste o un esquema obsoleto, devuelve
+        también uno nuevo con la configuración actual (None si no hace falta).
+        """
+        return await self._verify_limited(models.pwd_context.verify_and_update, password, hashed_password)
+
+    def stats(self) -> dict:
+        """Profundidad de la cola y latencias acumuladas del pool"""
+        with self._lock:
+            resultado = {
+                "workers": self.max_workers,
+                "in_progress": self._en_curso,
+                "queue_depth": max(0, self._pendientes - self._en_curso),
+                "max_pending_verify": self.max_pending_verify,
+                "verify_rejected": self._verify_rechazadas,
+            }
+            for operacion, stats in self._stats.items():
+                count = stats["count"]
+                resultado[operacion] = {
+                    "count": count,
+                    "avg_ms": round(stats["total_seconds"] / count * 1000, 2) if count else 0.0,
+                    "max_ms": round(stats["max_seconds"] * 1000, 2),
+                }
+        return resultado
+
+    def shutdown(self):
+        """Detiene el pool; se vuelve a crear en el siguiente uso"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def calibrate_rounds(budget_ms: float, measure: Callable[[int], float], min_rounds: int = 10,
+                     max_rounds: int = 16) -> tuple[int, dict[int, float]]:
+    """
+    Mayor coste bcrypt cuyo hash tarda como mucho `budget_ms` según `measure`.
+
+    Cada ronda duplica el tiempo, así que se mide de menor a mayor y se para
+    en cuanto se supera el presupuesto. Si ni min_rounds cabe, se devuelve
+    min_rounds igualmente. Devuelve también los tiempos medidos (ms).
+    """
+    elegido = min_rounds
+    tiempos: dict[int, float] = {}
+    for rounds in range(min_rounds, max_rounds + 1):
+        tiempos[rounds] = measure(rounds) * 1000
+        if tiempos[rounds] > budget_ms:
+            break
+        elegido = rounds
+    return elegido, tiempos
+
+
+def measure_bcrypt(rounds: int, samples: int = 3) -> float:
+    """Mediana de segundos por hash bcrypt con `rounds` en este host"""
+    contexto = models.pwd_context.copy(
+        bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds
+    )
+    duraciones = []
+    for _ in range(samples):
+        inicio = time.perf_counter()
+        contexto.hash("calibracion")
+        duraciones.append(time.perf_counter() - inicio)
+    return sorted(duraciones)[len(duraciones) // 2]
+
+
+hasher = PasswordHasher(settings.HASH_WORKERS, settings.HASH_MAX_PENDING_VERIFY)
@@ -2,13 +2,15 @@
 
 from fastapi import Depends, HTTPException, Request
 from typing import Optional,  Callable, List
-from app.auth.auth import get_current_user
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.auth.auth import get_optional_user
+from app.db import get_db
 from app.models import Role, User
 from fastapi.security.utils import get_authorization_scheme_param
 
 
 def require_role_or_none(allowed_roles: List[Role]) -> Callable[[Request], Optional[User]]:
-    async def dependency(request: Request) -> Optional[User]:
+    async def dependency(request: Request, db: AsyncSession = Depends(get_db)) -> Optional[User]:
         auth = request.headers.get("Authorization")
         if not auth:
             return None  # No token → permitir como anónimo
@@ -17,9 +19,9 @@ def require_role_or_none(allowed_roles: List[Role]) -> Callable[[Request], Optio
         if not token:
             return None
 
-        try:
-            user = await get_current_user(token)
-        except Exception:
+        # Token inválido o revocado → anónimo
+        user = await get_optional_user(token, db)
+        if user is None:
             return None
 
         if user.role not in allowed_roles:
@@ -30,4 +32,4 @@ def require_role_or_none(allowed_roles: List[Role]) -> Callable[[Request], Optio
 
         return user
 
-    return Depends(dependency)
\ No newline at end of file
+    return Depends(dependency)
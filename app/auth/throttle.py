@@ -0,0 +1,122 @@
+#throttle.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Protocol
+
+from ..config import settings
+from ..metrics import LOGIN_REJECTED
+
+
+class BucketStore(Protocol):
+    """Almacén de token buckets; otra implementación (p. ej. Redis) puede compartirlos entre procesos"""
+
+    def take(self, key: str, capacity: float, refill_per_second: float) -> float:
+        """Consume un token de `key`; devuelve 0 si había, o los segundos hasta el siguiente"""
+        ...
+
+    def clear(self):
+        ...
+
+
+class MemoryBucketStore:
+    """
+    Token buckets en memoria del proceso, acotados a `max_keys` claves.
+
+    Al superar el límite se descarta el bucket menos usado, así que una
+    ráfaga de usuarios inventados no puede agotar la memoria (a lo sumo
+    devuelve a alguien su cupo completo).
+    """
+
+    def __init__(self, max_keys: int, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, refill_per_second: float) -> float:
+        now = self._clock()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+            if tokens >= 1:
+                tokens -= 1
+                espera = 0.0
+            else:
+                espera = (1 - tokens) / refill_per_second
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return espera
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class LoginThrottle:
+    """Límites de intentos de login por IP y por nombre de usuario"""
+
+    def __init__(self, store: BucketStore, user_burst: int, user_per_minute: float,
+                 ip_burst: int, ip_per_minute: float, enabled: bool = True):
+        self.store = store
+        self.user_burst = user_burst
+        self.user_rate = user_per_minute / 60
+        self.ip_burst = ip_burst
+        self.ip_rate = ip_per_minute / 60
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.rejected = {"ip": 0, "user": 0}
+
+    def check(self, username: str, client_ip: Optional[str]) -> Optional[float]:
+        """
+        Consume un intento; devuelve None si se permite o los segundos de espera.
+
+        Se comprueba primero la IP para que una IP bloqueada no gaste el cupo
+        del usuario que está atacando.
+        """
+        if not self.enabled:
+            return None
+        if client_ip:
+            espera = self.store.take(f"ip:{client_ip}", self.ip_burst, self.ip_rate)
+            if espera:
+                return self._rechazo("ip", espera)
+        espera = self.store.take(f"user:{username.strip().lower()}", self.user_burst, self.user_rate)
+        if espera:
+            return self._rechazo("user", espera)
+        return None
+
+    def _rechazo(self, motivo: str, espera: float) -> float:
+        LOGIN_REJECTED.inc(motivo)
+        with self._lock:
+            self.rejected[motivo] += 1
+        return espera
+
+    def clear(self):
+        self.store.clear()
+        with self._lock:
+            self.rejected = {"ip": 0, "user": 0}
+
+    def stats(self) -> dict:
+        with self._lock:
+            rechazados = dict(self.rejected)
+        return {
+            "enabled": self.enabled,
+            "user": {"burst": self.user_burst, "per_minute": self.user_rate * 60},
+            "ip": {"burst": self.ip_burst, "per_minute": self.ip_rate * 60},
+            "rejected": rechazados,
+        }
+
+
+login_throttle = LoginThrottle(
+    MemoryBucketStore(settings.LOGIN_THROTTLE_MAX_KEYS),
+    user_burst=settings.LOGIN_RATE_USER_BURST,
+    user_per_minute=settings.LOGIN_RATE_USER_PER_MINUTE,
+    ip_burst=settings.LOGIN_RATE_IP_BURST,
+    ip_per_minute=settings.LOGIN_RATE_IP_PER_MINUTE,
+    enabled=settings.LOGIN_THROTTLE_ENABLED,
+)
@@ -0,0 +1,116 @@
+#token_versions.py
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from app import models
+from ..config import settings
+from ..db import engine, engine_context
+
+# Versión de un usuario eliminado: ningún token coincide con ella
+REVOKED = -1
+
+
+class TokenVersions:
+    """
+    Mapa en memoria user_id -> token_version para la autorización sin estado.
+
+    Se recarga entero desde el primario cada `refresh_seconds`, en la primera
+    petición que lo encuentre caducado. Los cambios hechos en este proceso se
+    aplican al momento; los de otros procesos llegan con la siguiente recarga.
+    Un usuario que no está en el mapa (creado después de la última recarga o
+    ya eliminado) se consulta una vez y queda registrado.
+    """
+
+    def __init__(self, refresh_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.refresh_seconds = refresh_seconds
+        self._clock = clock
+        self._versions: dict[int, int] = {}
+        self._loaded_at: Optional[float] = None
+        # Cambios locales hechos mientras se recarga; se reaplican sobre el mapa nuevo
+        self._during_refresh: Optional[dict[int, int]] = None
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.lookups = 0
+
+    @staticmethod
+    def _engine():
+        bind = engine_context.get() or engine
+        return getattr(bind, "sync_engine", bind)
+
+    def _load_all(self) -> dict[int, int]:
+        with self._engine().connect() as conn:
+            return dict(conn.execute(select(models.User.user_id, models.User.token_version)).all())
+
+    def _load_one(self, user_id: int) -> int:
+        with self._engine().connect() as conn:
+            version = conn.execute(
+                select(models.User.token_version).where(models.User.user_id == user_id)
+            ).scalar()
+        return REVOKED if version is None else version
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or self._clock() - self._loaded_at >= self.refresh_seconds
+
+    def refresh_sync(self):
+        with self._lock:
+            if self._during_refresh is not None:
+                return  # otra petición ya está recargando
+            self._during_refresh = {}
+        try:
+            cargadas = self._load_all()
+        except BaseException:
+            with self._lock:
+                self._during_refresh = None
+            raise
+        with self._lock:
+            cargadas.update(self._during_refresh)
+            self._versions = cargadas
+            self._during_refresh = None
+            self._loaded_at = self._clock()
+            self.refreshes += 1
+
+    async def current(self, user_id: int) -> int:
+        """Versión vigente del usuario (REVOKED si no existe)"""
+        if self._stale():
+            await run_in_threadpool(self.refresh_sync)
+        version = self._versions.get(user_id)
+        if version is None:
+            version = await run_in_threadpool(self._load_one, user_id)
+            with self._lock:
+                self.lookups += 1
+                version = self._versions.setdefault(user_id, version)
+        return version
+
+    def set(self, user_id: int, version: int):
+        """Registra la versión tras el commit que la cambió"""
+        with self._lock:
+            self._versions[user_id] = version
+            if self._during_refresh is not None:
+                self._during_refresh[user_id] = version
+
+    def revoke(self, user_id: int):
+        self.set(user_id, REVOKED)
+
+    def clear(self):
+        with self._lock:
+            self._versions = {}
+            self._loaded_at = None
+            self.refreshes = 0
+            self.lookups = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._versions),
+                "refresh_seconds": self.refresh_seconds,
+                "age_seconds": None if self._loaded_at is None else round(self._clock() - self._loaded_at, 1),
+                "refreshes": self.refreshes,
+                "lookups": self.lookups,
+            }
+
+
+token_versions = TokenVersions(settings.TOKEN_VERSION_REFRESH_SECONDS)
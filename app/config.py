@@ -1,25 +1,153 @@
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 import os
+from typing import Annotated, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Perfiles del engine: default (el pool de siempre: 10 + 20, espera de 30 s),
+# dev (pocas conexiones), prod (pool con tiempo de espera corto para fallar
+# rápido) y bench (pool fijo y grande, sin pre-ping)
+ENGINE_PROFILES = {
+    "default": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30, "pool_recycle": 280, "pool_pre_ping": True},
+    "dev": {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30, "pool_recycle": 280, "pool_pre_ping": True},
+    "prod": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 10, "pool_recycle": 280, "pool_pre_ping": True},
+    "bench": {"pool_size": 50, "max_overflow": 0, "pool_timeout": 30, "pool_recycle": -1, "pool_pre_ping": False},
+}
+
+
+def _optional_int(name: str):
+    value = os.getenv(name, "")
+    return int(value) if value else None
+
 class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "")
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+
+    # Modo de base de datos async (AsyncSession sobre aiosqlite/aiomysql/asyncpg)
+    DB_ASYNC: bool = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")  # por defecto se deriva de DATABASE_URL
+    # Réplicas de lectura (URLs separadas por comas); vacío = todo al primario
+    DATABASE_REPLICA_URLS: Annotated[list[str], NoDecode] = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_RETRY_SECONDS: float = float(os.getenv("REPLICA_RETRY_SECONDS", "5"))
+    # Aplicar migraciones pendientes al arrancar (sólo desarrollo; en producción usar migrate.py)
+    DB_AUTO_MIGRATE: bool = os.getenv("DB_AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+    DB_ECHO: bool = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+
+    # Perfil del pool de conexiones (default/dev/prod/bench); cada valor se puede sobreescribir
+    DB_PROFILE: str = os.getenv("DB_PROFILE", "default")
+    DB_POOL_SIZE: Optional[int] = _optional_int("DB_POOL_SIZE")
+    DB_MAX_OVERFLOW: Optional[int] = _optional_int("DB_MAX_OVERFLOW")
+    DB_POOL_TIMEOUT: Optional[int] = _optional_int("DB_POOL_TIMEOUT")
+    DB_POOL_RECYCLE: Optional[int] = _optional_int("DB_POOL_RECYCLE")
+
+    # Log de accesos estructurado (JSON) escrito por un hilo en segundo plano
+    ACCESS_LOG_ENABLED: bool = os.getenv("ACCESS_LOG_ENABLED", "true").lower() in ("1", "true", "yes")
+    ACCESS_LOG_SAMPLE_RATE: float = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1.0"))
+    SQL_LOG_SAMPLE_RATE: float = float(os.getenv("SQL_LOG_SAMPLE_RATE", "0.0"))
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+    # Métricas en formato Prometheus expuestas en /metrics
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # Pool de hilos dedicado al hasheo de contraseñas (bcrypt)
+    HASH_WORKERS: int = int(os.getenv("HASH_WORKERS", "4"))
+    # Coste bcrypt; calibrar en cada host con `python calibrate_hash.py`
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_BUDGET_MS: float = float(os.getenv("PASSWORD_HASH_BUDGET_MS", "250"))
+    # Verificaciones bcrypt en cola o en curso admitidas a la vez (0 = sin límite)
+    HASH_MAX_PENDING_VERIFY: int = int(os.getenv("HASH_MAX_PENDING_VERIFY", "32"))
+
+    # Token buckets de /token por IP y por nombre de usuario
+    LOGIN_THROTTLE_ENABLED: bool = os.getenv("LOGIN_THROTTLE_ENABLED", "true").lower() in ("1", "true", "yes")
+    LOGIN_RATE_USER_BURST: int = int(os.getenv("LOGIN_RATE_USER_BURST", "5"))
+    LOGIN_RATE_USER_PER_MINUTE: float = float(os.getenv("LOGIN_RATE_USER_PER_MINUTE", "5"))
+    LOGIN_RATE_IP_BURST: int = int(os.getenv("LOGIN_RATE_IP_BURST", "20"))
+    LOGIN_RATE_IP_PER_MINUTE: float = float(os.getenv("LOGIN_RATE_IP_PER_MINUTE", "60"))
+    LOGIN_THROTTLE_MAX_KEYS: int = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "100000"))
+
+    # Caché en memoria del usuario autenticado (0 desactiva; sólo con un worker)
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+    PRINCIPAL_CACHE_TTL: float = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
+    # Autorización sin consultar al usuario: basta la firma del JWT y su token_version
+    AUTH_STATELESS: bool = os.getenv("AUTH_STATELESS", "false").lower() in ("1", "true", "yes")
+    TOKEN_VERSION_REFRESH_SECONDS: float = float(os.getenv("TOKEN_VERSION_REFRESH_SECONDS", "30"))
+
+    # Caché de claims JWT ya verificados, por digest del token (0 desactiva)
+    CLAIMS_CACHE_SIZE: int = int(os.getenv("CLAIMS_CACHE_SIZE", "4096"))
+
+    # ETags de los listados; los contadores de versión son por proceso, así que
+    # con más de un worker (WEB_CONCURRENCY, que también leen uvicorn y gunicorn) no se emiten
+    ETAGS_ENABLED: bool = os.getenv("ETAGS_ENABLED", "true").lower() in ("1", "true", "yes")
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+    # Paginación por cursor de los listados
+    PAGE_SIZE_DEFAULT: int = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+    PAGE_SIZE_MAX: int = int(os.getenv("PAGE_SIZE_MAX", "500"))
+
+    # Caché de /materias/{score_id}/estadisticas (se invalida con cada escritura de calificaciones)
+    ESTADISTICAS_CACHE_SIZE: int = int(os.getenv("ESTADISTICAS_CACHE_SIZE", "256"))
+    ESTADISTICAS_CACHE_TTL: float = float(os.getenv("ESTADISTICAS_CACHE_TTL", "300"))
+
+    # Rankings por materia mantenidos en memoria (se reconstruyen desde la base tras el TTL)
+    LEADERBOARD_CACHE_SIZE: int = int(os.getenv("LEADERBOARD_CACHE_SIZE", "256"))
+    LEADERBOARD_TTL: float = float(os.getenv("LEADERBOARD_TTL", "300"))
+
+    # Filas leídas por lote del cursor del servidor en las exportaciones
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+    # Máximo de elementos aceptados por las operaciones en lote
+    BULK_MAX_ITEMS: int = int(os.getenv("BULK_MAX_ITEMS", "5000"))
     
     model_config = SettingsConfigDict(
         case_sensitive=True,
-        env_file=".env"
+        env_file=".env",
+        env_ignore_empty=True
     )
 
+    @field_validator("DATABASE_REPLICA_URLS", mode="before")
+    @classmethod
+    def _split_urls(cls, value):
+        if isinstance(value, str):
+            return [url.strip() for url in value.split(",") if url.strip()]
+        return value
+
     def __init__(self, **values):
         super().__init__(**values)
         if not self.SECRET_KEY:
             raise ValueError("SECRET_KEY no configurada en .env")
         if not self.DATABASE_URL.startswith(("postgresql://", "mysql://", "sqlite://", "mysql+pymysql://")):
             raise ValueError("DATABASE_URL debe comenzar con 'postgresql://', 'mysql://' o 'sqlite://'")
+        for url in self.DATABASE_REPLICA_URLS:
+            if not url.startswith(("postgresql://", "mysql://", "sqlite://", "mysql+pymysql://")):
+                raise ValueError(f"URL de réplica no soportada: {url}")
+        if self.DB_PROFILE not in ENGINE_PROFILES:
+            raise ValueError(f"DB_PROFILE debe ser uno de: {', '.join(ENGINE_PROFILES)}")
+        if not 4 <= self.BCRYPT_ROUNDS <= 31:
+            raise ValueError("BCRYPT_ROUNDS debe estar entre 4 y 31")
+        # Un ritmo de 0 no bloquea: dividiría por cero al calcular la espera
+        # (para desactivar el límite está LOGIN_THROTTLE_ENABLED=false)
+        for nombre in ("LOGIN_RATE_USER_PER_MINUTE", "LOGIN_RATE_IP_PER_MINUTE"):
+            if getattr(self, nombre) <= 0:
+                raise ValueError(f"{nombre} debe ser mayor que 0")
+        for nombre in ("LOGIN_RATE_USER_BURST", "LOGIN_RATE_IP_BURST"):
+            if getattr(self, nombre) < 1:
+                raise ValueError(f"{nombre} debe ser al menos 1")
+
+    def engine_options(self) -> dict:
+        """Opciones del pool según DB_PROFILE y las variables DB_POOL_* definidas"""
+        options = dict(ENGINE_PROFILES[self.DB_PROFILE])
+        overrides = {
+            "pool_size": self.DB_POOL_SIZE,
+            "max_overflow": self.DB_MAX_OVERFLOW,
+            "pool_timeout": self.DB_POOL_TIMEOUT,
+            "pool_recycle": self.DB_POOL_RECYCLE,
+        }
+        options.update({k: v for k, v in overrides.items() if v is not None})
+        return options
 
 settings = Settings()
\ No newline at end of file
@@ -1,38 +1,353 @@
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.orm import Session as _SASession
 from sqlmodel import Session, create_engine, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+from starlette.concurrency import run_in_threadpool
 from .config import settings
+from .metrics import registry
+from .pool_telemetry import pool_telemetry
 from app import models
 from contextvars import ContextVar
 
+logger = logging.getLogger(__name__)
+
+
+class _TimedCheckout:
+    """Mide cuánto espera cada checkout del pool por una conexión"""
+
+    metrics_label = "primary"
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_telemetry(self.metrics_label).record_wait(time.perf_counter() - inicio)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite+aiosqlite:"))
+
+
+def engine_kwargs(url: str, poolclass=TimedQueuePool) -> dict:
+    """Argumentos de create_engine según el perfil (DB_PROFILE) y el tipo de base"""
+    kwargs = {"echo": settings.DB_ECHO, **settings.engine_options()}
+    if url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if _is_memory_sqlite(url):
+        # SQLite en memoria necesita su pool propio (una conexión por hilo)
+        for key in ("pool_size", "max_overflow", "pool_timeout"):
+            kwargs.pop(key)
+    else:
+        kwargs["poolclass"] = poolclass
+    return kwargs
+
+
 # Engine principal
 db_url = settings.DATABASE_URL
-engine = create_engine(
-    db_url,
-    echo=True,
-    pool_pre_ping=True,
-    pool_recycle=280,  # importante si tu servidor cierra conexiones inactivas (~5min)
-    pool_size=10,
-    max_overflow=20,
-    connect_args={"check_same_thread": False} if "sqlite" in db_url else {}
-)
+engine = create_engine(db_url, **engine_kwargs(db_url))
+pool_telemetry("primary").attach(engine)
 
 # Engine de prueba (override)
 engine_context: ContextVar[object] = ContextVar("engine_context", default=None)
 
+# Drivers async equivalentes a los síncronos de DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite://": "sqlite+aiosqlite://",
+    "mysql+pymysql://": "mysql+aiomysql://",
+    "mysql://": "mysql+aiomysql://",
+    "postgresql://": "postgresql+asyncpg://",
+}
+
+_async_engine: Optional[AsyncEngine] = None
+
+PREBUFFER_OPTIONS = {"prebuffer_rows": True}
+
+
+def _to_async_url(url: str) -> str:
+    for prefix, async_prefix in ASYNC_DRIVERS.items():
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    raise ValueError(f"No hay driver async para {url}")
+
+
+def async_database_url(url: str) -> str:
+    """Deriva la URL async (aiosqlite / aiomysql / asyncpg) a partir de la síncrona"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    return _to_async_url(url)
+
+
+def get_async_engine() -> AsyncEngine:
+    """Engine async, creado al primer uso para no exigir el driver en modo síncrono"""
+    global _async_engine
+    if _async_engine is None:
+        url = async_database_url(db_url)
+        kwargs = engine_kwargs(url, poolclass=TimedAsyncQueuePool)
+        kwargs.pop("connect_args", None)
+        _async_engine = create_async_engine(url, **kwargs)
+        pool_telemetry("async").attach(_async_engine.sync_engine)
+    return _async_engine
+
+
+async def dispose_async_engine():
+    """Cierra las conexiones del engine async (al apagar la app)"""
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+    await replicas.dispose_async()
+
+
+class Replica:
+    """Engine (síncrono y, bajo demanda, async) de una réplica de lectura"""
+
+    def __init__(self, url: str, label: str):
+        self.url = url
+        self.label = label
+        poolclass = type("TimedQueuePool", (TimedQueuePool,), {"metrics_label": label})
+        self.engine = create_engine(url, **engine_kwargs(url, poolclass=poolclass))
+        pool_telemetry(label).attach(self.engine)
+        self._async_engine: Optional[AsyncEngine] = None
+        self.down_until = 0.0
+        self.failures = 0
+
+    def get_async_engine(self) -> AsyncEngine:
+        if self._async_engine is None:
+            url = _to_async_url(self.url)
+            poolclass = type("TimedAsyncQueuePool", (TimedAsyncQueuePool,), {"metrics_label": f"{self.label}-async"})
+            kwargs = engine_kwargs(url, poolclass=poolclass)
+            kwargs.pop("connect_args", None)
+            self._async_engine = create_async_engine(url, **kwargs)
+            pool_telemetry(f"{self.label}-async").attach(self._async_engine.sync_engine)
+        return self._async_engine
+
+
+class ReplicaRouter:
+    """
+    Reparte las sesiones de lectura entre réplicas en round-robin.
+
+    Una réplica que falla al conectar se marca caída durante
+    REPLICA_RETRY_SECONDS y se salta; pasado ese tiempo vuelve a probarse con
+    la siguiente petición. Sin réplicas sanas se lee del primario.
+    """
+
+    def __init__(self, urls: list[str], retry_seconds: float):
+        self.replicas = [Replica(url, f"replica-{i}") for i, url in enumerate(urls)]
+        self.retry_seconds = retry_seconds
+        self._counter = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def pick(self) -> Optional[Replica]:
+        if not self.replicas:
+            return None
+        inicio = next(self._counter)
+        ahora = time.monotonic()
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(inicio + i) % len(self.replicas)]
+            if replica.down_until <= ahora:
+                return replica
+        return None
+
+    def mark_down(self, replica: Replica, error: Exception):
+        replica.failures += 1
+        replica.down_until = time.monotonic() + self.retry_seconds
+        logger.warning("Réplica %s no disponible durante %ss: %s", replica.label, self.retry_seconds, error)
+
+    def mark_up(self, replica: Replica):
+        replica.down_until = 0.0
+
+    def stats(self) -> list[dict]:
+        ahora = time.monotonic()
+        return [
+            {
+                "label": r.label,
+                "url": r.engine.url.render_as_string(hide_password=True),
+                "healthy": r.down_until <= ahora,
+                "failures": r.failures,
+            }
+            for r in self.replicas
+        ]
+
+    async def dispose_async(self):
+        for replica in self.replicas:
+            if replica._async_engine is not None:
+                await replica._async_engine.dispose()
+                replica._async_engine = None
+
+
+replicas = ReplicaRouter(settings.DATABASE_REPLICA_URLS, settings.REPLICA_RETRY_SECONDS)
+
+
+def _pools():
+    yield "primary", engine.pool
+    if _async_engine is not None:
+        yield "async", _async_engine.pool
+    for replica in replicas.replicas:
+        yield replica.label, replica.engine.pool
+
+
+def _pool_gauge(medida):
+    def callback():
+        # Sólo los pools con cola (QueuePool) llevan la cuenta de conexiones
+        return [((label,), max(0, medida(pool))) for label, pool in _pools() if isinstance(pool, QueuePool)]
+    return callback
+
+
+registry.gauge("db_pool_size", "Tamaño configurado del pool", ("pool",), _pool_gauge(lambda p: p.size()))
+registry.gauge("db_pool_checked_out", "Conexiones prestadas en este momento", ("pool",), _pool_gauge(lambda p: p.checkedout()))
+registry.gauge("db_pool_overflow", "Conexiones abiertas por encima de pool_size", ("pool",), _pool_gauge(lambda p: p.overflow()))
+
+
+class ThreadedSession:
+    """
+    Session síncrona con la misma interfaz que AsyncSession.
+
+    Cada operación que toca la base de datos se ejecuta en el threadpool y los
+    resultados se devuelven ya leídos, de modo que las rutas `async def` pueden
+    usar el mismo código (`await session.exec(...)`) en ambos modos sin
+    bloquear el event loop.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    async def exec(self, statement, *, params=None, execution_options=None, bind_arguments=None):
+        # Igual que AsyncSession: las filas ORM se leen completas dentro del hilo
+        options = {**PREBUFFER_OPTIONS, **(execution_options or {})}
+        result = await run_in_threadpool(
+            _SASession.execute, self.sync_session, statement, params,
+            execution_options=options, bind_arguments=bind_arguments
+        )
+        if isinstance(statement, SelectOfScalar):
+            return result.scalars()
+        return result
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    def expire_all(self):
+        self.sync_session.expire_all()
+
+    def get_bind(self, *args, **kwargs):
+        return self.sync_session.get_bind(*args, **kwargs)
+
+    async def connection(self):
+        return await run_in_threadpool(self.sync_session.connection)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
 # Crear tablas (para uso directo si necesario)
 def create_db_and_tables():
     models.SQLModel.metadata.create_all(engine)
 
-# Sesión de base de datos
-def get_db():
-    engine_override = engine_context.get()
-    db = Session(engine_override or engine)
+def connect_for_read():
+    """Conexión síncrona de lectura (réplica sana o primario), p. ej. para exportaciones"""
+    override = engine_context.get()
+    replica = replicas.pick() if override is None else None
+    if replica is not None:
+        try:
+            conn = replica.engine.connect()
+        except DBAPIError as e:
+            replicas.mark_down(replica, e)
+        else:
+            replicas.mark_up(replica)
+            return conn
+    return (override or engine).connect()
+
+
+@asynccontextmanager
+async def open_session(bind=None):
+    """
+    Abre una sesión con interfaz AsyncSession sobre `bind`.
+
+    Sin `bind` se usa el override de engine_context o el primario. Con
+    DB_ASYNC=true (o un AsyncEngine) es una AsyncSession real sobre el engine
+    async; en otro caso, una ThreadedSession sobre el engine síncrono.
+    """
+    if bind is None:
+        bind = engine_context.get()
+    if isinstance(bind, AsyncEngine) or (bind is None and settings.DB_ASYNC):
+        async with AsyncSession(bind or get_async_engine(), expire_on_commit=False) as db:
+            yield db
+        return
+
+    db = ThreadedSession(Session(bind or engine, expire_on_commit=False))
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
 
 
+# Sesión de base de datos
+async def get_db():
+    """Sesión sobre el primario: escrituras, autenticación y lecturas que lo requieran"""
+    async with open_session() as db:
+        yield db
 
 
+async def get_read_db():
+    """
+    Sesión para rutas de sólo lectura.
 
+    Si hay réplicas configuradas (y no hay override en engine_context) se toma
+    una en round-robin y se comprueba que conecta antes de entregarla; si
+    falla, se marca caída y la petición lee del primario.
+    """
+    replica = replicas.pick() if engine_context.get() is None else None
+    if replica is not None:
+        bind = replica.get_async_engine() if settings.DB_ASYNC else replica.engine
+        async with open_session(bind) as db:
+            try:
+                await db.connection()
+            except DBAPIError as e:
+                replicas.mark_down(replica, e)
+            else:
+                replicas.mark_up(replica)
+                yield db
+                return
 
+    async with open_session() as db:
+        yield db
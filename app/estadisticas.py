@@ -0,0 +1,78 @@
+#estadisticas.py
+import heapq
+import math
+from bisect import bisect_left
+from typing import Optional, Sequence
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from . import models
+from .cache import TTLCache
+from .config import settings
+
+PERCENTILES = (10, 25, 50, 75, 90)
+HISTOGRAMA_ANCHO = 10  # tramos [0, 10), [10, 20), ..., [90, 100]
+_LIMITES = [float(x) for x in range(HISTOGRAMA_ANCHO, 100, HISTOGRAMA_ANCHO)]
+
+# Por (score_id, ETag): una escritura de calificaciones cambia el ETag y con él la clave
+estadisticas_cache = TTLCache(
+    maxsize=settings.ESTADISTICAS_CACHE_SIZE,
+    ttl=settings.ESTADISTICAS_CACHE_TTL
+)
+
+
+def percentil(ordenados: Sequence[float], p: float) -> float:
+    """Percentil con interpolación lineal entre rangos vecinos (como numpy.percentile)"""
+    posicion = (len(ordenados) - 1) * p / 100
+    inferior = math.floor(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+def histograma(ordenados: Sequence[float]) -> list[dict]:
+    """Cuenta por tramo con bisect sobre valores ya ordenados: O(tramos · log n)"""
+    cortes = [0] + [bisect_left(ordenados, limite) for limite in _LIMITES] + [len(ordenados)]
+    return [
+        {"desde": float(i * HISTOGRAMA_ANCHO), "hasta": float((i + 1) * HISTOGRAMA_ANCHO), "cantidad": fin - inicio}
+        for i, (inicio, fin) in enumerate(zip(cortes, cortes[1:]))
+    ]
+
+
+def _grupo(tipo: Optional[models.CalificacionTipo], ordenados: Sequence[float]) -> dict:
+    cantidad = len(ordenados)
+    promedio = math.fsum(ordenados) / cantidad
+    # Desviación poblacional; max() absorbe el error de redondeo cuando todas las notas son iguales
+    desviacion = math.sqrt(max(0.0, math.fsum(v * v for v in ordenados) / cantidad - promedio * promedio))
+    return {
+        "tipo": tipo,
+        "cantidad": cantidad,
+        "promedio": round(promedio, 2),
+        "mediana": round(percentil(ordenados, 50), 2),
+        "desviacion": round(desviacion, 2),
+        "minimo": ordenados[0],
+        "maximo": ordenados[-1],
+        "percentiles": {f"p{p}": round(percentil(ordenados, p), 2) for p in PERCENTILES},
+        "histograma": histograma(ordenados),
+    }
+
+
+async def calcular_estadisticas(session: AsyncSession, score_id: int, materia: str) -> dict:
+    """
+    Estadísticas por tipo y generales de las calificaciones de una materia.
+
+    Se lee sólo la columna valor, ya ordenada por tipo y valor, en una única
+    consulta: así los grupos y el total salen de la misma instantánea aunque
+    se inserten calificaciones a la vez (con READ COMMITTED dos consultas
+    podrían no coincidir).
+    """
+    cal = models.Calificacion
+    valores: dict = {}
+    for tipo, valor in (await session.exec(
+        select(cal.tipo, cal.valor).where(cal.score_id == score_id).order_by(cal.tipo, cal.valor)
+    )).all():
+        valores.setdefault(tipo, []).append(valor)
+
+    por_tipo = [_grupo(tipo, ordenados) for tipo, ordenados in valores.items()]
+    general = _grupo(None, list(heapq.merge(*valores.values()))) if valores else None
+    return {"score_id": score_id, "materia": materia, "general": general, "por_tipo": por_tipo}
@@ -0,0 +1,93 @@
+#etag.py
+import secrets
+import threading
+from typing import Hashable, Optional
+
+from fastapi import Request, Response, status
+
+from .config import settings
+
+# Cambia en cada arranque: un ETag emitido antes de reiniciar nunca coincide
+_PROCESS_NONCE = secrets.token_hex(4)
+
+# Claves de versión compartidas por rutas y escrituras
+MATERIAS = "materias"
+CALIFICACIONES = "calificaciones"  # generación global: borrados que afectan a varias listas
+
+
+def materia_key(score_id: int) -> tuple:
+    return ("materia", score_id)
+
+
+def estudiante_key(student_id: int) -> tuple:
+    return ("estudiante", student_id)
+
+
+class VersionCounters:
+    """
+    Contadores de versión por recurso, en memoria del proceso.
+
+    Las escrituras los incrementan después del commit y las lecturas toman la
+    versión antes de consultar, así una respuesta nunca queda etiquetada con
+    una versión más nueva que sus datos.
+    """
+
+    def __init__(self):
+        self._versions: dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> int:
+        return self._versions.get(key, 0)
+
+    def bump(self, *keys: Hashable):
+        with self._lock:
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._versions.clear()
+
+
+versions = VersionCounters()
+
+
+def etags_enabled() -> bool:
+    """Los contadores sólo sirven si todas las escrituras pasan por este proceso"""
+    return settings.ETAGS_ENABLED and settings.WEB_CONCURRENCY <= 1
+
+
+def make_etag(*keys: Hashable) -> str:
+    """ETag débil con la versión actual de cada clave"""
+    return 'W/"%s-%s"' % (_PROCESS_NONCE, ".".join(str(versions.get(k)) for k in keys))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil (RFC 9110) contra la cabecera If-None-Match"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(request: Request, response: Response, *keys: Hashable) -> Optional[Response]:
+    """
+    Devuelve un 304 si If-None-Match coincide con la versión actual.
+
+    En otro caso deja el ETag en la respuesta y devuelve None para que la ruta
+    continúe. Debe llamarse antes de consultar las filas, y las filas deben
+    leerse del primario: una réplica atrasada devolvería datos viejos con la
+    versión nueva. Con los ETags desactivados no hace nada.
+    """
+    if not etags_enabled():
+        return None
+    etag = make_etag(*keys)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
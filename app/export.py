@@ -0,0 +1,77 @@
+#export.py
+import csv
+import io
+import json
+from datetime import date
+from enum import Enum
+from typing import Iterator, Literal, Sequence
+
+from fastapi.responses import StreamingResponse
+
+from .config import settings
+from .db import connect_for_read
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def _csv_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def stream_rows(statement, columns: Sequence[str], formato: ExportFormat) -> Iterator[bytes]:
+    """
+    Genera el volcado de `statement` fila a fila desde un cursor del servidor.
+
+    Toda la exportación es una única sentencia SELECT, por lo que en motores
+    MVCC (InnoDB, PostgreSQL) y en SQLite lee una instantánea consistente aunque
+    haya escrituras concurrentes. La memoria usada depende sólo del tamaño de
+    lote (EXPORT_BATCH_SIZE), no del número de filas. Se lee de una réplica si
+    hay alguna configurada.
+    """
+    with connect_for_read() as conn:
+        result = conn.execution_options(
+            stream_results=True,
+            yield_per=settings.EXPORT_BATCH_SIZE
+        ).execute(statement)
+
+        if formato == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for partition in result.partitions():
+                writer.writerows([_csv_value(v) for v in row] for row in partition)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode()
+        else:
+            for partition in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) + "\n"
+                    for row in partition
+                ).encode()
+
+
+def export_response(statement, columns: Sequence[str], formato: ExportFormat, filename: str) -> StreamingResponse:
+    """StreamingResponse con el volcado; Starlette itera el generador en el threadpool"""
+    return StreamingResponse(
+        stream_rows(statement, columns, formato),
+        media_type=MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{formato}"'}
+    )
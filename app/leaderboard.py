@@ -0,0 +1,163 @@
+#leaderboard.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from sortedcontainers import SortedList
+from sqlalchemy import func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from . import models
+from .config import settings
+from .etag import etags_enabled
+
+
+def _promedio(suma: float, cantidad: int) -> float:
+    # Redondeado para que sumas incrementales y de SQL den la misma clave
+    return round(suma / cantidad, 6)
+
+
+class MateriaRanking:
+    """
+    Ranking de los estudiantes de una materia por promedio de calificaciones.
+
+    Las entradas (-promedio, student_id) viven en una SortedList, así que
+    actualizar un estudiante, consultar su posición o sacar el top-N cuesta
+    O(log n) (más N para el top). Los empates comparten posición.
+    """
+
+    def __init__(self, totales: dict[int, tuple[float, int]]):
+        self._totales = {sid: [suma, cantidad] for sid, (suma, cantidad) in totales.items() if cantidad}
+        self._orden = SortedList(
+            (-_promedio(suma, cantidad), sid) for sid, (suma, cantidad) in self._totales.items()
+        )
+
+    def apply(self, student_id: int, delta_suma: float, delta_cantidad: int):
+        """Suma o resta calificaciones de un estudiante"""
+        total = self._totales.get(student_id)
+        if total is not None:
+            self._orden.remove((-_promedio(*total), student_id))
+        else:
+            total = self._totales[student_id] = [0.0, 0]
+        total[0] += delta_suma
+        total[1] += delta_cantidad
+        if total[1] > 0:
+            self._orden.add((-_promedio(*total), student_id))
+        else:
+            del self._totales[student_id]
+
+    def rank(self, student_id: int) -> Optional[dict]:
+        total = self._totales.get(student_id)
+        if total is None:
+            return None
+        promedio = _promedio(*total)
+        # Los empatados delante tienen la misma clave: bisect sobre (-promedio,) da la primera
+        posicion = self._orden.bisect_left((-promedio,)) + 1
+        return {"posicion": posicion, "student_id": student_id, "promedio": promedio, "cantidad": total[1]}
+
+    def top(self, n: int) -> list[dict]:
+        resultado = []
+        for i, (clave, student_id) in enumerate(self._orden.islice(0, n)):
+            posicion = resultado[-1]["posicion"] if resultado and -clave == resultado[-1]["promedio"] else i + 1
+            resultado.append({"posicion": posicion, "student_id": student_id, "promedio": -clave,
+                              "cantidad": self._totales[student_id][1]})
+        return resultado
+
+    def __len__(self) -> int:
+        return len(self._orden)
+
+
+class Leaderboards:
+    """
+    Rankings por score_id en memoria del proceso, acotados y reconstruidos bajo demanda.
+
+    Las escrituras de calificaciones los actualizan con apply(); una materia
+    que no está cargada se reconstruye desde la base en la siguiente lectura.
+    Cada escritura incrementa la generación de su materia, y un ranking
+    construido mientras cambiaba la generación no se guarda, porque podría
+    no incluir esa escritura. Tras `ttl` segundos se reconstruye igualmente.
+    Con varios workers no se guarda nada: cada lectura se construye desde la
+    base, porque las escrituras de un worker no llegan a los demás.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._rankings: "OrderedDict[int, tuple[float, MateriaRanking]]" = OrderedDict()
+        self._generaciones: dict[int, int] = {}
+        self._epoca = 0  # cambia al invalidarlo todo, también para materias no cargadas
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def _build(self, session: AsyncSession, score_id: int) -> MateriaRanking:
+        cal = models.Calificacion
+        filas = (await session.exec(
+            select(cal.student_id, func.sum(cal.valor), func.count())
+            .where(cal.score_id == score_id)
+            .group_by(cal.student_id)
+        )).all()
+        return MateriaRanking({sid: (suma, cantidad) for sid, suma, cantidad in filas})
+
+    async def get(self, session: AsyncSession, score_id: int) -> MateriaRanking:
+        if not etags_enabled():
+            # Con varios workers apply() sólo llegaría al que atendió la escritura
+            return await self._build(session, score_id)
+        with self._lock:
+            entrada = self._rankings.get(score_id)
+            if entrada is not None and self._clock() - entrada[0] < self.ttl:
+                self._rankings.move_to_end(score_id)
+                self.hits += 1
+                return entrada[1]
+            self.misses += 1
+            generacion = (self._epoca, self._generaciones.get(score_id, 0))
+
+        ranking = await self._build(session, score_id)
+        with self._lock:
+            if (self._epoca, self._generaciones.get(score_id, 0)) == generacion:
+                self._rankings[score_id] = (self._clock(), ranking)
+                self._rankings.move_to_end(score_id)
+                while len(self._rankings) > self.maxsize:
+                    self._rankings.popitem(last=False)
+        return ranking
+
+    def apply(self, score_id: int, student_id: int, delta_suma: float, delta_cantidad: int):
+        """Aplica una escritura ya confirmada (no hace nada si la materia no está cargada)"""
+        with self._lock:
+            self._generaciones[score_id] = self._generaciones.get(score_id, 0) + 1
+            entrada = self._rankings.get(score_id)
+            if entrada is not None:
+                entrada[1].apply(student_id, delta_suma, delta_cantidad)
+
+    def invalidate(self, *score_ids: int):
+        """Descarta los rankings indicados, o todos si no se indica ninguno"""
+        with self._lock:
+            if not score_ids:
+                self._epoca += 1
+                self._rankings.clear()
+            for score_id in score_ids:
+                self._generaciones[score_id] = self._generaciones.get(score_id, 0) + 1
+                self._rankings.pop(score_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._rankings.clear()
+            self._generaciones.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "materias": len(self._rankings),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+leaderboards = Leaderboards(settings.LEADERBOARD_CACHE_SIZE, settings.LEADERBOARD_TTL)
@@ -1,20 +1,32 @@
 #main_factory.py
+import logging
+import math
 from datetime import timedelta
 from contextlib import asynccontextmanager
 from typing import Annotated
 
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app import models, schemas
+from app import migrations, models, schemas
+from app.access_log import AccessLogMiddleware, configure_logging, shutdown_logging
 from app.auth import auth
-from app.db import get_db, engine as default_engine
-from app.routes import usuarios, materias, calificaciones
+from app.auth.hashing import HasherBusy, hasher
+from app.auth.throttle import login_throttle
+from app.db import get_db, dispose_async_engine, engine as default_engine
+from app.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from app.responses import FastJSONResponse
+from app.config import settings
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, LOGIN_REJECTED, MetricsMiddleware, registry
+from app.routes import usuarios, materias, calificaciones, sistema
+
+logger = logging.getLogger(__name__)
 
 # Dependencias comunes
-session_dep = Annotated[Session, Depends(get_db)]
+session_dep = Annotated[AsyncSession, Depends(get_db)]
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 @asynccontextmanager
@@ -23,8 +35,16 @@ async def lifespan(app: FastAPI):
     engine = getattr(app.state, "engine", default_engine)
     if getattr(app.state, "reset_db", False):
         models.SQLModel.metadata.drop_all(engine)
-    models.SQLModel.metadata.create_all(engine)
+        migrations.upgrade(engine)
+    elif settings.DB_AUTO_MIGRATE:
+        migrations.upgrade(engine)
+    else:
+        # Sólo una consulta a schema_version; las migraciones se aplican con migrate.py
+        migrations.check_schema(engine)
     yield
+    hasher.shutdown()
+    await dispose_async_engine()
+    shutdown_logging()
 
 def create_app(engine_override=None):
     """Factory para crear la aplicación FastAPI"""
@@ -32,7 +52,8 @@ def create_app(engine_override=None):
         title="API de Gestión Académica",
         description="Sistema integrado de gestión académica con autenticación JWT",
         version="1.0.0",
-        lifespan=lifespan
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse
     )
     # Middleware de CORS (para permitir frontend externo)
     app.add_middleware(
@@ -41,20 +62,21 @@ def create_app(engine_override=None):
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, "ETag"],
     )
 
-    # Middleware de logging de peticiones
-    @app.middleware("http")
-    async def log_requests(request, call_next):
-        print(f"➡️ {request.method} {request.url.path}")
-        response = await call_next(request)
-        print(f"⬅️ {response.status_code} {request.url.path}")
-        return response
+    # Log de accesos estructurado (ASGI puro, escritura en segundo plano)
+    if settings.ACCESS_LOG_ENABLED:
+        configure_logging()
+        app.add_middleware(AccessLogMiddleware)
 
+    # Contadores e histogramas por ruta para /metrics
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
 
     # Configurar engine override para testing si es necesario
     if engine_override:
-        print("⚙️ Usando engine de prueba")
+        logger.info("Usando engine de prueba")
         app.state.engine = engine_override
 
     @app.get("/", tags=["Root"])
@@ -64,6 +86,7 @@ def create_app(engine_override=None):
 
     @app.post("/token", response_model=schemas.Token, tags=["Autenticación"])
     async def login_for_access_token(
+        request: Request,
         session: session_dep,
         form_data: OAuth2PasswordRequestForm = Depends()
     ):
@@ -74,26 +97,53 @@ def create_app(engine_override=None):
             username: Nombre de usuario
             password: Contraseña
         """
+        # Límite de intentos por IP y por usuario, antes de consultar o hashear nada
+        espera = login_throttle.check(form_data.username, request.client.host if request.client else None)
+        if espera is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Demasiados intentos de inicio de sesión",
+                headers={"Retry-After": str(math.ceil(espera))},
+            )
+
         # Buscar usuario en la base de datos
-        user = session.exec(
+        user = (await session.exec(
             select(models.User).where(models.User.name_user == form_data.username)
-        ).first()
+        )).first()
 
         # Verificar credenciales
-        if not user or not user.verify_password(form_data.password):
+        try:
+            valida, nuevo_hash = (False, None) if user is None else await hasher.verify_and_update(
+                form_data.password, user.hashed_password
+            )
+        except HasherBusy:
+            LOGIN_REJECTED.inc("busy")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servicio de autenticación saturado, reintenta en unos segundos",
+                headers={"Retry-After": "1"},
+            )
+        if not valida:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Credenciales inválidas",
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
+        # Hash con otro coste (BCRYPT_ROUNDS recalibrado): se reemplaza sin pedir nada al usuario
+        if nuevo_hash is not None:
+            user.hashed_password = nuevo_hash
+            await session.commit()
+            auth.invalidate_principal(user.user_id)
+
         # Generar token de acceso
         access_token_expires = timedelta(minutes=auth.settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = auth.create_access_token(
             data={
                 "sub": user.name_user,
                 "role": user.role,
-                "user_id": user.user_id  # Usamos el campo unificado user_id
+                "user_id": user.user_id,  # Usamos el campo unificado user_id
+                "ver": user.token_version
             },
             expires_delta=access_token_expires
         )
@@ -106,10 +156,17 @@ def create_app(engine_override=None):
     async def health_check():
         return {"status": "ok"}
 
+    if settings.METRICS_ENABLED:
+        @app.get("/metrics", tags=["Sistema"], include_in_schema=False)
+        async def metrics():
+            """Métricas del proceso en formato de texto Prometheus"""
+            return Response(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
     #Incluir routers
     app.include_router(usuarios.router)
     app.include_router(materias.router)
     app.include_router(calificaciones.router)
+    app.include_router(sistema.router)
 
     
 
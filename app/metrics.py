@@ -0,0 +1,303 @@
+#metrics.py
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterable, Sequence
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pares = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Shard:
+    """Valores de un hilo; al morir el hilo, su threading.local lo libera"""
+
+    __slots__ = ("data", "__weakref__")
+
+    def __init__(self):
+        self.data: dict = {}
+
+
+class _ShardedMetric:
+    """
+    Métrica con un diccionario de valores por hilo.
+
+    Cada hilo sólo escribe en su propio shard, así que incrementar no necesita
+    lock; el lock sólo se toma la primera vez que un hilo usa la métrica. Al
+    exportar se suman los shards de todos los hilos. Cuando un hilo termina
+    (anyio recicla los suyos tras unos segundos inactivos) sus valores se
+    suman a un total base y el shard se descarta, así que el número de shards
+    no crece con los hilos que han existido.
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._base: dict = {}
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard.data
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard.data)
+            weakref.finalize(shard, self._retire, shard.data)
+            return shard.data
+
+    def _retire(self, data: dict):
+        """Pasa al total base los valores de un hilo que ya terminó"""
+        with self._lock:
+            self._merge(self._base, data)
+            self._shards = [s for s in self._shards if s is not data]
+
+    @staticmethod
+    def _merge(total: dict, data: dict):
+        raise NotImplementedError
+
+    def _snapshots(self) -> list[dict]:
+        with self._lock:
+            shards = [self._base.copy()] + list(self._shards)
+        # dict.copy() es atómico con el GIL aunque el hilo dueño siga escribiendo
+        return [shard.copy() for shard in shards]
+
+    def reset(self):
+        with self._lock:
+            self._base.clear()
+            for shard in self._shards:
+                shard.clear()
+
+    def collect(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_ShardedMetric):
+    type_name = "counter"
+
+    def inc(self, *labelvalues, amount: float = 1):
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    @staticmethod
+    def _merge(total: dict, data: dict):
+        for key, value in data.items():
+            total[key] = total.get(key, 0) + value
+
+    def value(self, *labelvalues) -> float:
+        return sum(s.get(labelvalues, 0) for s in self._snapshots())
+
+    def collect(self) -> Iterable[str]:
+        total: dict = {}
+        for snapshot in self._snapshots():
+            self._merge(total, snapshot)
+        for key in sorted(total):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(total[key])}"
+
+
+class Histogram(_ShardedMetric):
+    """Histograma con cubetas fijas; por serie guarda [cubetas..., +Inf, suma, cuenta]"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues):
+        shard = self._shard()
+        serie = shard.get(labelvalues)
+        if serie is None:
+            serie = shard[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        serie[bisect_left(self.buckets, value)] += 1
+        serie[-2] += value
+        serie[-1] += 1
+
+    @contextmanager
+    def time(self, *labelvalues):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio, *labelvalues)
+
+    @staticmethod
+    def _merge(total: dict, data: dict):
+        # Siempre listas nuevas: las series del total no comparten lista con ningún hilo
+        for key, serie in data.items():
+            serie = list(serie)
+            acumulado = total.get(key)
+            total[key] = serie if acumulado is None else [a + b for a, b in zip(acumulado, serie)]
+
+    def _merged(self) -> dict:
+        total: dict = {}
+        for snapshot in self._snapshots():
+            self._merge(total, snapshot)
+        return total
+
+    def totals(self, *labelvalues) -> tuple[int, float]:
+        """(cuenta, suma) de una serie"""
+        serie = self._merged().get(labelvalues)
+        return (serie[-1], serie[-2]) if serie else (0, 0.0)
+
+    def count(self, *labelvalues) -> int:
+        return self.totals(*labelvalues)[0]
+
+    def collect(self) -> Iterable[str]:
+        merged = self._merged()
+        for key in sorted(merged):
+            serie = merged[key]
+            acumulado = 0
+            for limite, cantidad in zip(self.buckets + (float("inf"),), serie):
+                acumulado += cantidad
+                le = f'le="{_number(limite)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {acumulado}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(serie[-2])}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {serie[-1]}"
+
+
+class CallbackGauge:
+    """Gauge cuyo valor se calcula al exportar; la función devuelve [(labels, valor)]"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str],
+                 callback: Callable[[], Iterable[tuple[tuple, float]]]):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def reset(self):
+        pass
+
+    def collect(self) -> Iterable[str]:
+        for key, value in self.callback():
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class MetricsRegistry:
+    """Registro en memoria de métricas exportadas en formato de texto Prometheus"""
+
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existente = self._metrics.get(metric.name)
+            if existente is not None:
+                return existente
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str],
+              callback: Callable[[], Iterable[tuple[tuple, float]]]) -> CallbackGauge:
+        return self._register(CallbackGauge(name, help_text, labelnames, callback))
+
+    def reset(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")
+)
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route")
+)
+BCRYPT_SECONDS = registry.histogram(
+    "bcrypt_duration_seconds", "Tiempo de hash/verificación bcrypt", ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+LOGIN_REJECTED = registry.counter(
+    "login_rejected_total", "Intentos de login rechazados antes de verificar la contraseña", ("reason",)
+)
+JWT_CLAIMS_CACHE = registry.counter(
+    "jwt_claims_cache_total", "Consultas a la caché de claims JWT", ("result",)
+)
+JWT_DECODE_SECONDS = registry.histogram(
+    "jwt_decode_duration_seconds", "Tiempo de decodificación de tokens JWT",
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro que cuenta peticiones y mide su latencia.
+
+    La ruta se etiqueta con la plantilla (`/usuarios/{user_id}`) y no con la
+    URL concreta, para que el número de series no crezca con los IDs.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_LATENCY.observe(time.perf_counter() - start, method, template)
+            HTTP_REQUESTS.inc(method, template, str(status_code))
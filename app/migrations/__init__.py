@@ -0,0 +1,98 @@
+"""
+Migraciones versionadas del esquema.
+
+Cada módulo `mNNNN_*.py` define VERSION, DESCRIPTION y upgrade(conn). Las
+versiones aplicadas se registran en la tabla schema_version. Una base nueva
+se crea con los modelos actuales (m0001), así que cada migración posterior
+comprueba si su cambio ya existe antes de aplicarlo.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlmodel import Field, SQLModel
+
+from . import m0001_esquema_inicial, m0002_indices_calificacion, m0003_token_version
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = [m0001_esquema_inicial, m0002_indices_calificacion, m0003_token_version]
+assert [m.VERSION for m in MIGRATIONS] == list(range(1, len(MIGRATIONS) + 1)), "Versiones fuera de orden"
+
+LATEST_VERSION = MIGRATIONS[-1].VERSION
+
+
+class SchemaVersion(SQLModel, table=True):
+    __tablename__ = "schema_version"
+
+    version: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    description: str = Field(max_length=255)
+    applied_at: datetime
+
+
+class SchemaOutdatedError(RuntimeError):
+    pass
+
+
+def current_version(engine) -> Optional[int]:
+    """Última versión aplicada (una sola consulta); None si no hay tabla schema_version"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(SchemaVersion.version))).scalar()
+    except (OperationalError, ProgrammingError):
+        return None
+
+
+def _applied(conn) -> dict[int, datetime]:
+    SchemaVersion.__table__.create(conn, checkfirst=True)
+    return dict(conn.execute(select(SchemaVersion.version, SchemaVersion.applied_at)).all())
+
+
+def upgrade(engine, target: Optional[int] = None) -> list[int]:
+    """Aplica en orden las migraciones pendientes, cada una en su transacción"""
+    with engine.begin() as conn:
+        aplicadas = _applied(conn)
+
+    nuevas = []
+    for migration in MIGRATIONS:
+        if migration.VERSION in aplicadas or (target is not None and migration.VERSION > target):
+            continue
+        logger.info("Aplicando migración %04d: %s", migration.VERSION, migration.DESCRIPTION)
+        with engine.begin() as conn:
+            migration.upgrade(conn)
+            conn.execute(insert(SchemaVersion.__table__).values(
+                version=migration.VERSION,
+                description=migration.DESCRIPTION,
+                applied_at=datetime.now(timezone.utc).replace(tzinfo=None),
+            ))
+        nuevas.append(migration.VERSION)
+    return nuevas
+
+
+def status(engine) -> list[dict]:
+    """Estado de cada migración conocida"""
+    with engine.begin() as conn:
+        aplicadas = _applied(conn)
+    return [
+        {"version": m.VERSION, "description": m.DESCRIPTION, "applied_at": aplicadas.get(m.VERSION)}
+        for m in MIGRATIONS
+    ]
+
+
+def check_schema(engine):
+    """
+    Comprobación barata al arrancar: compara la versión de la base con la del código.
+
+    Falla si faltan migraciones; si la base va por delante (despliegue
+    escalonado) sólo avisa.
+    """
+    version = current_version(engine)
+    if version is None or version < LATEST_VERSION:
+        raise SchemaOutdatedError(
+            f"Esquema en versión {version or 0}, se requiere {LATEST_VERSION}: "
+            "ejecuta `python migrate.py upgrade`"
+        )
+    if version > LATEST_VERSION:
+        logger.warning("El esquema (v%s) es más nuevo que el código (v%s)", version, LATEST_VERSION)
@@ -0,0 +1,10 @@
+# m0001_esquema_inicial.py
+from app import models
+
+VERSION = 1
+DESCRIPTION = "Esquema inicial (usuarios, materias, inscripciones y calificaciones)"
+
+
+def upgrade(conn):
+    # Sólo crea las tablas que falten: en bases anteriores a las migraciones no hace nada
+    models.SQLModel.metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,43 @@
+# m0002_indices_calificacion.py
+from sqlalchemy import func, inspect, select
+
+from app import models
+
+VERSION = 2
+DESCRIPTION = "Índices de calificacion: único (student_id, score_id, tipo), (score_id) y (student_id, fecha)"
+
+
+def _duplicados(conn) -> int:
+    c = models.Calificacion
+    grupos = (
+        select(c.student_id)
+        .group_by(c.student_id, c.score_id, c.tipo)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    return conn.execute(select(func.count()).select_from(grupos)).scalar()
+
+
+def upgrade(conn):
+    existentes = {i["name"] for i in inspect(conn).get_indexes("calificacion")}
+    pendientes = [i for i in models.Calificacion.__table__.indexes if i.name not in existentes]
+    if not pendientes:
+        return
+
+    if any(i.unique for i in pendientes) and (n := _duplicados(conn)):
+        raise RuntimeError(
+            f"Hay {n} combinaciones (student_id, score_id, tipo) repetidas en calificacion; "
+            "elimínalas antes de crear el índice único"
+        )
+
+    for index in pendientes:
+        if conn.dialect.name == "mysql":
+            # InnoDB crea el índice en línea, sin bloquear escrituras
+            columnas = ", ".join(c.name for c in index.columns)
+            unico = "UNIQUE " if index.unique else ""
+            conn.exec_driver_sql(
+                f"CREATE {unico}INDEX {index.name} ON calificacion ({columnas}) "
+                "ALGORITHM=INPLACE, LOCK=NONE"
+            )
+        else:
+            index.create(conn)
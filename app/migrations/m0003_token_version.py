@@ -0,0 +1,12 @@
+# m0003_token_version.py
+from sqlalchemy import inspect
+
+VERSION = 3
+DESCRIPTION = "Columna user.token_version para revocar tokens JWT"
+
+
+def upgrade(conn):
+    if "token_version" in {c["name"] for c in inspect(conn).get_columns("user")}:
+        return
+    tabla = conn.dialect.identifier_preparer.quote("user")
+    conn.exec_driver_sql(f"ALTER TABLE {tabla} ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0")
@@ -1,15 +1,21 @@
 #models.py
 from datetime import date
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel, Relationship
 from typing import Optional, List
 from passlib.context import CryptContext
 from enum import Enum
 
-# Configuración de hasheo de contraseñas
+from .config import settings
+
+# Configuración de hasheo de contraseñas. Los hashes con otro coste (más
+# barato o más caro que BCRYPT_ROUNDS) se marcan para rehashear en el login.
 pwd_context = CryptContext(
     schemes=["bcrypt"],
     deprecated="auto",
-    bcrypt__rounds=12
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
 )
 
 # Enumeradores para tipos predefinidos
@@ -76,6 +82,11 @@ class User(UserBase, table=True):
         None, 
         description="Carrera de estudiante (solo para estudiantes)"
     )
+    token_version: int = Field(
+        default=0,
+        sa_column_kwargs={"server_default": "0"},
+        description="Se incrementa al cambiar la contraseña o el rol; invalida los tokens emitidos antes"
+    )
 
     # Relaciones
     scores_as_professor: List["Score"] = Relationship(
@@ -161,7 +172,17 @@ class CalificacionBase(SQLModel):
         description="Comentarios adicionales sobre la calificación"
     )
 
+# Índice único (student_id, score_id, tipo); las rutas lo reconocen en los errores de integridad
+CALIFICACION_UNIQUE_INDEX = "ix_calificacion_student_score_tipo"
+
 class Calificacion(CalificacionBase, table=True):
+    __table_args__ = (
+        # Una calificación por tipo, estudiante y materia; cubre también las búsquedas por estudiante
+        Index(CALIFICACION_UNIQUE_INDEX, "student_id", "score_id", "tipo", unique=True),
+        Index("ix_calificacion_score_id", "score_id"),
+        Index("ix_calificacion_student_fecha", "student_id", "fecha"),
+    )
+
     calificacion_id: Optional[int] = Field(default=None, primary_key=True)
     student_id: int = Field(..., foreign_key="user.user_id")
     score_id: int = Field(..., foreign_key="score.score_id")
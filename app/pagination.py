@@ -0,0 +1,115 @@
+#pagination.py
+import base64
+import json
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import Integer, func, text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+@dataclass
+class PageParams:
+    """Parámetros de paginación por cursor (keyset)"""
+    cursor: Optional[str]
+    limit: int
+    include_total: bool
+
+
+def make_page_params(default_limit: int, max_limit: int):
+    """Dependencia de paginación con su propio tamaño de página por defecto y máximo"""
+    def page_params(
+        cursor: Optional[str] = Query(None, description="Cursor opaco devuelto en X-Next-Cursor"),
+        limit: int = Query(default_limit, ge=1, le=max_limit),
+        include_total: bool = Query(False, description="Incluir total estimado en X-Total-Count"),
+    ) -> PageParams:
+        return PageParams(cursor=cursor, limit=limit, include_total=include_total)
+    return page_params
+
+
+page_params = make_page_params(settings.PAGE_SIZE_DEFAULT, settings.PAGE_SIZE_MAX)
+
+
+def encode_cursor(value: Any) -> str:
+    """Codifica la última clave de una página como cursor opaco"""
+    raw = json.dumps([value], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _cursor_invalido() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Cursor de paginación inválido"
+    )
+
+
+def decode_cursor(cursor: str, tipo: Optional[type] = None) -> Any:
+    """Decodifica un cursor; responde 400 si está corrupto o su valor no es de tipo `tipo`"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise _cursor_invalido()
+    # bool es subclase de int, pero true no es un id válido
+    if tipo is not None and (not isinstance(value, tipo) or isinstance(value, bool)):
+        raise _cursor_invalido()
+    # Un entero fuera de BIGINT desborda al enlazarlo en la consulta
+    if isinstance(value, int) and not _INT64_MIN <= value <= _INT64_MAX:
+        raise _cursor_invalido()
+    return value
+
+
+async def estimate_total(session: AsyncSession, statement) -> int:
+    """
+    Total aproximado de filas de la consulta.
+
+    Sin filtros en MySQL se usan las estadísticas de information_schema (no
+    recorre la tabla); en el resto de casos se hace un COUNT(*) de la consulta.
+    """
+    froms = statement.get_final_froms()
+    if (
+        statement.whereclause is None
+        and len(froms) == 1
+        and session.get_bind().dialect.name == "mysql"
+    ):
+        estimado = (await session.exec(
+            text(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla"
+            ),
+            params={"tabla": froms[0].name}
+        )).scalar()
+        if estimado is not None:
+            return int(estimado)
+
+    count_stmt = select(func.count()).select_from(statement.order_by(None).subquery())
+    return (await session.exec(count_stmt)).one()
+
+
+async def paginate(session: AsyncSession, statement, key, page: PageParams, response: Response) -> list:
+    """
+    Aplica paginación keyset sobre `key` (columna única y ordenable: un id
+    entero o una cadena).
+
+    Devuelve las filas de la página y deja el cursor de la siguiente en la
+    cabecera X-Next-Cursor (ausente en la última página).
+    """
+    if page.include_total:
+        response.headers[TOTAL_COUNT_HEADER] = str(await estimate_total(session, statement))
+
+    if page.cursor is not None:
+        statement = statement.where(key > decode_cursor(page.cursor, int if isinstance(key.type, Integer) else str))
+    rows = (await session.exec(statement.order_by(key).limit(page.limit + 1))).all()
+
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(rows[-1], key.key))
+    return rows
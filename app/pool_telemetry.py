@@ -0,0 +1,142 @@
+#pool_telemetry.py
+import time
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from .metrics import registry
+
+POOL_EVENTS = registry.counter(
+    "db_pool_events_total", "Eventos del pool (connect, checkout, checkin, invalidate)", ("pool", "event")
+)
+POOL_CHECKOUT_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Espera para obtener una conexión del pool", ("pool",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+POOL_HOLD = registry.histogram(
+    "db_pool_hold_seconds", "Tiempo que una conexión permanece prestada", ("pool",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0)
+)
+
+_CHECKOUT_AT = "telemetry_checkout_at"
+
+
+class PoolTelemetry:
+    """
+    Telemetría de un pool de conexiones a partir de sus eventos.
+
+    Los contadores e histogramas van al registro de métricas; aquí sólo se
+    guardan los máximos observados (espera, préstamo, conexiones y overflow),
+    actualizados sin lock: una carrera puede perder un máximo por un instante,
+    lo que es aceptable para una estadística.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.engine = None
+        self.max_wait = 0.0
+        self.max_hold = 0.0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+        self.overflow_checkouts = 0
+
+    def attach(self, engine):
+        """Registra los eventos del pool del engine (síncrono)"""
+        self.engine = engine
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "soft_invalidate", self._on_soft_invalidate)
+        return self
+
+    @property
+    def pool(self):
+        return self.engine.pool if self.engine is not None else None
+
+    def record_wait(self, seconds: float):
+        POOL_CHECKOUT_WAIT.observe(seconds, self.label)
+        if seconds > self.max_wait:
+            self.max_wait = seconds
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        POOL_EVENTS.inc(self.label, "connect")
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        POOL_EVENTS.inc(self.label, "checkout")
+        connection_record.info[_CHECKOUT_AT] = time.perf_counter()
+        pool = self.pool
+        if isinstance(pool, QueuePool):
+            checked_out = pool.checkedout()
+            overflow = max(0, pool.overflow())
+            if checked_out > self.peak_checked_out:
+                self.peak_checked_out = checked_out
+            if overflow > self.peak_overflow:
+                self.peak_overflow = overflow
+            if checked_out > pool.size():
+                self.overflow_checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        POOL_EVENTS.inc(self.label, "checkin")
+        inicio = connection_record.info.pop(_CHECKOUT_AT, None)
+        if inicio is not None:
+            held = time.perf_counter() - inicio
+            POOL_HOLD.observe(held, self.label)
+            if held > self.max_hold:
+                self.max_hold = held
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        POOL_EVENTS.inc(self.label, "invalidate")
+
+    def _on_soft_invalidate(self, dbapi_connection, connection_record, exception):
+        POOL_EVENTS.inc(self.label, "soft_invalidate")
+
+    def stats(self) -> dict:
+        """Configuración, estado actual y acumulados del pool"""
+        pool = self.pool
+        resultado = {"pool_class": type(pool).__name__ if pool is not None else None}
+        if isinstance(pool, QueuePool):
+            resultado.update({
+                "size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "timeout_seconds": pool._timeout,
+                "recycle_seconds": pool._recycle,
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+            })
+
+        eventos = {e: int(POOL_EVENTS.value(self.label, e))
+                   for e in ("connect", "checkout", "checkin", "invalidate", "soft_invalidate")}
+        wait_count, wait_sum = POOL_CHECKOUT_WAIT.totals(self.label)
+        hold_count, hold_sum = POOL_HOLD.totals(self.label)
+        resultado.update({
+            "events": eventos,
+            "checkout_wait": {
+                "count": wait_count,
+                "avg_ms": round(wait_sum / wait_count * 1000, 3) if wait_count else 0.0,
+                "max_ms": round(self.max_wait * 1000, 3),
+            },
+            "hold": {
+                "count": hold_count,
+                "avg_ms": round(hold_sum / hold_count * 1000, 3) if hold_count else 0.0,
+                "max_ms": round(self.max_hold * 1000, 3),
+            },
+            "peak_checked_out": self.peak_checked_out,
+            "peak_overflow": self.peak_overflow,
+            "overflow_checkouts": self.overflow_checkouts,
+        })
+        return resultado
+
+
+_telemetry: dict[str, PoolTelemetry] = {}
+
+
+def pool_telemetry(label: str) -> PoolTelemetry:
+    telemetry = _telemetry.get(label)
+    if telemetry is None:
+        telemetry = _telemetry.setdefault(label, PoolTelemetry(label))
+    return telemetry
+
+
+def all_pool_stats() -> dict:
+    return {label: t.stats() for label, t in _telemetry.items() if t.engine is not None}
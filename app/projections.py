@@ -0,0 +1,24 @@
+#projections.py
+from functools import lru_cache
+
+from sqlmodel import select
+
+
+@lru_cache(maxsize=None)
+def public_columns(model: type, schema: type) -> tuple:
+    """Columnas de `model` que expone `schema`, en el orden de sus campos"""
+    faltan = [name for name in schema.model_fields if name not in model.__table__.c]
+    if faltan:
+        raise ValueError(f"{schema.__name__} tiene campos sin columna en {model.__name__}: {faltan}")
+    return tuple(getattr(model, name) for name in schema.model_fields)
+
+
+def select_public(model: type, schema: type):
+    """
+    SELECT de sólo las columnas del esquema público.
+
+    Devuelve filas ligeras (Row) en lugar de entidades: no pasan por el
+    identity map ni la instrumentación del ORM, y columnas como
+    hashed_password no salen de la base de datos.
+    """
+    return select(*public_columns(model, schema))
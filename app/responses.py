@@ -0,0 +1,40 @@
+#responses.py
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que serializa con pydantic-core directamente a bytes (sin json.dumps)"""
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+@lru_cache(maxsize=None)
+def _adapter(tipo) -> TypeAdapter:
+    # Construir un TypeAdapter compila su esquema: se hace una vez por tipo
+    return TypeAdapter(tipo)
+
+
+def model_response(schema: type, rows: Any, response: Optional[Response] = None) -> Response:
+    """
+    Valida filas ORM contra `schema` y las serializa a JSON en una sola pasada.
+
+    Devolver un Response hace que FastAPI se salte la validación y
+    serialización de response_model, que se mantiene en la ruta sólo para
+    OpenAPI. FastAPI descarta las cabeceras del `response` inyectado cuando la
+    ruta devuelve su propia respuesta, así que se copian aquí (cursor, ETag).
+    """
+    adapter = _adapter(list[schema] if isinstance(rows, list) else schema)
+    body = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+    headers = None
+    status_code = 200
+    if response is not None:
+        headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+        status_code = response.status_code or 200
+    return Response(body, status_code=status_code, headers=headers, media_type=FastJSONResponse.media_type)
@@ -1,104 +1,341 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlmodel import Session, select
+import sqlite3
+from datetime import date
+from fastapi import APIRouter, Body, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, update as sa_update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app import models, schemas
-from app.db import get_db
-from app.auth.auth import get_current_user, get_current_professor_user
-from typing import Annotated, List
+from app.config import settings
+from app.db import get_db, get_read_db
+from app.etag import CALIFICACIONES, estudiante_key, materia_key, not_modified, versions
+from app.auth.auth import get_current_user, get_current_professor_user, get_current_staff_user
+from app.export import ExportFormat, export_response
+from app.leaderboard import leaderboards
+from app.pagination import PageParams, page_params, paginate
+from app.projections import select_public
+from app.responses import model_response
+from typing import Annotated, List, Optional
 
 router = APIRouter(prefix="/calificaciones", tags=["calificaciones"])
 
-session_dep = Annotated[Session, Depends(get_db)]
+session_dep = Annotated[AsyncSession, Depends(get_db)]
+read_session_dep = Annotated[AsyncSession, Depends(get_read_db)]
 professor_dep = Annotated[models.User, Depends(get_current_professor_user)]
 user_dep = Annotated[models.User, Depends(get_current_user)]
+staff_dep = Annotated[models.User, Depends(get_current_staff_user)]
+page_dep = Annotated[PageParams, Depends(page_params)]
+
+
+DUPLICADA_DETAIL = "Ya existe una calificación de este tipo para el estudiante en esta materia"
+SQLITE_CONSTRAINT_UNIQUE = 2067
+SQLITE_UNIQUE_MESSAGE = (
+    "UNIQUE constraint failed: calificacion.student_id, calificacion.score_id, calificacion.tipo"
+)
+
+
+def _es_duplicado(error: IntegrityError) -> bool:
+    """
+    Distingue la violación del índice único de otros errores de integridad (p. ej. FKs).
+
+    Se usan los códigos del driver, no el texto del mensaje: MySQL 1062 con
+    el nombre del índice, PostgreSQL SQLSTATE 23505 con el nombre de la
+    restricción y SQLite SQLITE_CONSTRAINT_UNIQUE (2067; calificacion no tiene
+    otro índice único). El código extendido de SQLite sólo existe desde Python
+    3.11; en 3.10 se comparan las columnas del mensaje, que SQLite no traduce.
+    """
+    orig = error.orig
+    args = getattr(orig, "args", ())
+    if args and args[0] == 1062:
+        return models.CALIFICACION_UNIQUE_INDEX in str(args[1:])
+    if (getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)) == "23505":
+        diag = getattr(orig, "diag", None)
+        return diag is None or diag.constraint_name == models.CALIFICACION_UNIQUE_INDEX
+    if isinstance(orig, sqlite3.Error):
+        codigo = getattr(orig, "sqlite_errorcode", None)
+        if codigo is not None:
+            return codigo == SQLITE_CONSTRAINT_UNIQUE
+        return str(orig) == SQLITE_UNIQUE_MESSAGE
+    return False
+
+
+async def _commit_sin_duplicados(session: AsyncSession):
+    """Hace commit y traduce la violación del índice único en un 409"""
+    try:
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        if _es_duplicado(e):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=DUPLICADA_DETAIL)
+        raise
+
+
+def _bump_versiones(*calificaciones):
+    """Invalida los ETags de las listas por materia y por estudiante afectadas"""
+    versions.bump(*{
+        key
+        for c in calificaciones
+        for key in (materia_key(c["score_id"]), estudiante_key(c["student_id"]))
+    })
 
 
 @router.post("/", response_model=schemas.CalificacionPublic, status_code=status.HTTP_201_CREATED)
-def create_calificacion(cal: schemas.CalificacionCreate, session: session_dep, current_user: professor_dep):
+async def create_calificacion(cal: schemas.CalificacionCreate, session: session_dep, current_user: professor_dep):
     # Validar tipo de calificación
     try:
         cal.tipo = models.CalificacionTipo(cal.tipo)
     except ValueError:
         raise HTTPException(status_code=422, detail="Tipo de calificación inválido")
 
-    # Validar duplicado
-    existing_cal = session.exec(
-        select(models.Calificacion).where(
-            models.Calificacion.student_id == cal.student_id,
-            models.Calificacion.score_id == cal.score_id,
-            models.Calificacion.tipo == cal.tipo
-        )
-    ).first()
-
-    if existing_cal:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Ya existe una calificación de este tipo para el estudiante en esta materia"
-        )
-
-    # Crear la calificación con el profesor del token
+    # Crear la calificación con el profesor del token; el índice único
+    # (student_id, score_id, tipo) detecta el duplicado sin consulta previa
     db_cal = models.Calificacion(
         **cal.model_dump(),
         professor_id=current_user.user_id  # Añadir el professor_id del usuario autenticado
     )
 
     session.add(db_cal)
-    session.commit()
-    session.refresh(db_cal)
+    await _commit_sin_duplicados(session)
+    _bump_versiones(cal.model_dump())
+    leaderboards.apply(cal.score_id, cal.student_id, cal.valor, 1)
+    await session.refresh(db_cal)
     return db_cal
 
+
+async def _claves_existentes(session: AsyncSession, claves: set) -> dict:
+    """Busca en una sola consulta las calificaciones con esas claves (student_id, score_id, tipo)"""
+    if not claves:
+        return {}
+    students = {k[0] for k in claves}
+    scores = {k[1] for k in claves}
+    tipos = {k[2] for k in claves}
+    rows = (await session.exec(
+        select(
+            models.Calificacion.student_id,
+            models.Calificacion.score_id,
+            models.Calificacion.tipo,
+            models.Calificacion.calificacion_id,
+            models.Calificacion.professor_id,
+        ).where(
+            models.Calificacion.student_id.in_(students),
+            models.Calificacion.score_id.in_(scores),
+            models.Calificacion.tipo.in_(tipos)
+        )
+    )).all()
+    return {
+        (student_id, score_id, tipo): (calificacion_id, professor_id)
+        for student_id, score_id, tipo, calificacion_id, professor_id in rows
+        if (student_id, score_id, tipo) in claves
+    }
+
+
+@router.post("/bulk", response_model=schemas.CalificacionBulkReporte)
+async def bulk_calificaciones(
+    items: Annotated[list[schemas.CalificacionCreate], Body(min_length=1, max_length=settings.BULK_MAX_ITEMS)],
+    session: session_dep,
+    current_user: professor_dep,
+    upsert: bool = Query(False, description="Actualizar las calificaciones que ya existan")
+):
+    """
+    Registra (o actualiza con upsert=true) muchas calificaciones en una sola transacción.
+
+    Estudiantes, materias y duplicados se comprueban con una consulta cada uno;
+    las filas nuevas se insertan con un único executemany.
+    """
+    students = set((await session.exec(
+        select(models.User.user_id).where(
+            models.User.user_id.in_({c.student_id for c in items}),
+            models.User.role == models.Role.STUDENT
+        )
+    )).all())
+    scores = set((await session.exec(
+        select(models.Score.score_id).where(models.Score.score_id.in_({c.score_id for c in items}))
+    )).all())
+
+    resultados: list[Optional[schemas.CalificacionBulkResultado]] = [None] * len(items)
+    validos: dict[tuple, int] = {}
+    for i, cal in enumerate(items):
+        clave = (cal.student_id, cal.score_id, models.CalificacionTipo(cal.tipo))
+        detalle = None
+        if not 0 <= cal.valor <= 100:
+            detalle = "Valor fuera de rango (0-100)"
+        elif cal.student_id not in students:
+            detalle = "Estudiante no encontrado"
+        elif cal.score_id not in scores:
+            detalle = "Materia no encontrada"
+        elif clave in validos:
+            resultados[i] = schemas.CalificacionBulkResultado(
+                indice=i, estado="duplicada", detalle=f"Repetida en el lote (índice {validos[clave]})"
+            )
+            continue
+        if detalle:
+            resultados[i] = schemas.CalificacionBulkResultado(indice=i, estado="invalida", detalle=detalle)
+            continue
+        validos[clave] = i
+
+    existentes = await _claves_existentes(session, set(validos))
+    nuevas, actualizaciones = [], []
+    for clave, i in validos.items():
+        cal = items[i]
+        valores = {
+            "valor": cal.valor,
+            "tipo": clave[2],
+            "fecha": cal.fecha or date.today(),
+            "comentario": cal.comentario,
+        }
+        if clave not in existentes:
+            nuevas.append({**valores, "student_id": cal.student_id, "score_id": cal.score_id,
+                           "professor_id": current_user.user_id})
+            continue
+        calificacion_id, professor_id = existentes[clave]
+        if not upsert:
+            resultados[i] = schemas.CalificacionBulkResultado(
+                indice=i, estado="duplicada", calificacion_id=calificacion_id,
+                detalle=DUPLICADA_DETAIL
+            )
+        elif professor_id != current_user.user_id:
+            resultados[i] = schemas.CalificacionBulkResultado(
+                indice=i, estado="invalida", calificacion_id=calificacion_id,
+                detalle="No puedes modificar calificaciones de otro profesor"
+            )
+        else:
+            actualizaciones.append({**valores, "calificacion_id": calificacion_id})
+            resultados[i] = schemas.CalificacionBulkResultado(
+                indice=i, estado="actualizada", calificacion_id=calificacion_id
+            )
+
+    try:
+        if nuevas:
+            await session.exec(insert(models.Calificacion), params=nuevas)
+        if actualizaciones:
+            await session.exec(sa_update(models.Calificacion), params=actualizaciones)
+        creadas = await _claves_existentes(session, {
+            (c["student_id"], c["score_id"], c["tipo"]) for c in nuevas
+        })
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        if _es_duplicado(e):
+            # Otra petición registró alguna de estas calificaciones a la vez
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Conflicto con calificaciones registradas simultáneamente; reintente el lote"
+            )
+        raise
+    except Exception:
+        await session.rollback()
+        raise
+    _bump_versiones(*({"student_id": k[0], "score_id": k[1]} for k in validos))
+    # Un lote puede tocar muchos estudiantes: más barato reconstruir que aplicar uno a uno
+    leaderboards.invalidate(*{k[1] for k in validos})
+
+    for clave, (calificacion_id, _) in creadas.items():
+        i = validos[clave]
+        resultados[i] = schemas.CalificacionBulkResultado(indice=i, estado="creada", calificacion_id=calificacion_id)
+
+    return schemas.CalificacionBulkReporte(
+        creadas=len(nuevas),
+        actualizadas=len(actualizaciones),
+        rechazadas=sum(r.estado in ("duplicada", "invalida") for r in resultados),
+        resultados=resultados
+    )
+
+
+@router.get("/exportar", response_class=StreamingResponse)
+async def exportar_calificaciones(
+    current_user: staff_dep,
+    formato: ExportFormat = Query("ndjson"),
+    score_id: Optional[int] = Query(None, description="Filtrar por materia"),
+    student_id: Optional[int] = Query(None, description="Filtrar por estudiante")
+):
+    """Volcado completo de calificaciones en NDJSON o CSV, transmitido por lotes"""
+    columns = list(schemas.CalificacionPublic.model_fields)
+    statement = select_public(models.Calificacion, schemas.CalificacionPublic)
+    if score_id is not None:
+        statement = statement.where(models.Calificacion.score_id == score_id)
+    if student_id is not None:
+        statement = statement.where(models.Calificacion.student_id == student_id)
+    statement = statement.order_by(models.Calificacion.calificacion_id)
+    return export_response(statement, columns, formato, "calificaciones")
+
+
 @router.get("/{calificacion_id}", response_model=schemas.CalificacionPublic)
-def get_calificacion(calificacion_id: int, session: session_dep):
-    cal = session.get(models.Calificacion, calificacion_id)
+async def get_calificacion(calificacion_id: int, session: read_session_dep):
+    cal = (await session.exec(
+        select_public(models.Calificacion, schemas.CalificacionPublic)
+        .where(models.Calificacion.calificacion_id == calificacion_id)
+    )).first()
     if not cal:
         raise HTTPException(status_code=404, detail="Calificación no encontrada")
-    return cal
+    return model_response(schemas.CalificacionPublic, cal)
 
 
 @router.patch("/{calificacion_id}", response_model=schemas.CalificacionPublic)
-def update_calificacion(calificacion_id: int, update: schemas.CalificacionCreate, session: session_dep, current_user: professor_dep):
-    cal = session.get(models.Calificacion, calificacion_id)
+async def update_calificacion(calificacion_id: int, update: schemas.CalificacionCreate, session: session_dep, current_user: professor_dep):
+    cal = await session.get(models.Calificacion, calificacion_id)
     if not cal:
         raise HTTPException(status_code=404, detail="Calificación no encontrada")
     if cal.professor_id != current_user.user_id:
         raise HTTPException(status_code=403, detail="No puedes modificar calificaciones de otro profesor")
 
+    anterior = {"score_id": cal.score_id, "student_id": cal.student_id}
+    valor_anterior = cal.valor
     update_data = update.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(cal, key, value)
-    session.commit()
-    session.refresh(cal)
+    await _commit_sin_duplicados(session)
+    _bump_versiones(anterior, {"score_id": cal.score_id, "student_id": cal.student_id})
+    leaderboards.apply(anterior["score_id"], anterior["student_id"], -valor_anterior, -1)
+    leaderboards.apply(cal.score_id, cal.student_id, cal.valor, 1)
+    await session.refresh(cal)
     return cal
 
 
 @router.delete("/{calificacion_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_calificacion(calificacion_id: int, session: session_dep, current_user: professor_dep):
-    cal = session.get(models.Calificacion, calificacion_id)
+async def delete_calificacion(calificacion_id: int, session: session_dep, current_user: professor_dep):
+    cal = await session.get(models.Calificacion, calificacion_id)
     if not cal:
         raise HTTPException(status_code=404, detail="Calificación no encontrada")
     if cal.professor_id != current_user.user_id:
         raise HTTPException(status_code=403, detail="No puedes eliminar calificaciones de otro profesor")
-    session.delete(cal)
-    session.commit()
+    claves = {"score_id": cal.score_id, "student_id": cal.student_id}
+    valor = cal.valor
+    await session.delete(cal)
+    await session.commit()
+    _bump_versiones(claves)
+    leaderboards.apply(claves["score_id"], claves["student_id"], -valor, -1)
 
 
 @router.get("/", response_model=List[schemas.CalificacionPublic])
-def list_calificaciones(session: session_dep):
-    return session.exec(select(models.Calificacion)).all()
+async def list_calificaciones(session: read_session_dep, page: page_dep, response: Response):
+    calificaciones = await paginate(session, select_public(models.Calificacion, schemas.CalificacionPublic), models.Calificacion.calificacion_id, page, response)
+    return model_response(schemas.CalificacionPublic, calificaciones, response)
 
 
+# Con ETag: se lee del primario, que es donde se incrementan las versiones
 @router.get("/por_estudiante/{student_id}", response_model=List[schemas.CalificacionPublic])
-def calificaciones_por_estudiante(student_id: int, session: session_dep, current_user: user_dep):
-    user = session.get(models.User, student_id)
-    if not user or user.role != models.Role.STUDENT:
+async def calificaciones_por_estudiante(student_id: int, request: Request, session: session_dep,
+                                  current_user: user_dep, page: page_dep, response: Response):
+    if cached := not_modified(request, response, CALIFICACIONES, estudiante_key(student_id)):
+        return cached
+    role = (await session.exec(select(models.User.role).where(models.User.user_id == student_id))).first()
+    if role != models.Role.STUDENT:
         raise HTTPException(status_code=404, detail="Estudiante no encontrado")
-    return session.exec(
-        select(models.Calificacion).where(models.Calificacion.student_id == student_id)
-    ).all()
+    calificaciones = await paginate(
+        session,
+        select_public(models.Calificacion, schemas.CalificacionPublic).where(models.Calificacion.student_id == student_id),
+        models.Calificacion.calificacion_id, page, response
+    )
+    return model_response(schemas.CalificacionPublic, calificaciones, response)
 
 
 @router.get("/por_materia/{score_id}", response_model=List[schemas.CalificacionPublic])
-def calificaciones_por_materia(score_id: int, session: session_dep):
-    return session.exec(
-        select(models.Calificacion).where(models.Calificacion.score_id == score_id)
-    ).all()
+async def calificaciones_por_materia(score_id: int, session: read_session_dep, page: page_dep, response: Response):
+    calificaciones = await paginate(
+        session,
+        select_public(models.Calificacion, schemas.CalificacionPublic).where(models.Calificacion.score_id == score_id),
+        models.Calificacion.calificacion_id, page, response
+    )
+    return model_response(schemas.CalificacionPublic, calificaciones, response)
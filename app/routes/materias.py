@@ -1,47 +1,70 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlmodel import Session, select, col
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import and_, insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select, col
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app import models, schemas
-from app.db import get_db
-from app.auth.auth import get_current_user, get_current_professor_user, get_current_admin_user
+from app.config import settings
+from app.db import get_db, get_read_db
+from app.estadisticas import calcular_estadisticas, estadisticas_cache
+from app.leaderboard import leaderboards
+from app.etag import CALIFICACIONES, MATERIAS, etags_enabled, make_etag, materia_key, not_modified, versions
+from app.auth.auth import get_current_user, get_current_professor_user, get_current_admin_user, get_current_staff_user
+from app.pagination import PageParams, page_params, paginate
+from app.projections import select_public
+from app.responses import model_response
 from typing import Annotated
 
 router = APIRouter(prefix="/materias", tags=["materias"])
 
-session_dep = Annotated[Session, Depends(get_db)]
+session_dep = Annotated[AsyncSession, Depends(get_db)]
+read_session_dep = Annotated[AsyncSession, Depends(get_read_db)]
 professor_dep = Annotated[models.User, Depends(get_current_professor_user)]
 admin_dep = Annotated[models.User, Depends(get_current_admin_user)]
 user_dep = Annotated[models.User, Depends(get_current_user)]
+staff_dep = Annotated[models.User, Depends(get_current_staff_user)]
+page_dep = Annotated[PageParams, Depends(page_params)]
+
+
+async def _materia_existe(session: AsyncSession, score_id: int) -> bool:
+    return (await session.exec(select(models.Score.score_id).where(models.Score.score_id == score_id))).first() is not None
 
 
 @router.post("/", response_model=schemas.ScorePublic, status_code=status.HTTP_201_CREATED)
-def create_score(score: schemas.ScoreCreate, session: session_dep, current_user: professor_dep):
+async def create_score(score: schemas.ScoreCreate, session: session_dep, current_user: professor_dep):
     if current_user.user_id != score.professor_id:
         raise HTTPException(status_code=403, detail="No puedes registrar materias para otros profesores")
     db_score = models.Score(**score.model_dump())
     session.add(db_score)
-    session.commit()
-    session.refresh(db_score)
+    await session.commit()
+    versions.bump(MATERIAS)
+    await session.refresh(db_score)
     return db_score
 
 
+# Con ETag: se lee del primario, que es donde se incrementan las versiones
 @router.get("/", response_model=list[schemas.ScorePublic])
-def list_scores(session: session_dep):
-    scores = session.exec(select(models.Score)).all()
-    return scores
+async def list_scores(request: Request, session: session_dep, page: page_dep, response: Response):
+    if cached := not_modified(request, response, MATERIAS):
+        return cached
+    scores = await paginate(session, select_public(models.Score, schemas.ScorePublic), models.Score.score_id, page, response)
+    return model_response(schemas.ScorePublic, scores, response)
 
 
 @router.get("/{score_id}", response_model=schemas.ScorePublic)
-def get_score(score_id: int, session: session_dep):
-    score = session.get(models.Score, score_id)
+async def get_score(score_id: int, session: read_session_dep):
+    score = (await session.exec(
+        select_public(models.Score, schemas.ScorePublic).where(models.Score.score_id == score_id)
+    )).first()
     if not score:
         raise HTTPException(status_code=404, detail="Materia no encontrada")
-    return score
+    return model_response(schemas.ScorePublic, score)
 
 
 @router.patch("/{score_id}", response_model=schemas.ScorePublic)
-def update_score(score_id: int, score_update: schemas.ScoreCreate, session: session_dep, current_user: professor_dep):
-    score = session.get(models.Score, score_id)
+async def update_score(score_id: int, score_update: schemas.ScoreCreate, session: session_dep, current_user: professor_dep):
+    score = await session.get(models.Score, score_id)
     if not score:
         raise HTTPException(status_code=404, detail="Materia no encontrada")
     if score.professor_id != current_user.user_id:
@@ -51,58 +74,227 @@ def update_score(score_id: int, score_update: schemas.ScoreCreate, session: sess
     for key, value in update_data.items():
         setattr(score, key, value)
 
-    session.commit()
-    session.refresh(score)
+    await session.commit()
+    versions.bump(MATERIAS)
+    await session.refresh(score)
     return score
 
 
 @router.delete("/{score_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_score(score_id: int, session: session_dep, current_user: professor_dep):
-    score = session.get(models.Score, score_id)
+async def delete_score(score_id: int, session: session_dep, current_user: professor_dep):
+    score = await session.get(models.Score, score_id)
     if not score:
         raise HTTPException(status_code=404, detail="Materia no encontrada")
     if score.professor_id != current_user.user_id:
         raise HTTPException(status_code=403, detail="Solo puedes eliminar tus propias materias")
-    session.delete(score)
-    session.commit()
+    await session.delete(score)
+    await session.commit()
+    versions.bump(MATERIAS, CALIFICACIONES)
+    leaderboards.invalidate(score_id)
 
 
 @router.get("/{score_id}/estudiantes", response_model=list[schemas.UserPublic])
-def list_score_students(score_id: int, session: session_dep, current_user: user_dep):
-    score = session.get(models.Score, score_id)
-    if not score:
+async def list_score_students(score_id: int, session: read_session_dep, current_user: user_dep,
+                        page: page_dep, response: Response):
+    if not await _materia_existe(session, score_id):
         raise HTTPException(status_code=404, detail="Materia no encontrada")
-    return [schemas.UserPublic.model_validate(s) for s in score.students]
+    students = await paginate(
+        session,
+        select_public(models.User, schemas.UserPublic)
+        .join(models.StudentScoreLink, models.StudentScoreLink.student_id == models.User.user_id)
+        .where(models.StudentScoreLink.score_id == score_id),
+        models.User.user_id, page, response
+    )
+    return model_response(schemas.UserPublic, students, response)
+
+
+async def _inscritos(session: AsyncSession, score_id: int, student_ids: list[int]) -> set[int]:
+    return set((await session.exec(
+        select(models.StudentScoreLink.student_id).where(
+            models.StudentScoreLink.score_id == score_id,
+            models.StudentScoreLink.student_id.in_(student_ids)
+        )
+    )).all())
+
+
+async def _insertar_vinculos(session: AsyncSession, score_id: int, student_ids: list[int]):
+    if student_ids:
+        await session.exec(
+            insert(models.StudentScoreLink),
+            params=[{"student_id": student_id, "score_id": score_id} for student_id in student_ids]
+        )
+        await session.commit()
 
 
 @router.post("/{score_id}/inscribir", status_code=status.HTTP_200_OK)
-def enroll_student(score_id: int, student_id: int, session: session_dep, current_user: professor_dep):
-    score = session.get(models.Score, score_id)
-    student = session.get(models.User, student_id)
+async def enroll_student(score_id: int, student_id: int, session: session_dep, current_user: professor_dep):
+    score = await session.get(models.Score, score_id)
+    student = await session.get(models.User, student_id)
     if not score or not student:
         raise HTTPException(status_code=404, detail="Materia o estudiante no encontrado")
-    if student in score.students:
+    if await session.get(models.StudentScoreLink, (student_id, score_id)):
         raise HTTPException(status_code=409, detail="El estudiante ya está inscrito en esta materia")
-    score.students.append(student)
-    session.commit()
+    session.add(models.StudentScoreLink(student_id=student_id, score_id=score_id))
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        # Otra petición lo inscribió entre la comprobación y el INSERT
+        if await _inscritos(session, score_id, [student_id]):
+            raise HTTPException(status_code=409, detail="El estudiante ya está inscrito en esta materia")
+        raise
     return {"message": "Estudiante inscrito exitosamente"}
 
 
+@router.post("/{score_id}/inscribir_lote", response_model=schemas.InscripcionLoteResultado)
+async def enroll_students(score_id: int, lote: schemas.InscripcionLote, session: session_dep, current_user: professor_dep):
+    """
+    Inscribe varios estudiantes a la vez.
+
+    Roles e inscripciones previas se resuelven con una sola consulta y los
+    vínculos que faltan se insertan en una única sentencia.
+    """
+    if len(lote.student_ids) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Máximo {settings.BULK_MAX_ITEMS} estudiantes por lote"
+        )
+    if not await session.get(models.Score, score_id):
+        raise HTTPException(status_code=404, detail="Materia no encontrada")
+
+    solicitados = list(dict.fromkeys(lote.student_ids))
+    rows = (await session.exec(
+        select(models.User.user_id, models.User.role, models.StudentScoreLink.student_id)
+        .outerjoin(
+            models.StudentScoreLink,
+            and_(
+                models.StudentScoreLink.student_id == models.User.user_id,
+                models.StudentScoreLink.score_id == score_id
+            )
+        )
+        .where(models.User.user_id.in_(solicitados))
+    )).all()
+    encontrados = {user_id: (role, link is not None) for user_id, role, link in rows}
+
+    inscritos, ya_inscritos, invalidos = [], [], []
+    for student_id in solicitados:
+        role, inscrito = encontrados.get(student_id, (None, False))
+        if role != models.Role.STUDENT:
+            invalidos.append(student_id)
+        elif inscrito:
+            ya_inscritos.append(student_id)
+        else:
+            inscritos.append(student_id)
+
+    if inscritos:
+        try:
+            await _insertar_vinculos(session, score_id, inscritos)
+        except IntegrityError:
+            await session.rollback()
+            # Una petición simultánea inscribió a alguno: se reclasifican y se reintenta una vez
+            concurrentes = await _inscritos(session, score_id, inscritos)
+            if not concurrentes:
+                raise
+            ya_inscritos += [student_id for student_id in inscritos if student_id in concurrentes]
+            inscritos = [student_id for student_id in inscritos if student_id not in concurrentes]
+            try:
+                await _insertar_vinculos(session, score_id, inscritos)
+            except IntegrityError:
+                await session.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Conflicto con inscripciones simultáneas; reintente el lote"
+                )
+
+    return schemas.InscripcionLoteResultado(
+        inscritos=inscritos, ya_inscritos=ya_inscritos, invalidos=invalidos
+    )
+
+
 @router.delete("/{score_id}/estudiantes/{student_id}", status_code=status.HTTP_204_NO_CONTENT)
-def unenroll_student(score_id: int, student_id: int, session: session_dep, current_user: professor_dep):
-    score = session.get(models.Score, score_id)
+async def unenroll_student(score_id: int, student_id: int, session: session_dep, current_user: professor_dep):
+    score = await session.get(models.Score, score_id)
     if not score:
         raise HTTPException(status_code=404, detail="Materia no encontrada")
-    student = next((s for s in score.students if s.user_id == student_id), None)
-    if not student:
+    link = await session.get(models.StudentScoreLink, (student_id, score_id))
+    if not link:
         raise HTTPException(status_code=404, detail="Estudiante no inscrito")
-    score.students.remove(student)
-    session.commit()
+    await session.delete(link)
+    await session.commit()
 
 
 @router.get("/{score_id}/calificaciones", response_model=list[schemas.CalificacionPublic])
-def get_score_grades(score_id: int, session: session_dep, current_user: user_dep):
-    score = session.get(models.Score, score_id)
+async def get_score_grades(score_id: int, request: Request, session: session_dep, current_user: user_dep,
+                     page: page_dep, response: Response):
+    if cached := not_modified(request, response, CALIFICACIONES, materia_key(score_id)):
+        return cached
+    if not await _materia_existe(session, score_id):
+        raise HTTPException(status_code=404, detail="Materia no encontrada")
+    grades = await paginate(
+        session,
+        select_public(models.Calificacion, schemas.CalificacionPublic).where(models.Calificacion.score_id == score_id),
+        models.Calificacion.calificacion_id, page, response
+    )
+    return model_response(schemas.CalificacionPublic, grades, response)
+
+
+@router.get("/{score_id}/estadisticas", response_model=schemas.EstadisticasMateria)
+async def get_score_stats(score_id: int, request: Request, session: session_dep, current_user: staff_dep,
+                          response: Response):
+    """Media, mediana, desviación, percentiles e histograma de las calificaciones, por tipo"""
+    score = (await session.exec(
+        select(models.Score.materia, models.Score.professor_id).where(models.Score.score_id == score_id)
+    )).first()
     if not score:
         raise HTTPException(status_code=404, detail="Materia no encontrada")
-    return [schemas.CalificacionPublic.model_validate(c) for c in score.calificaciones]
+    if current_user.role == models.Role.PROFESSOR and score.professor_id != current_user.user_id:
+        raise HTTPException(status_code=403, detail="Solo puedes ver las estadísticas de tus propias materias")
+
+    claves = (MATERIAS, CALIFICACIONES, materia_key(score_id))
+    if cached := not_modified(request, response, *claves):
+        return cached
+    # La clave incluye versiones por proceso: con varios workers no invalidaría nada
+    cacheable = etags_enabled()
+    clave = (score_id, make_etag(*claves))
+    estadisticas = estadisticas_cache.get(clave) if cacheable else None
+    if estadisticas is None:
+        estadisticas = await calcular_estadisticas(session, score_id, score.materia)
+        if cacheable:
+            estadisticas_cache.set(clave, estadisticas)
+    return model_response(schemas.EstadisticasMateria, estadisticas, response)
+
+
+async def _profesor_de_materia(session: AsyncSession, score_id: int) -> int:
+    professor_id = (await session.exec(
+        select(models.Score.professor_id).where(models.Score.score_id == score_id)
+    )).first()
+    if professor_id is None:
+        raise HTTPException(status_code=404, detail="Materia no encontrada")
+    return professor_id
+
+
+# Los rankings se leen del primario: se reconstruyen desde ahí y una réplica
+# atrasada dejaría en memoria un ranking sin las últimas escrituras
+@router.get("/{score_id}/ranking", response_model=schemas.RankingMateria)
+async def get_score_ranking(score_id: int, session: session_dep, current_user: staff_dep,
+                            limit: int = Query(10, ge=1, le=100)):
+    """Mejores promedios de la materia, desde el ranking mantenido en memoria"""
+    professor_id = await _profesor_de_materia(session, score_id)
+    if current_user.role == models.Role.PROFESSOR and professor_id != current_user.user_id:
+        raise HTTPException(status_code=403, detail="Solo puedes ver el ranking de tus propias materias")
+    ranking = await leaderboards.get(session, score_id)
+    return model_response(schemas.RankingMateria, {"score_id": score_id, "total": len(ranking), "top": ranking.top(limit)})
+
+
+@router.get("/{score_id}/ranking/{student_id}", response_model=schemas.RankingEntrada)
+async def get_student_rank(score_id: int, student_id: int, session: session_dep, current_user: user_dep):
+    """Posición de un estudiante; la ve él mismo, el profesor de la materia o un administrador"""
+    professor_id = await _profesor_de_materia(session, score_id)
+    if not (current_user.role == models.Role.ADMIN
+            or current_user.user_id == student_id
+            or (current_user.role == models.Role.PROFESSOR and professor_id == current_user.user_id)):
+        raise HTTPException(status_code=403, detail="No puedes ver la posición de este estudiante")
+    entrada = (await leaderboards.get(session, score_id)).rank(student_id)
+    if entrada is None:
+        raise HTTPException(status_code=404, detail="El estudiante no tiene calificaciones en esta materia")
+    return model_response(schemas.RankingEntrada, entrada)
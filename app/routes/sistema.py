@@ -0,0 +1,44 @@
+#sistema.py
+from fastapi import APIRouter, Depends
+from app import models
+from app.auth.auth import claims_cache, get_current_admin_user, principal_cache
+from app.auth.hashing import hasher
+from app.auth.throttle import login_throttle
+from app.auth.token_versions import token_versions
+from app.config import settings
+from app.db import replicas
+from app.leaderboard import leaderboards
+from app.pool_telemetry import all_pool_stats
+from typing import Annotated
+
+router = APIRouter(prefix="/sistema", tags=["Sistema"])
+
+admin_dep = Annotated[models.User, Depends(get_current_admin_user)]
+
+
+@router.get("/hashing")
+async def hashing_stats(current_user: admin_dep):
+    """Profundidad de cola y latencia del pool de hasheo de contraseñas, y rechazos de login"""
+    return {**hasher.stats(), "login_throttle": login_throttle.stats()}
+
+
+@router.get("/cache")
+async def cache_stats(current_user: admin_dep):
+    """Aciertos, fallos y ocupación de las cachés de autenticación, del mapa de token_version y de los rankings"""
+    return {
+        "principal": principal_cache.stats(),
+        "claims": claims_cache.stats(),
+        "token_versions": token_versions.stats(),
+        "leaderboards": leaderboards.stats(),
+    }
+
+
+@router.get("/pool")
+async def pool_stats(current_user: admin_dep):
+    """Perfil del engine y telemetría del pool de conexiones (esperas, préstamos, overflow)"""
+    return {
+        "profile": settings.DB_PROFILE,
+        "options": settings.engine_options(),
+        "pools": all_pool_stats(),
+        "replicas": replicas.stats(),
+    }
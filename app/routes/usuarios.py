@@ -1,10 +1,21 @@
 #usuarios.py
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import String, cast, func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app import models, schemas
-from app.db import get_db
-from app.auth.auth import get_current_user, get_current_admin_user
+from app.db import get_db, get_read_db
+from app.etag import CALIFICACIONES, versions
+from app.auth.auth import get_current_user, get_current_admin_user, get_current_user_record, invalidate_principal
+from app.auth.token_versions import token_versions
+from app.auth.hashing import hasher
+from app.export import ExportFormat, export_response
+from app.leaderboard import leaderboards
+from app.pagination import PageParams, make_page_params, paginate
+from app.projections import select_public
+from app.responses import model_response
 from app.auth.permissions import require_role_or_none
 from typing import Annotated, Optional
 
@@ -12,9 +23,12 @@ router = APIRouter(prefix="/usuarios", tags=["usuarios"])
 
 
 # Dependencias reutilizables
-session_dep = Annotated[Session, Depends(get_db)]
+session_dep = Annotated[AsyncSession, Depends(get_db)]
+read_session_dep = Annotated[AsyncSession, Depends(get_read_db)]
 user_dep = Annotated[models.User, Depends(get_current_user)]
 admin_dep = Annotated[models.User, Depends(get_current_admin_user)]
+# El listado de usuarios conserva su página de siempre (10, máximo 100)
+users_page_dep = Annotated[PageParams, Depends(make_page_params(10, 100))]
 
 
 def calculate_age(birth_date: Optional[date]) -> Optional[int]:
@@ -25,7 +39,7 @@ def calculate_age(birth_date: Optional[date]) -> Optional[int]:
 
 
 @router.post("/", response_model=schemas.UserPublic, status_code=status.HTTP_201_CREATED)
-def create_user(user: schemas.UserCreate, 
+async def create_user(user: schemas.UserCreate, 
                 session: session_dep,
                  current_user: Optional[models.User] = require_role_or_none([models.Role.ADMIN])
                  ):
@@ -40,13 +54,13 @@ def create_user(user: schemas.UserCreate,
         )
     try:
         # Verificar unicidad
-        existing_user = session.exec(
+        existing_user = (await session.exec(
             select(models.User).where(
                 (models.User.email == user.email) |
                 (models.User.name_user == user.name_user) |
                 (models.User.cedula == user.cedula)
             )
-        ).first()
+        )).first()
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
@@ -79,7 +93,7 @@ def create_user(user: schemas.UserCreate,
         #     )
 
 
-        hashed_password = models.pwd_context.hash(user.password)
+        hashed_password = await hasher.hash(user.password)
         age = calculate_age(user.birth_date)
 
         db_user = models.User(
@@ -88,15 +102,15 @@ def create_user(user: schemas.UserCreate,
             age=age
         )
         session.add(db_user)
-        session.commit()
-        session.refresh(db_user)
+        await session.commit()
+        await session.refresh(db_user)
 
         return schemas.UserPublic.model_validate(db_user)
 
     except HTTPException:
         raise
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al crear usuario: {str(e)}"
@@ -104,21 +118,31 @@ def create_user(user: schemas.UserCreate,
 
 
 @router.get("/me", response_model=schemas.UserPublic)
-async def read_users_me(current_user: user_dep):
+async def read_users_me(current_user: Annotated[models.User, Depends(get_current_user_record)]):
     return schemas.UserPublic.model_validate(current_user)
 
 
+@router.get("/exportar", response_class=StreamingResponse)
+async def exportar_usuarios(current_user: admin_dep, formato: ExportFormat = Query("ndjson")):
+    """Directorio completo de usuarios en NDJSON o CSV, transmitido por lotes"""
+    columns = list(schemas.UserPublic.model_fields)
+    statement = select_public(models.User, schemas.UserPublic).order_by(models.User.user_id)
+    return export_response(statement, columns, formato, "usuarios")
+
+
 @router.get("/{user_id}", response_model=schemas.UserPublic)
-async def read_user(user_id: int, session: session_dep, current_user: user_dep):
+async def read_user(user_id: int, session: read_session_dep, current_user: user_dep):
     if current_user.role != models.Role.ADMIN and current_user.user_id != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permiso para ver este usuario"
         )
-    user = session.get(models.User, user_id)
+    user = (await session.exec(
+        select_public(models.User, schemas.UserPublic).where(models.User.user_id == user_id)
+    )).first()
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    return schemas.UserPublic.model_validate(user)
+    return model_response(schemas.UserPublic, user)
 
 
 @router.patch("/{user_id}", response_model=schemas.UserPublic)
@@ -134,7 +158,7 @@ async def update_user(
             detail="Solo puedes modificar tu propio perfil"
         )
 
-    user = session.get(models.User, user_id)
+    user = await session.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
@@ -155,58 +179,99 @@ async def update_user(
         )
 
     if 'password' in update_data:
-        update_data['hashed_password'] = models.pwd_context.hash(update_data.pop('password'))
+        update_data['hashed_password'] = await hasher.hash(update_data.pop('password'))
+        # Los tokens emitidos con la contraseña anterior dejan de valer
+        update_data['token_version'] = user.token_version + 1
 
     for key, value in update_data.items():
         setattr(user, key, value)
 
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    invalidate_principal(user_id)
+    if 'token_version' in update_data:
+        token_versions.set(user_id, update_data['token_version'])
+    await session.refresh(user)
     return schemas.UserPublic.model_validate(user)
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(user_id: int, session: session_dep, current_user: admin_dep):
-    user = session.get(models.User, user_id)
+    user = await session.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    session.delete(user)
-    session.commit()
+    await session.delete(user)
+    await session.commit()
+    invalidate_principal(user_id)
+    token_versions.revoke(user_id)
+    versions.bump(CALIFICACIONES)
+    leaderboards.invalidate()
 
 
 @router.get("/", response_model=list[schemas.UserPublic])
 async def list_users(
-    session: session_dep,
+    session: read_session_dep,
     current_user: admin_dep,
-    skip: int = Query(0, ge=0),
-    limit: int = Query(10, le=100)
+    page: users_page_dep,
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True, description="Usar cursor en su lugar")
 ):
-    users = session.exec(
-        select(models.User).order_by(models.User.name_user).offset(skip).limit(limit)
-    ).all()
-    return [schemas.UserPublic.model_validate(u) for u in users]
-
-
-@router.get("/{user_id}/historial")
-def obtener_historial_academico(user_id: int, session: session_dep, current_user: user_dep):
-    user = session.get(models.User, user_id)
-    if not user or user.role != models.Role.STUDENT:
+    statement = select_public(models.User, schemas.UserPublic)
+    if skip and page.cursor is None:
+        # Compatibilidad con clientes antiguos: OFFSET solo si no hay cursor
+        statement = statement.order_by(models.User.name_user).offset(skip).limit(page.limit)
+        users = (await session.exec(statement)).all()
+    else:
+        users = await paginate(session, statement, models.User.name_user, page, response)
+    return model_response(schemas.UserPublic, users, response)
+
+
+@router.get("/{user_id}/historial", response_model=list[schemas.HistorialMateria])
+async def obtener_historial_academico(
+    user_id: int,
+    session: read_session_dep,
+    current_user: user_dep,
+    tipo: Optional[models.CalificacionTipo] = Query(None, description="Filtrar por tipo de calificación"),
+    desde: Optional[date] = Query(None, description="Fecha mínima (inclusive)"),
+    hasta: Optional[date] = Query(None, description="Fecha máxima (inclusive)")
+):
+    role = (await session.exec(select(models.User.role).where(models.User.user_id == user_id))).first()
+    if role != models.Role.STUDENT:
         raise HTTPException(status_code=404, detail="Estudiante no encontrado")
 
-    historial = {}
-    for cal in user.calificaciones_as_student:
-        materia = cal.score.materia if cal.score else "Desconocida"
-        if materia not in historial:
-            historial[materia] = []
-        historial[materia].append(cal.valor)
-
-    from statistics import mean
-    resultado = []
-    for materia, notas in historial.items():
-        resultado.append({
-            "materia": materia,
-            "notas": notas,
-            "promedio": round(mean(notas), 2)
-        })
-
-    return resultado
\ No newline at end of file
+    # Una sola consulta agregada por materia (sin cargar cada calificación)
+    cal = models.Calificacion
+    statement = (
+        select(
+            cal.score_id,
+            func.coalesce(models.Score.materia, "Desconocida"),
+            func.aggregate_strings(cast(cal.valor, String), ","),
+            func.avg(cal.valor),
+            func.count(cal.calificacion_id),
+            func.min(cal.valor),
+            func.max(cal.valor),
+        )
+        .select_from(cal)
+        .outerjoin(models.Score, models.Score.score_id == cal.score_id)
+        .where(cal.student_id == user_id)
+        .group_by(cal.score_id, models.Score.materia)
+        .order_by(cal.score_id)
+    )
+    if tipo is not None:
+        statement = statement.where(cal.tipo == tipo)
+    if desde is not None:
+        statement = statement.where(cal.fecha >= desde)
+    if hasta is not None:
+        statement = statement.where(cal.fecha <= hasta)
+
+    return [
+        schemas.HistorialMateria(
+            score_id=score_id,
+            materia=materia,
+            notas=[float(v) for v in notas.split(",")],
+            promedio=round(promedio, 2),
+            cantidad=cantidad,
+            minimo=minimo,
+            maximo=maximo,
+        )
+        for score_id, materia, notas, promedio, cantidad, minimo, maximo in (await session.exec(statement)).all()
+    ]
@@ -132,6 +132,16 @@ class ScorePublic(ScoreBase):
     score_id: int
     professor_id: int
 
+class InscripcionLote(SQLModel):
+    """Esquema para inscribir varios estudiantes en una materia"""
+    student_ids: list[int]
+
+class InscripcionLoteResultado(SQLModel):
+    """Resultado de la inscripción en lote"""
+    inscritos: list[int]
+    ya_inscritos: list[int]
+    invalidos: list[int]
+
 class CalificacionBase(SQLModel):
     """Esquema base para calificaciones"""
     valor: float
@@ -150,4 +160,67 @@ class CalificacionPublic(CalificacionBase):
     calificacion_id: int
     student_id: int
     score_id: int
-    professor_id: int
\ No newline at end of file
+    professor_id: int
+
+class CalificacionBulkResultado(SQLModel):
+    """Resultado de un elemento de la carga masiva de calificaciones"""
+    indice: int
+    estado: str  # creada | actualizada | duplicada | invalida
+    calificacion_id: Optional[int] = None
+    detalle: Optional[str] = None
+
+class CalificacionBulkReporte(SQLModel):
+    """Reporte de la carga masiva de calificaciones"""
+    creadas: int
+    actualizadas: int
+    rechazadas: int
+    resultados: list[CalificacionBulkResultado]
+
+
+class HistogramaBin(SQLModel):
+    """Calificaciones en [desde, hasta); el último tramo incluye 100"""
+    desde: float
+    hasta: float
+    cantidad: int
+
+class EstadisticasGrupo(SQLModel):
+    """Distribución de un grupo de calificaciones (un tipo, o todas si tipo es None)"""
+    tipo: Optional[CalificacionTipo] = None
+    cantidad: int
+    promedio: float
+    mediana: float
+    desviacion: float
+    minimo: float
+    maximo: float
+    percentiles: dict[str, float]
+    histograma: list[HistogramaBin]
+
+class EstadisticasMateria(SQLModel):
+    """Estadísticas de las calificaciones de una materia"""
+    score_id: int
+    materia: str
+    general: Optional[EstadisticasGrupo] = None
+    por_tipo: list[EstadisticasGrupo]
+
+class RankingEntrada(SQLModel):
+    """Posición de un estudiante en el ranking de una materia (los empates comparten posición)"""
+    posicion: int
+    student_id: int
+    promedio: float
+    cantidad: int
+
+class RankingMateria(SQLModel):
+    """Mejores promedios de una materia"""
+    score_id: int
+    total: int
+    top: list[RankingEntrada]
+
+class HistorialMateria(SQLModel):
+    """Resumen de las calificaciones de un estudiante en una materia"""
+    score_id: int
+    materia: str
+    notas: list[float]
+    promedio: float
+    cantidad: int
+    minimo: float
+    maximo: float
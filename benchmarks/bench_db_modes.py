@@ -0,0 +1,111 @@
+"""
+Compara el throughput de la API con el engine síncrono (ThreadedSession) y con
+el engine async (AsyncSession + aiosqlite) sobre el mismo fichero SQLite.
+
+Uso:
+    python -m benchmarks.bench_db_modes --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import date
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_db_")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ.setdefault("DB_PROFILE", "bench")
+
+from httpx import AsyncClient, ASGITransport  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app import models  # noqa: E402
+from app import db as app_db  # noqa: E402
+from app.auth.auth import create_access_token  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.main_factory import create_app  # noqa: E402
+
+
+def seed(students: int, grades_per_student: int) -> dict:
+    """Carga un profesor, una materia y calificaciones con inserts masivos"""
+    engine = app_db.engine
+    engine.echo = False
+    models.SQLModel.metadata.drop_all(engine)
+    models.SQLModel.metadata.create_all(engine)
+    tipos = list(models.CalificacionTipo)
+    if grades_per_student > len(tipos):
+        raise ValueError(f"Como máximo {len(tipos)} calificaciones por estudiante (una por tipo)")
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{
+            "user_id": 1, "name_complete": "Profesor Bench", "name_user": "prof_bench",
+            "cedula": "10000000", "email": "prof@bench.test", "gender": models.Gender.MALE,
+            "role": models.Role.PROFESSOR, "specialization": "Bench", "career": None, "hashed_password": "x",
+        }] + [{
+            "user_id": i + 2, "name_complete": f"Estudiante {i}", "name_user": f"est{i:06d}",
+            "cedula": f"2{i:07d}", "email": f"est{i}@bench.test", "gender": models.Gender.FEMALE,
+            "role": models.Role.STUDENT, "specialization": None, "career": "Bench", "hashed_password": "x",
+        } for i in range(students)])
+        conn.execute(insert(models.Score), [{"score_id": 1, "materia": "Bench", "professor_id": 1}])
+        conn.execute(insert(models.Calificacion), [{
+            "valor": (i * 7 + g * 13) % 101, "tipo": tipos[g % len(tipos)], "fecha": date(2025, 1, 1),
+            "student_id": i + 2, "score_id": 1, "professor_id": 1,
+        } for i in range(students) for g in range(grades_per_student)])
+    return {"professor_id": 1, "student_id": 2, "score_id": 1}
+
+
+async def run_mode(mode: str, ids: dict, total: int, concurrency: int) -> dict:
+    settings.DB_ASYNC = mode == "async"
+    token = create_access_token({"sub": "prof_bench", "role": "professor", "user_id": ids["professor_id"]})
+    headers = {"Authorization": f"Bearer {token}"}
+    paths = [
+        "/usuarios/me",
+        "/materias/",
+        f"/calificaciones/por_materia/{ids['score_id']}",
+        f"/usuarios/{ids['student_id']}/historial",
+    ]
+    app = create_app()
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in paths:  # calentamiento
+            (await client.get(path, headers=headers)).raise_for_status()
+
+        queue = asyncio.Queue()
+        for i in range(total):
+            queue.put_nowait(paths[i % len(paths)])
+
+        async def worker():
+            while not queue.empty():
+                path = queue.get_nowait()
+                (await client.get(path, headers=headers)).raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    await app_db.dispose_async_engine()
+    return {"mode": mode, "requests": total, "seconds": round(elapsed, 3), "rps": round(total / elapsed, 1)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark engine síncrono vs async (SQLite)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--grades", type=int, default=5, help="Calificaciones por estudiante (una por tipo)")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    ids = seed(args.students, args.grades)
+    results = [await run_mode(mode, ids, args.requests, args.concurrency) for mode in ("sync", "async")]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            print(f"{r['mode']:>5}: {r['rps']:>8} req/s ({r['requests']} peticiones en {r['seconds']} s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,260 @@
+"""
+Benchmark de carga por endpoint sobre un dataset sintético.
+
+Lanza la app de create_app en el mismo proceso (httpx + ASGITransport) o bajo
+uvicorn con N workers, y mide latencia p50/p95/p99 y peticiones por segundo de
+cada ruta. Los resultados se guardan en JSON para comparar builds.
+
+Uso:
+    python -m benchmarks.bench_endpoints --students 1000 --materias 50 --grades 20000
+    python -m benchmarks.bench_endpoints --students 10000 --materias 500 --grades 1000000 \\
+        --server uvicorn --workers 4 --output resultados.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de latencia y throughput por endpoint")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--materias", type=int, default=50)
+    parser.add_argument("--grades", type=int, default=20000, help="Total de calificaciones")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla del dataset y de la elección de IDs")
+    parser.add_argument("--database-url", default=None, help="Por defecto, un SQLite temporal")
+    parser.add_argument("--skip-seed", action="store_true", help="Reutilizar el dataset ya cargado")
+    parser.add_argument("--requests", type=int, default=500, help="Peticiones por ruta")
+    parser.add_argument("--login-requests", type=int, default=50, help="Peticiones a /token (bcrypt)")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--routes", default=None, help="Nombres de rutas separados por comas")
+    parser.add_argument("--server", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", default=None, help="Fichero JSON de resultados")
+    args = parser.parse_args(argv)
+    for nombre in ("students", "materias", "grades"):
+        if getattr(args, nombre) < 1:
+            parser.error(f"--{nombre} debe ser al menos 1")
+    return args
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(name: str, method: str, template: str, latencies: list[float], errors: int, elapsed: float) -> dict:
+    ordenadas = sorted(latencies)
+    total = len(latencies)
+    return {
+        "route": name,
+        "method": method,
+        "path": template,
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(ordenadas) / total * 1000, 3) if total else 0.0,
+        "p50_ms": round(percentile(ordenadas, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordenadas, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordenadas, 99) * 1000, 3),
+        "max_ms": round(ordenadas[-1] * 1000, 3) if ordenadas else 0.0,
+    }
+
+
+def build_scenarios(ids: dict, tokens: dict, rng: random.Random) -> list[dict]:
+    """Rutas medidas: nombre, método, plantilla, generador de peticiones y token"""
+    def rand(rango):
+        return lambda: rng.randint(*rango)
+
+    student, score, professor = rand(ids["student_ids"]), rand(ids["score_ids"]), rand(ids["professor_ids"])
+    return [
+        {"name": "health", "method": "GET", "path": "/health", "make": lambda: "/health", "token": None},
+        {"name": "usuarios_me", "method": "GET", "path": "/usuarios/me",
+         "make": lambda: "/usuarios/me", "token": "student"},
+        {"name": "usuario", "method": "GET", "path": "/usuarios/{user_id}",
+         "make": lambda: f"/usuarios/{student()}", "token": "admin"},
+        {"name": "usuarios_lista", "method": "GET", "path": "/usuarios/?limit=50",
+         "make": lambda: "/usuarios/?limit=50", "token": "admin"},
+        {"name": "materias_lista", "method": "GET", "path": "/materias/",
+         "make": lambda: "/materias/", "token": None},
+        {"name": "materia", "method": "GET", "path": "/materias/{score_id}",
+         "make": lambda: f"/materias/{score()}", "token": None},
+        {"name": "materia_estudiantes", "method": "GET", "path": "/materias/{score_id}/estudiantes",
+         "make": lambda: f"/materias/{score()}/estudiantes", "token": "professor"},
+        {"name": "materia_calificaciones", "method": "GET", "path": "/materias/{score_id}/calificaciones",
+         "make": lambda: f"/materias/{score()}/calificaciones", "token": "professor"},
+        {"name": "calificaciones_por_estudiante", "method": "GET", "path": "/calificaciones/por_estudiante/{student_id}",
+         "make": lambda: f"/calificaciones/por_estudiante/{student()}", "token": "student"},
+        {"name": "calificaciones_por_materia", "method": "GET", "path": "/calificaciones/por_materia/{score_id}",
+         "make": lambda: f"/calificaciones/por_materia/{score()}", "token": None},
+        {"name": "historial", "method": "GET", "path": "/usuarios/{user_id}/historial",
+         "make": lambda: f"/usuarios/{student()}/historial", "token": "student"},
+        {"name": "login", "method": "POST", "path": "/token",
+         "make": lambda: "/token", "token": None,
+         "data": lambda: {"username": f"professor{professor():07d}", "password": ids["password"]}},
+    ]
+
+
+async def run_scenario(client, scenario: dict, headers: dict, total: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    pendientes = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in pendientes:
+            kwargs = {"headers": headers}
+            if "data" in scenario:
+                kwargs["data"] = scenario["data"]()
+            inicio = time.perf_counter()
+            try:
+                r = await client.request(scenario["method"], scenario["make"](), **kwargs)
+                ok = r.status_code < 400
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - inicio)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return summarize(scenario["name"], scenario["method"], scenario["path"], latencies, errors, elapsed)
+
+
+def start_uvicorn(args, env: dict) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    import httpx
+
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if proc.poll() is not None:
+            raise RuntimeError("uvicorn terminó al arrancar")
+        try:
+            if httpx.get(f"http://127.0.0.1:{args.port}/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn no respondió a /health")
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+
+    # La configuración se lee al importar app, así que el entorno va primero
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_'), 'bench.db')}"
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("DB_PROFILE", "bench")
+    os.environ.setdefault("ACCESS_LOG_ENABLED", "false")
+    os.environ.setdefault("LOGIN_THROTTLE_ENABLED", "false")  # el escenario login repite IP y usuarios
+    # Con varios workers la app deja de emitir ETags (sus versiones son por proceso)
+    os.environ["WEB_CONCURRENCY"] = str(args.workers if args.server == "uvicorn" else 1)
+
+    import httpx
+    from httpx import ASGITransport, AsyncClient
+    from app import db as app_db
+    from app.auth.auth import create_access_token
+    from app.main_factory import create_app
+    from seed import dataset_ids, seed_database
+
+    url = app_db.engine.url.render_as_string(hide_password=True)
+    inicio = time.perf_counter()
+    if args.skip_seed:
+        ids = dataset_ids(app_db.engine)
+    else:
+        sizes = {"students": args.students, "materias": args.materias, "grades": args.grades}
+        print(f"Cargando dataset {sizes} en {url}", file=sys.stderr)
+        ids = seed_database(app_db.engine, args.students, args.materias, args.grades, seed=args.seed, reset=True)
+    seed_seconds = round(time.perf_counter() - inicio, 1)
+    print(f"Dataset listo en {seed_seconds} s: {ids['sizes']}", file=sys.stderr)
+
+    def token(role: str, user_id: int) -> str:
+        return create_access_token({"sub": f"{role}{user_id:07d}", "role": role, "user_id": user_id})
+
+    tokens = {
+        "admin": token("admin", ids["admin_ids"][0]),
+        "professor": token("professor", ids["professor_ids"][0]),
+        "student": token("student", ids["student_ids"][0]),
+    }
+    scenarios = build_scenarios(ids, tokens, random.Random(args.seed))
+    if args.routes:
+        elegidas = set(args.routes.split(","))
+        scenarios = [s for s in scenarios if s["name"] in elegidas]
+
+    proc = None
+    if args.server == "uvicorn":
+        app_db.engine.dispose()
+        proc = start_uvicorn(args, dict(os.environ))
+        client = AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60,
+                             limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        client = AsyncClient(transport=ASGITransport(app=create_app()), base_url="http://bench", timeout=60)
+
+    results = []
+    try:
+        async with client:
+            for scenario in scenarios:
+                headers = {"Authorization": f"Bearer {tokens[scenario['token']]}"} if scenario["token"] else {}
+                await client.request(scenario["method"], scenario["make"](), headers=headers,
+                                     **({"data": scenario["data"]()} if "data" in scenario else {}))  # calentamiento
+                total = args.login_requests if scenario["name"] == "login" else args.requests
+                resultado = await run_scenario(client, scenario, headers, total, args.concurrency)
+                results.append(resultado)
+                print(f"{resultado['route']:<32} {resultado['rps']:>9} req/s  p50 {resultado['p50_ms']:>8} ms  "
+                      f"p95 {resultado['p95_ms']:>8} ms  p99 {resultado['p99_ms']:>8} ms  errores {resultado['errors']}",
+                      file=sys.stderr)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        await app_db.dispose_async_engine()
+
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                            capture_output=True, text=True).stdout.strip() or None
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "server": args.server,
+            "workers": args.workers if args.server == "uvicorn" else 1,
+            "concurrency": args.concurrency,
+            "database": app_db.engine.url.get_backend_name(),
+            "dataset": {**ids["sizes"], "seed": args.seed, "seed_seconds": seed_seconds},
+        },
+        "routes": results,
+    }
+    salida = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(salida + "\n")
+        print(f"Resultados en {args.output}", file=sys.stderr)
+    else:
+        print(salida)
+    return report
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
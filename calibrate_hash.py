@@ -0,0 +1,35 @@
+# calibrate_hash.py
+"""
+Elige el coste bcrypt para este host según un presupuesto de latencia.
+
+Mide cuánto tarda un hash con cada número de rondas y propone el mayor que
+cabe en PASSWORD_HASH_BUDGET_MS (o --budget-ms). Las contraseñas guardadas con
+otro coste se rehashean solas en el siguiente login.
+
+Uso:
+    python calibrate_hash.py --budget-ms 250
+"""
+import argparse
+
+from app.auth.hashing import calibrate_rounds, measure_bcrypt
+from app.config import settings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibra BCRYPT_ROUNDS para este host")
+    parser.add_argument("--budget-ms", type=float, default=settings.PASSWORD_HASH_BUDGET_MS,
+                        help="Tiempo máximo por hash en milisegundos")
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=16)
+    parser.add_argument("--samples", type=int, default=3, help="Hashes medidos por coste (se usa la mediana)")
+    args = parser.parse_args()
+
+    rounds, tiempos = calibrate_rounds(
+        args.budget_ms, lambda r: measure_bcrypt(r, args.samples), args.min_rounds, args.max_rounds
+    )
+    for r, ms in tiempos.items():
+        print(f"rounds={r:<3} {ms:8.1f} ms{'  <- elegido' if r == rounds else ''}")
+    if tiempos[rounds] > args.budget_ms:
+        print(f"Aviso: ni {rounds} rondas caben en {args.budget_ms:.0f} ms")
+    print(f"\nAñade a .env:\nBCRYPT_ROUNDS={rounds}")
+    if rounds != settings.BCRYPT_ROUNDS:
+        print(f"(actual: {settings.BCRYPT_ROUNDS}; las contraseñas se rehashean en el siguiente login)")
@@ -2,7 +2,7 @@
 import logging
 from sqlmodel import SQLModel
 from app.db import engine
-from app import models  # Asegura que todos los modelos estén importados
+from app import migrations, models  # Asegura que todos los modelos estén importados
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,19 +20,38 @@ def drop_tables():
     logger.info("¡Tablas eliminadas exitosamente!")
 
 def reset_tables():
-    """Elimina y vuelve a crear todas las tablas"""
+    """Elimina todas las tablas y vuelve a aplicar las migraciones"""
     drop_tables()
-    create_tables()
+    upgrade()
+
+def upgrade(target=None):
+    """Aplica las migraciones pendientes (hasta `target` si se indica)"""
+    aplicadas = migrations.upgrade(engine, target)
+    if aplicadas:
+        logger.info("Migraciones aplicadas: %s", ", ".join(f"{v:04d}" for v in aplicadas))
+    else:
+        logger.info("El esquema ya está al día (v%s)", migrations.current_version(engine))
+
+def status():
+    """Muestra qué migraciones están aplicadas"""
+    for m in migrations.status(engine):
+        estado = m["applied_at"].isoformat(sep=" ", timespec="seconds") if m["applied_at"] else "pendiente"
+        print(f"{m['version']:04d}  {estado:<20}  {m['description']}")
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Herramienta de migración para la base de datos")
-    parser.add_argument("accion", choices=["create", "drop", "reset"], help="Acción a realizar")
+    parser.add_argument("accion", choices=["upgrade", "status", "create", "drop", "reset"], help="Acción a realizar")
+    parser.add_argument("--to", type=int, default=None, help="Versión destino para upgrade")
     args = parser.parse_args()
 
-    if args.accion == "create":
+    if args.accion == "upgrade":
+        upgrade(args.to)
+    elif args.accion == "status":
+        status()
+    elif args.accion == "create":
         create_tables()
     elif args.accion == "drop":
         drop_tables()
     elif args.accion == "reset":
-        reset_tables()
\ No newline at end of file
+        reset_tables()
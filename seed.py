@@ -0,0 +1,241 @@
+# seed.py
+"""
+Carga datos sintéticos para pruebas de carga.
+
+Crea usuarios de todos los roles, materias, inscripciones y calificaciones de
+todos los tipos con inserts masivos de Core por lotes y un único hash de
+contraseña precalculado. Con la misma semilla el resultado es idéntico.
+
+Uso:
+    python seed.py --students 10000 --materias 500 --grades 1000000 --reset
+"""
+import argparse
+import logging
+import math
+import random
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select
+
+from app import migrations, models
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 10_000
+DEFAULT_PASSWORD = "seed-password"
+TIPOS = list(models.CalificacionTipo)
+GENDERS = list(models.Gender)
+# Tamaños que deben ser al menos 1 (las calificaciones se reparten entre estudiantes y materias)
+SIZE_ARGS = ("students", "materias", "grades")
+
+
+class _BatchWriter:
+    """Acumula filas por tabla y las inserta en lotes con un executemany"""
+
+    def __init__(self, conn, batch_size: int):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.pending: dict = {}
+        self.counts: dict = {}
+
+    def add(self, table, row: dict):
+        rows = self.pending.setdefault(table, [])
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table=None):
+        for t in [table] if table is not None else list(self.pending):
+            rows = self.pending.get(t)
+            if rows:
+                self.conn.execute(insert(t), rows)
+                self.counts[t.name] = self.counts.get(t.name, 0) + len(rows)
+                self.pending[t] = []
+
+
+def _user(user_id: int, role: models.Role, hashed: str, rng: random.Random, **extra) -> dict:
+    birth_date = date(1960, 1, 1) + timedelta(days=rng.randrange(45 * 365))
+    return {
+        "user_id": user_id,
+        "name_complete": f"{role.value.title()} {user_id}",
+        "name_user": f"{role.value}{user_id:07d}",
+        "cedula": f"{user_id:010d}",
+        "email": f"{role.value}{user_id}@seed.test",
+        "gender": GENDERS[user_id % len(GENDERS)],
+        "role": role,
+        "birth_date": birth_date,
+        "age": (date(2025, 1, 1) - birth_date).days // 365,
+        "hashed_password": hashed,
+        "specialization": extra.get("specialization"),
+        "career": extra.get("career"),
+    }
+
+
+def _tune_connection(conn):
+    """Ajustes de sesión para carga masiva (sólo afectan a esta conexión)"""
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("PRAGMA synchronous = OFF")
+    elif conn.dialect.name == "mysql":
+        conn.exec_driver_sql("SET unique_checks = 0, foreign_key_checks = 0")
+
+
+def seed_database(
+    engine,
+    students: int = 1000,
+    materias: int = 50,
+    grades: int = 20000,
+    professors: int = None,
+    admins: int = 1,
+    seed: int = 42,
+    password: str = DEFAULT_PASSWORD,
+    batch_size: int = BATCH_SIZE,
+    reset: bool = False,
+) -> dict:
+    """
+    Carga el dataset y devuelve los rangos de IDs generados.
+
+    Cada estudiante recibe grades/students calificaciones repartidas entre las
+    materias en las que se inscribe, con un tipo distinto por materia (el
+    índice único de calificacion no admite repetir tipo). El tipo inicial rota
+    entre estudiantes para que aparezcan todos los CalificacionTipo.
+    """
+    for nombre, valor in zip(SIZE_ARGS, (students, materias, grades)):
+        if valor < 1:
+            raise ValueError(f"{nombre} debe ser al menos 1")
+    if admins < 0:
+        raise ValueError("admins no puede ser negativo")
+    if professors is not None and professors < 1:
+        raise ValueError("professors debe ser al menos 1 (cada materia necesita profesor)")
+    rng = random.Random(seed)
+    professors = professors or max(1, materias // 5)
+    grades = min(grades, students * materias * len(TIPOS))
+
+    if reset:
+        models.SQLModel.metadata.drop_all(engine)
+    migrations.upgrade(engine)
+    with engine.connect() as conn:
+        if conn.execute(select(func.count()).select_from(models.User)).scalar():
+            raise RuntimeError("La base de datos ya tiene usuarios; usa --reset para recrearla")
+
+    # Un único hash bcrypt para todos los usuarios
+    hashed = models.pwd_context.hash(password)
+    first_admin = 1
+    first_professor = first_admin + admins
+    first_student = first_professor + professors
+
+    inicio = time.perf_counter()
+    with engine.begin() as conn:
+        _tune_connection(conn)
+        writer = _BatchWriter(conn, batch_size)
+        users = models.User.__table__
+        for i in range(admins):
+            writer.add(users, _user(first_admin + i, models.Role.ADMIN, hashed, rng))
+        for i in range(professors):
+            writer.add(users, _user(first_professor + i, models.Role.PROFESSOR, hashed, rng,
+                                    specialization=f"Especialidad {i % 20}"))
+        for i in range(students):
+            writer.add(users, _user(first_student + i, models.Role.STUDENT, hashed, rng,
+                                    career=f"Carrera {i % 15}"))
+        writer.flush(users)
+
+        for s in range(materias):
+            writer.add(models.Score.__table__, {
+                "score_id": s + 1, "materia": f"Materia {s + 1}", "description": None,
+                "professor_id": first_professor + s % professors,
+            })
+        writer.flush(models.Score.__table__)
+
+        base, extra = divmod(grades, students)
+        fecha_inicial = date(2025, 1, 1)
+        for i in range(students):
+            student_id = first_student + i
+            cuota = base + (1 if i < extra else 0)
+            inscritas = rng.sample(range(1, materias + 1), min(materias, max(1, math.ceil(cuota / len(TIPOS)))))
+            for score_id in inscritas:
+                writer.add(models.StudentScoreLink.__table__, {"student_id": student_id, "score_id": score_id})
+            for n in range(cuota):
+                score_id = inscritas[n % len(inscritas)]
+                writer.add(models.Calificacion.__table__, {
+                    "valor": round(rng.uniform(0, 100), 1),
+                    "fecha": fecha_inicial + timedelta(days=rng.randrange(180)),
+                    "tipo": TIPOS[(n // len(inscritas) + i) % len(TIPOS)],
+                    "comentario": None,
+                    "student_id": student_id,
+                    "score_id": score_id,
+                    "professor_id": first_professor + (score_id - 1) % professors,
+                })
+            if (i + 1) % 10_000 == 0:
+                logger.info("%d/%d estudiantes con sus calificaciones", i + 1, students)
+        writer.flush()
+
+    logger.info("Filas insertadas en %.1f s: %s", time.perf_counter() - inicio, writer.counts)
+    return dataset_ids(engine, password)
+
+
+def dataset_ids(engine, password: str = DEFAULT_PASSWORD) -> dict:
+    """Rangos de IDs por rol y tamaños de un dataset ya cargado"""
+    with engine.connect() as conn:
+        def rango(role):
+            return list(conn.execute(
+                select(func.min(models.User.user_id), func.max(models.User.user_id))
+                .where(models.User.role == role)
+            ).one())
+
+        admins, professors, students = (rango(r) for r in (models.Role.ADMIN, models.Role.PROFESSOR, models.Role.STUDENT))
+        scores = list(conn.execute(select(func.min(models.Score.score_id), func.max(models.Score.score_id))).one())
+        grades = conn.execute(select(func.count()).select_from(models.Calificacion)).scalar()
+
+    def tamano(ids) -> int:
+        # Sin filas (p. ej. --admins 0) el rango es [None, None]
+        return 0 if ids[0] is None else ids[1] - ids[0] + 1
+
+    return {
+        "admin_ids": admins,
+        "professor_ids": professors,
+        "student_ids": students,
+        "score_ids": scores,
+        "password": password,
+        "sizes": {
+            "admins": tamano(admins),
+            "professors": tamano(professors),
+            "students": tamano(students),
+            "materias": tamano(scores),
+            "grades": grades,
+        },
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Carga datos sintéticos en la base de datos")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--professors", type=int, default=None, help="Por defecto, una por cada 5 materias")
+    parser.add_argument("--admins", type=int, default=1)
+    parser.add_argument("--materias", type=int, default=50)
+    parser.add_argument("--grades", type=int, default=20000, help="Total de calificaciones")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla aleatoria")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="Contraseña de todos los usuarios")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--reset", action="store_true", help="Eliminar las tablas antes de cargar")
+    args = parser.parse_args(argv)
+    for nombre in SIZE_ARGS:
+        if getattr(args, nombre) < 1:
+            parser.error(f"--{nombre} debe ser al menos 1")
+    if args.admins < 0:
+        parser.error("--admins no puede ser negativo")
+    if args.professors is not None and args.professors < 1:
+        parser.error("--professors debe ser al menos 1 (cada materia necesita profesor)")
+    return args
+
+
+if __name__ == "__main__":
+    from app.db import engine
+
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    ids = seed_database(
+        engine, students=args.students, materias=args.materias, grades=args.grades,
+        professors=args.professors, admins=args.admins, seed=args.seed,
+        password=args.password, batch_size=args.batch_size, reset=args.reset,
+    )
+    logger.info("Dataset listo: %s", ids["sizes"])
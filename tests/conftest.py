@@ -1,7 +1,11 @@
 import pytest
 from sqlmodel import Session, SQLModel
 from app.db import engine
-from app.auth.auth import create_access_token
+from app.auth.auth import claims_cache, create_access_token, principal_cache
+from app.auth.throttle import login_throttle
+from app.auth.token_versions import token_versions
+from app.estadisticas import estadisticas_cache
+from app.leaderboard import leaderboards
 from app import models
 import warnings
 from sqlalchemy import exc as sa_exc
@@ -19,6 +23,19 @@ def db():
         yield session
     SQLModel.metadata.drop_all(engine)
 
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    # Las tablas se recrean en cada test y los IDs se reutilizan
+    principal_cache.clear()
+    claims_cache.clear()
+    token_versions.clear()
+    login_throttle.clear()
+    estadisticas_cache.clear()
+    leaderboards.clear()
+    yield
+    principal_cache.clear()
+    token_versions.clear()
+
 @pytest.fixture(autouse=True)
 def suppress_sqlalchemy_warnings():
     warnings.filterwarnings(
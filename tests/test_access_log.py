@@ -0,0 +1,65 @@
+import json
+import logging
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app import access_log
+from app.config import settings
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(json.loads(self.format(record)))
+
+
+@pytest.fixture
+def captured():
+    access_log.shutdown_logging()
+    handler = ListHandler()
+    access_log.configure_logging(handler)
+    yield handler
+    access_log.shutdown_logging()
+
+
+@pytest.mark.asyncio
+async def test_registro_estructurado(test_app, captured, student_token, test_student):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/usuarios/me", headers={"Authorization": f"Bearer {student_token}"})
+        assert r.status_code == 200
+    access_log.shutdown_logging()  # vacía la cola
+
+    entrada, = [l for l in captured.lines if l["logger"] == "app.access"]
+    assert entrada["method"] == "GET"
+    assert entrada["path"] == "/usuarios/me"
+    assert entrada["status"] == 200
+    assert entrada["user_id"] == test_student.user_id
+    assert entrada["latency_ms"] >= entrada["db_ms"] > 0
+
+
+@pytest.mark.asyncio
+async def test_muestreo_de_accesos_y_sql(test_app, db, captured, monkeypatch):
+    monkeypatch.setattr(settings, "ACCESS_LOG_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(settings, "SQL_LOG_SAMPLE_RATE", 1.0)
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.get("/health")
+        await client.get("/materias/")
+    access_log.shutdown_logging()
+
+    assert not [l for l in captured.lines if l["logger"] == "app.access"]
+    sql = [l for l in captured.lines if l["logger"] == "app.sql"]
+    assert sql and sql[0]["statement"].startswith("SELECT")
+
+
+def test_cola_llena_descarta_sin_bloquear(monkeypatch):
+    import queue
+    handler = access_log.DroppingQueueHandler(queue.Queue(maxsize=1))
+    antes = access_log.dropped_records
+    record = logging.LogRecord("app.access", logging.INFO, __file__, 0, "x", None, None)
+    handler.emit(record)
+    handler.emit(record)
+    assert access_log.dropped_records == antes + 1
@@ -0,0 +1,69 @@
+import pytest
+import pytest_asyncio
+from datetime import date
+from httpx import AsyncClient, ASGITransport
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app import db as app_db
+from app.config import settings
+from app.db import async_database_url, get_db
+
+
+@pytest_asyncio.fixture
+async def async_mode(monkeypatch):
+    monkeypatch.setattr(settings, "DB_ASYNC", True)
+    yield
+    # Cada test corre en su propio event loop: no reutilizar conexiones
+    await app_db.dispose_async_engine()
+
+
+def test_async_database_url():
+    assert async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    assert async_database_url("mysql+pymysql://u:p@h/db") == "mysql+aiomysql://u:p@h/db"
+    assert async_database_url("postgresql://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+
+
+@pytest.mark.asyncio
+async def test_get_db_entrega_async_session(async_mode):
+    gen = get_db()
+    session = await gen.__anext__()
+    try:
+        assert isinstance(session, AsyncSession)
+    finally:
+        await gen.aclose()
+
+
+@pytest.mark.asyncio
+async def test_flujo_completo_en_modo_async(async_mode, test_app, test_professor, test_student,
+                                            professor_token, admin_token):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        prof_headers = {"Authorization": f"Bearer {professor_token}"}
+
+        r = await client.get("/usuarios/me", headers=prof_headers)
+        assert r.status_code == 200
+        assert r.json()["user_id"] == test_professor.user_id
+
+        r = await client.post("/materias/", json={
+            "materia": "Async I", "professor_id": test_professor.user_id
+        }, headers=prof_headers)
+        assert r.status_code == 201
+        score_id = r.json()["score_id"]
+
+        r = await client.post(f"/materias/{score_id}/inscribir?student_id={test_student.user_id}", headers=prof_headers)
+        assert r.status_code == 200
+
+        r = await client.post("/calificaciones/", json={
+            "valor": 91, "tipo": "parcial", "fecha": str(date.today()),
+            "student_id": test_student.user_id, "score_id": score_id
+        }, headers=prof_headers)
+        assert r.status_code == 201
+
+        r = await client.get(f"/usuarios/{test_student.user_id}/historial", headers=prof_headers)
+        assert r.json()[0]["promedio"] == 91.0
+
+        r = await client.get("/usuarios/", headers={"Authorization": f"Bearer {admin_token}"})
+        assert r.status_code == 200
+        assert len(r.json()) == 3
+
+        r = await client.delete(f"/materias/{score_id}/estudiantes/{test_student.user_id}", headers=prof_headers)
+        assert r.status_code == 204
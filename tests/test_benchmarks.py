@@ -0,0 +1,10 @@
+from benchmarks.bench_endpoints import percentile, summarize
+
+
+def test_percentiles_por_rango():
+    valores = [i / 1000 for i in range(1, 101)]  # 1..100 ms
+    assert percentile(valores, 50) == 0.05
+    assert percentile(valores, 99) == 0.099
+    r = summarize("x", "GET", "/x", valores, errors=1, elapsed=2.0)
+    assert r["rps"] == 50.0 and r["p95_ms"] == 95.0 and r["errors"] == 1
+
@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from datetime import date
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event, inspect
+from app import models
+from app.db import engine
+
+
+@pytest.fixture
+def materia(db, test_professor):
+    score = models.Score(materia="Geografía", professor_id=test_professor.user_id)
+    db.add(score)
+    db.commit()
+    db.refresh(score)
+    return score
+
+
+def test_indices_de_calificacion(db):
+    indices = {i["name"]: i for i in inspect(engine).get_indexes("calificacion")}
+    unico = indices["ix_calificacion_student_score_tipo"]
+    assert unico["column_names"] == ["student_id", "score_id", "tipo"]
+    assert unico["unique"]
+    assert indices["ix_calificacion_score_id"]["column_names"] == ["score_id"]
+    assert indices["ix_calificacion_student_fecha"]["column_names"] == ["student_id", "fecha"]
+
+
+@pytest.mark.asyncio
+async def test_alta_sin_consulta_previa_y_duplicados_concurrentes(
+    test_app, professor_token, test_student, materia
+):
+    payload = {
+        "valor": 80, "fecha": date.today().isoformat(), "tipo": "parcial",
+        "student_id": test_student.user_id, "score_id": materia.score_id
+    }
+    headers = {"Authorization": f"Bearer {professor_token}"}
+    sentencias = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        if "calificacion" in statement.lower():
+            sentencias.append(statement.split()[0].upper())
+
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        event.listen(engine, "before_cursor_execute", contar)
+        try:
+            r = await client.post("/calificaciones/", json=payload, headers=headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", contar)
+        assert r.status_code == 201
+        # Sólo el INSERT (y el refresh), sin SELECT de duplicados antes
+        assert sentencias[0] == "INSERT"
+
+        respuestas = await asyncio.gather(*[
+            client.post("/calificaciones/", json={**payload, "tipo": "quiz"}, headers=headers)
+            for _ in range(5)
+        ])
+        assert sorted(r.status_code for r in respuestas) == [201, 409, 409, 409, 409]
+
+        # Cambiar el tipo a uno ya registrado también es un conflicto
+        creada, = [r.json() for r in respuestas if r.status_code == 201]
+        r = await client.patch(f"/calificaciones/{creada['calificacion_id']}", json=payload, headers=headers)
+        assert r.status_code == 409
+
+
+def test_duplicado_por_codigo_del_driver():
+    import sqlite3
+    from types import SimpleNamespace
+    from sqlalchemy.exc import IntegrityError
+    from app.routes.calificaciones import _es_duplicado
+
+    def error(orig):
+        return IntegrityError("INSERT", {}, orig)
+
+    class MySQLError(Exception):
+        pass
+
+    indice = models.CALIFICACION_UNIQUE_INDEX
+    assert _es_duplicado(error(MySQLError(1062, f"Duplicate entry '1-2-quiz' for key 'calificacion.{indice}'")))
+    # Otra clave única o una FK con "duplicate"/"unique" en el texto no cuentan
+    assert not _es_duplicado(error(MySQLError(1062, "Duplicate entry '1' for key 'PRIMARY'")))
+    assert not _es_duplicado(error(MySQLError(1452, "Cannot add or update a child row: unique_fk")))
+
+    pg = Exception("duplicate key value")
+    pg.pgcode, pg.diag = "23505", SimpleNamespace(constraint_name=indice)
+    assert _es_duplicado(error(pg))
+    pg.diag = SimpleNamespace(constraint_name="user_email_key")
+    assert not _es_duplicado(error(pg))
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (a INTEGER PRIMARY KEY, b UNIQUE)")
+    conn.execute("INSERT INTO t VALUES (1, 1)")
+    for fila, esperado in (((2, 1), True), ((1, 2), False)):
+        try:
+            conn.execute("INSERT INTO t VALUES (?, ?)", fila)
+        except sqlite3.IntegrityError as e:
+            assert _es_duplicado(error(e)) is esperado
+    conn.close()
+
+
+def test_duplicado_sqlite_sin_codigo_extendido():
+    # Python 3.10 no expone sqlite_errorcode; se reconoce por las columnas del mensaje
+    import sqlite3
+    from sqlalchemy.exc import IntegrityError
+    from app.routes.calificaciones import SQLITE_UNIQUE_MESSAGE, _es_duplicado
+
+    def error(mensaje):
+        return IntegrityError("INSERT", {}, sqlite3.IntegrityError(mensaje))
+
+    assert _es_duplicado(error(SQLITE_UNIQUE_MESSAGE))
+    assert not _es_duplicado(error("UNIQUE constraint failed: user.email"))
+    assert not _es_duplicado(error("FOREIGN KEY constraint failed"))
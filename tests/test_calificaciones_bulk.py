@@ -0,0 +1,110 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from sqlmodel import select
+from app import models
+from app.db import engine
+
+
+@pytest.fixture
+def materia(db, test_professor):
+    score = models.Score(materia="Química", professor_id=test_professor.user_id)
+    db.add(score)
+    db.commit()
+    db.refresh(score)
+    return score
+
+
+@pytest.fixture
+def alumnos(db):
+    users = [
+        models.User(
+            name_complete=f"Alumno {i}", name_user=f"alumno{i}", cedula=f"3000000{i}",
+            email=f"alumno{i}@test.com", gender="female", role="student", hashed_password="x"
+        )
+        for i in range(3)
+    ]
+    db.add_all(users)
+    db.commit()
+    return [u.user_id for u in users]
+
+
+def _item(student_id, score_id, valor=80.0, tipo="parcial"):
+    return {"student_id": student_id, "score_id": score_id, "valor": valor, "tipo": tipo}
+
+
+@pytest.mark.asyncio
+async def test_bulk_crea_y_reporta(test_app, professor_token, materia, alumnos, db):
+    payload = [_item(sid, materia.score_id) for sid in alumnos]
+    payload.append(_item(alumnos[0], materia.score_id))      # repetida en el lote
+    payload.append(_item(9999, materia.score_id))            # estudiante inexistente
+    payload.append(_item(alumnos[1], materia.score_id, 150, "quiz"))  # fuera de rango
+
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.post("/calificaciones/bulk", json=payload,
+                              headers={"Authorization": f"Bearer {professor_token}"})
+        assert r.status_code == 200
+        reporte = r.json()
+        assert reporte["creadas"] == 3
+        assert reporte["rechazadas"] == 3
+        estados = [res["estado"] for res in reporte["resultados"]]
+        assert estados == ["creada", "creada", "creada", "duplicada", "invalida", "invalida"]
+        assert all(res["calificacion_id"] for res in reporte["resultados"][:3])
+
+    assert len(db.exec(select(models.Calificacion)).all()) == 3
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert(test_app, professor_token, test_professor, materia, alumnos, db):
+    db.add(models.Calificacion(valor=50, tipo="parcial", student_id=alumnos[0],
+                               score_id=materia.score_id, professor_id=test_professor.user_id))
+    db.commit()
+
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {professor_token}"}
+        payload = [_item(alumnos[0], materia.score_id, 95.0), _item(alumnos[1], materia.score_id)]
+
+        r = await client.post("/calificaciones/bulk", json=payload, headers=headers)
+        assert [res["estado"] for res in r.json()["resultados"]] == ["duplicada", "creada"]
+
+        r = await client.post("/calificaciones/bulk", params={"upsert": True}, json=payload, headers=headers)
+        assert r.json()["actualizadas"] == 2
+
+    db.expire_all()
+    cal = db.exec(select(models.Calificacion).where(models.Calificacion.student_id == alumnos[0])).one()
+    assert cal.valor == 95.0
+
+
+@pytest.mark.asyncio
+async def test_bulk_consultas_constantes(test_app, professor_token, materia, alumnos):
+    sentencias = []
+
+    def contar(conn, cursor, statement, *args):
+        sentencias.append(statement)
+
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {professor_token}"}
+        await client.get("/usuarios/me", headers=headers)
+        tipos = ["parcial", "quiz", "tarea"]
+        payload = [_item(sid, materia.score_id, tipo=t) for sid in alumnos for t in tipos]
+        event.listen(engine, "before_cursor_execute", contar)
+        try:
+            r = await client.post("/calificaciones/bulk", json=payload, headers=headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", contar)
+        assert r.json()["creadas"] == 9
+    inserts = [s for s in sentencias if s.startswith("INSERT")]
+    assert len(inserts) == 1
+    assert len(sentencias) <= 5
+
+
+@pytest.mark.asyncio
+async def test_bulk_solo_profesores(test_app, student_token, materia, alumnos):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.post("/calificaciones/bulk", json=[_item(alumnos[0], materia.score_id)],
+                              headers={"Authorization": f"Bearer {student_token}"})
+        assert r.status_code == 403
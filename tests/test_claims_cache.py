@@ -0,0 +1,32 @@
+import time
+from datetime import timedelta
+
+from app.auth.auth import claims_cache, create_access_token, decode_token
+from app.metrics import JWT_DECODE_SECONDS
+
+
+def test_segunda_decodificacion_sale_de_cache():
+    token = create_access_token({"sub": "ana", "role": "student", "user_id": 7})
+    antes = JWT_DECODE_SECONDS.count()
+    primero = decode_token(token)
+    assert decode_token(token) is primero
+    assert primero["user_id"] == 7
+    assert JWT_DECODE_SECONDS.count() == antes + 1
+    stats = claims_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+
+def test_entrada_caduca_con_el_token(monkeypatch):
+    token = create_access_token({"sub": "ana", "role": "student", "user_id": 7}, timedelta(minutes=5))
+    assert decode_token(token) is not None
+    monkeypatch.setattr(claims_cache, "_clock", lambda: time.monotonic() + 301)
+    assert claims_cache.get(next(iter(claims_cache._data))) is None
+
+
+def test_tokens_invalidos_no_se_cachean():
+    vencido = create_access_token({"sub": "ana", "role": "student", "user_id": 7}, timedelta(seconds=-1))
+    sin_user_id = create_access_token({"sub": "ana", "role": "student"})
+    for token in (vencido, sin_user_id, "no.es.jwt"):
+        assert decode_token(token) is None
+    assert len(claims_cache) == 0
+
@@ -0,0 +1,131 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app import models
+from app.auth.auth import create_access_token
+from app.estadisticas import estadisticas_cache, histograma, percentil
+
+Tipo = models.CalificacionTipo
+
+
+def test_percentil_interpolado():
+    assert percentil([1, 2, 3, 4], 50) == 2.5
+    assert percentil([1, 2, 3, 4], 25) == 1.75
+    assert percentil([7.0], 90) == 7.0
+
+
+def test_histograma_incluye_100_en_el_ultimo_tramo():
+    tramos = histograma([0, 9.9, 10, 55, 100])
+    assert [t["cantidad"] for t in tramos] == [2, 1, 0, 0, 0, 1, 0, 0, 0, 1]
+    assert (tramos[-1]["desde"], tramos[-1]["hasta"]) == (90.0, 100.0)
+
+
+@pytest.fixture
+def materia(db, test_professor, test_student):
+    score = models.Score(materia="Estadística", professor_id=test_professor.user_id)
+    db.add(score)
+    db.commit()
+    notas = {Tipo.PARCIAL: [60, 70, 80, 90], Tipo.QUIZ: [100, 50]}
+    db.add_all([
+        models.Calificacion(valor=valor, tipo=tipo, student_id=student_id, score_id=score.score_id,
+                            professor_id=test_professor.user_id)
+        for tipo, valores in notas.items()
+        for student_id, valor in enumerate(valores, start=100)
+    ])
+    db.commit()
+    return score
+
+
+@pytest.mark.asyncio
+async def test_estadisticas_por_tipo_y_cache(test_app, materia, test_student, professor_token):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {professor_token}"}
+        r = await client.get(f"/materias/{materia.score_id}/estadisticas", headers=headers)
+        assert r.status_code == 200
+        datos = r.json()
+        assert datos["materia"] == "Estadística"
+        general = datos["general"]
+        assert (general["cantidad"], general["promedio"], general["mediana"]) == (6, 75.0, 75.0)
+        assert (general["minimo"], general["maximo"]) == (50.0, 100.0)
+        assert sum(t["cantidad"] for t in general["histograma"]) == 6
+
+        parcial, = [g for g in datos["por_tipo"] if g["tipo"] == "parcial"]
+        assert parcial["promedio"] == 75.0
+        assert parcial["desviacion"] == 11.18  # poblacional de 60, 70, 80, 90
+        assert parcial["percentiles"] == {"p10": 63.0, "p25": 67.5, "p50": 75.0, "p75": 82.5, "p90": 87.0}
+
+        # Segunda petición desde la caché; con el ETag, 304
+        r2 = await client.get(f"/materias/{materia.score_id}/estadisticas", headers=headers)
+        assert r2.json() == datos and estadisticas_cache.stats()["hits"] == 1
+        r3 = await client.get(f"/materias/{materia.score_id}/estadisticas",
+                              headers={**headers, "If-None-Match": r.headers["ETag"]})
+        assert r3.status_code == 304
+
+        # Una calificación nueva invalida la entrada
+        r = await client.post("/calificaciones/", headers=headers, json={
+            "valor": 0, "tipo": "quiz", "student_id": test_student.user_id, "score_id": materia.score_id
+        })
+        assert r.status_code == 201
+        r = await client.get(f"/materias/{materia.score_id}/estadisticas", headers=headers)
+        assert r.json()["general"]["cantidad"] == 7
+        assert r.json()["general"]["histograma"][0]["cantidad"] == 1
+
+
+@pytest.mark.asyncio
+async def test_permisos_y_materia_sin_notas(test_app, db, materia, test_professor, student_token, admin_token):
+    vacia = models.Score(materia="Vacía", professor_id=test_professor.user_id)
+    db.add(vacia)
+    db.commit()
+    otro = models.User(name_complete="Otro Profesor", name_user="otro_prof", cedula="55555555",
+                       email="otro@test.com", gender="female", role="professor", hashed_password="x",
+                       specialization="Física")
+    db.add(otro)
+    db.commit()
+    otro_token = create_access_token({"sub": otro.name_user, "role": "professor", "user_id": otro.user_id})
+
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        url = f"/materias/{materia.score_id}/estadisticas"
+        assert (await client.get(url, headers={"Authorization": f"Bearer {student_token}"})).status_code == 403
+        assert (await client.get(url, headers={"Authorization": f"Bearer {otro_token}"})).status_code == 403
+        assert (await client.get("/materias/999/estadisticas",
+                                 headers={"Authorization": f"Bearer {admin_token}"})).status_code == 404
+        r = await client.get(f"/materias/{vacia.score_id}/estadisticas", headers={"Authorization": f"Bearer {admin_token}"})
+        assert r.status_code == 200
+        assert r.json()["general"] is None and r.json()["por_tipo"] == []
+
+
+@pytest.mark.asyncio
+async def test_sin_cache_con_varios_workers(test_app, monkeypatch, materia, professor_token):
+    from app.config import settings
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 2)
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {professor_token}"}
+        for _ in range(2):
+            r = await client.get(f"/materias/{materia.score_id}/estadisticas", headers=headers)
+            assert r.status_code == 200 and "etag" not in r.headers
+        assert estadisticas_cache.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_una_sola_consulta(materia):
+    from sqlalchemy import event
+    from app.db import engine, open_session
+    from app.estadisticas import calcular_estadisticas
+
+    consultas = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        if "calificacion" in statement.lower():
+            consultas.append(statement)
+
+    event.listen(engine, "before_cursor_execute", contar)
+    try:
+        async with open_session() as session:
+            datos = await calcular_estadisticas(session, materia.score_id, materia.materia)
+    finally:
+        event.remove(engine, "before_cursor_execute", contar)
+    # Grupos y total de la misma instantánea: sumar los grupos da el total
+    assert len(consultas) == 1
+    assert sum(g["cantidad"] for g in datos["por_tipo"]) == datos["general"]["cantidad"] == 6
@@ -0,0 +1,93 @@
+import pytest
+from datetime import date
+from httpx import AsyncClient, ASGITransport
+from app import models
+from app.etag import etag_matches
+
+
+@pytest.fixture
+def materia(db, test_professor):
+    score = models.Score(materia="Química", professor_id=test_professor.user_id)
+    db.add(score)
+    db.commit()
+    db.refresh(score)
+    return score
+
+
+def test_comparacion_debil():
+    assert etag_matches('W/"abc-1"', 'W/"abc-1"')
+    assert etag_matches('"abc-1"', 'W/"abc-1"')
+    assert etag_matches('W/"x-0", W/"abc-1"', 'W/"abc-1"')
+    assert etag_matches("*", 'W/"abc-1"')
+    assert not etag_matches('W/"abc-2"', 'W/"abc-1"')
+    assert not etag_matches(None, 'W/"abc-1"')
+
+
+@pytest.mark.asyncio
+async def test_listado_materias_304_hasta_que_cambia(test_app, professor_token, test_professor, materia):
+    transport = ASGITransport(app=test_app)
+    headers = {"Authorization": f"Bearer {professor_token}"}
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/materias/")
+        etag = r.headers["etag"]
+        assert etag.startswith('W/"')
+
+        r = await client.get("/materias/", headers={"If-None-Match": etag})
+        assert r.status_code == 304
+        assert r.content == b""
+        assert r.headers["etag"] == etag
+
+        r = await client.patch(f"/materias/{materia.score_id}", headers=headers,
+                               json={"materia": "Química II", "professor_id": test_professor.user_id})
+        assert r.status_code == 200
+
+        r = await client.get("/materias/", headers={"If-None-Match": etag})
+        assert r.status_code == 200
+        assert r.headers["etag"] != etag
+        assert r.json()[0]["materia"] == "Química II"
+
+
+@pytest.mark.asyncio
+async def test_calificaciones_invalidan_sus_listas(test_app, professor_token, student_token,
+                                                   test_student, materia):
+    transport = ASGITransport(app=test_app)
+    prof = {"Authorization": f"Bearer {professor_token}"}
+    alumno = {"Authorization": f"Bearer {student_token}"}
+    urls = [
+        f"/materias/{materia.score_id}/calificaciones",
+        f"/calificaciones/por_estudiante/{test_student.user_id}",
+    ]
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        etags = {}
+        for url in urls:
+            r = await client.get(url, headers=alumno)
+            assert r.status_code == 200 and r.json() == []
+            etags[url] = r.headers["etag"]
+            r = await client.get(url, headers={**alumno, "If-None-Match": etags[url]})
+            assert r.status_code == 304
+
+        # Sin autenticación no hay 304 aunque el ETag coincida
+        r = await client.get(urls[0], headers={"If-None-Match": etags[urls[0]]})
+        assert r.status_code == 401
+
+        r = await client.post("/calificaciones/", headers=prof, json={
+            "valor": 15, "fecha": date.today().isoformat(), "tipo": "quiz",
+            "student_id": test_student.user_id, "score_id": materia.score_id
+        })
+        assert r.status_code == 201
+
+        for url in urls:
+            r = await client.get(url, headers={**alumno, "If-None-Match": etags[url]})
+            assert r.status_code == 200
+            assert len(r.json()) == 1
+
+
+@pytest.mark.asyncio
+async def test_sin_etag_con_varios_workers(test_app, monkeypatch, materia):
+    from app.config import settings
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 4)
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/materias/", headers={"If-None-Match": "*"})
+        assert r.status_code == 200
+        assert "etag" not in r.headers
@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+import pytest
+from datetime import date
+from httpx import AsyncClient, ASGITransport
+from app import models
+
+
+@pytest.fixture
+def calificaciones(db, test_student, test_professor):
+    scores = [models.Score(materia=m, professor_id=test_professor.user_id) for m in ("Cálculo", "Física")]
+    db.add_all(scores)
+    db.commit()
+    for score in scores:
+        for tipo in (models.CalificacionTipo.PARCIAL, models.CalificacionTipo.QUIZ):
+            db.add(models.Calificacion(
+                valor=80, tipo=tipo, fecha=date(2025, 3, 1),
+                student_id=test_student.user_id,
+                score_id=score.score_id,
+                professor_id=test_professor.user_id
+            ))
+    db.commit()
+    return scores
+
+
+@pytest.mark.asyncio
+async def test_exportar_calificaciones_ndjson(test_app, professor_token, calificaciones):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get(
+            "/calificaciones/exportar",
+            params={"score_id": calificaciones[0].score_id},
+            headers={"Authorization": f"Bearer {professor_token}"}
+        )
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        filas = [json.loads(line) for line in r.text.splitlines()]
+        assert len(filas) == 2
+        assert {f["tipo"] for f in filas} == {"parcial", "quiz"}
+        assert filas[0]["fecha"] == "2025-03-01"
+
+
+@pytest.mark.asyncio
+async def test_exportar_calificaciones_csv(test_app, admin_token, calificaciones):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get(
+            "/calificaciones/exportar",
+            params={"formato": "csv"},
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert r.status_code == 200
+        assert "attachment" in r.headers["content-disposition"]
+        filas = list(csv.DictReader(io.StringIO(r.text)))
+        assert len(filas) == 4
+        assert filas[0]["tipo"] == "parcial"
+
+
+@pytest.mark.asyncio
+async def test_exportar_calificaciones_estudiante_prohibido(test_app, student_token):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/calificaciones/exportar", headers={"Authorization": f"Bearer {student_token}"})
+        assert r.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_exportar_usuarios_sin_password(test_app, admin_token, test_student):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/usuarios/exportar", headers={"Authorization": f"Bearer {admin_token}"})
+        assert r.status_code == 200
+        filas = [json.loads(line) for line in r.text.splitlines()]
+        assert {f["name_user"] for f in filas} == {"admin_test", "student_test"}
+        assert all("hashed_password" not in f for f in filas)
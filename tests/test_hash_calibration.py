@@ -0,0 +1,54 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlmodel import select
+from app import models
+from app.auth.hashing import calibrate_rounds
+from app.config import settings
+
+barato = models.pwd_context.copy(bcrypt__default_rounds=4, bcrypt__min_rounds=4, bcrypt__max_rounds=4)
+
+
+def test_calibracion_elige_el_mayor_coste_que_cabe():
+    medidas = []
+
+    def medir(rounds):
+        medidas.append(rounds)
+        return 0.01 * 2 ** (rounds - 10)  # 10 ms con 10 rondas, se duplica por ronda
+
+    assert calibrate_rounds(50, medir)[0] == 12
+    assert medidas == [10, 11, 12, 13]  # para en cuanto se pasa del presupuesto
+    assert calibrate_rounds(5, medir)[0] == 10
+
+
+def test_hashes_con_otro_coste_necesitan_rehash():
+    viejo = barato.hash("clave")
+    assert models.pwd_context.needs_update(viejo)
+    assert models.pwd_context.needs_update(viejo.replace("$04$", f"${settings.BCRYPT_ROUNDS + 1:02d}$", 1))
+    assert not models.pwd_context.needs_update(
+        viejo.replace("$04$", f"${settings.BCRYPT_ROUNDS:02d}$", 1)
+    )
+
+
+@pytest.mark.asyncio
+async def test_login_rehashea_con_el_coste_actual(test_app, db):
+    user = models.User(name_complete="Ana", name_user="ana", cedula="12345678", email="ana@x.com",
+                       gender="female", role="student", career="Sistemas",
+                       hashed_password=barato.hash("clave"))
+    db.add(user)
+    db.commit()
+
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.post("/token", data={"username": "ana", "password": "clave"})
+        assert r.status_code == 200
+
+        db.expire_all()
+        nuevo = db.exec(select(models.User.hashed_password).where(models.User.user_id == user.user_id)).one()
+        assert nuevo.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+        assert models.pwd_context.verify("clave", nuevo)
+
+        # Con el coste al día no se vuelve a escribir
+        r = await client.post("/token", data={"username": "ana", "password": "clave"})
+        assert r.status_code == 200
+        db.expire_all()
+        assert db.exec(select(models.User.hashed_password).where(models.User.user_id == user.user_id)).one() == nuevo
@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app.auth.hashing import PasswordHasher
+
+
+@pytest.mark.asyncio
+async def test_hash_y_verify_en_pool():
+    hasher = PasswordHasher(max_workers=2)
+    try:
+        hashed = await hasher.hash("secreto123")
+        assert hashed != "secreto123"
+        assert await hasher.verify("secreto123", hashed)
+        assert not await hasher.verify("otro", hashed)
+
+        stats = hasher.stats()
+        assert stats["workers"] == 2
+        assert stats["hash"]["count"] == 1
+        assert stats["verify"]["count"] == 2
+        assert stats["queue_depth"] == 0
+        assert stats["in_progress"] == 0
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hash_concurrente_no_bloquea_event_loop():
+    hasher = PasswordHasher(max_workers=1)
+    try:
+        tareas = [asyncio.create_task(hasher.hash(f"pass{i}")) for i in range(3)]
+        # El loop sigue respondiendo mientras el pool trabaja
+        await asyncio.sleep(0)
+        assert hasher.stats()["queue_depth"] + hasher.stats()["in_progress"] >= 1
+        hashes = await asyncio.gather(*tareas)
+        assert len(set(hashes)) == 3
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_stats_hashing_solo_admin(test_app, admin_token, student_token):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/sistema/hashing", headers={"Authorization": f"Bearer {admin_token}"})
+        assert r.status_code == 200
+        assert "queue_depth" in r.json()
+
+        r = await client.get("/sistema/hashing", headers={"Authorization": f"Bearer {student_token}"})
+        assert r.status_code == 403
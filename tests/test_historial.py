@@ -0,0 +1,80 @@
+import pytest
+from datetime import date
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from app import models
+from app.db import engine
+
+
+@pytest.fixture
+def historial(db, test_student, test_professor):
+    calculo = models.Score(materia="Cálculo", professor_id=test_professor.user_id)
+    fisica = models.Score(materia="Física", professor_id=test_professor.user_id)
+    db.add_all([calculo, fisica])
+    db.commit()
+    notas = [
+        (calculo, models.CalificacionTipo.PARCIAL, 60, date(2025, 2, 1)),
+        (calculo, models.CalificacionTipo.QUIZ, 90, date(2025, 4, 1)),
+        (fisica, models.CalificacionTipo.PARCIAL, 75, date(2025, 3, 1)),
+    ]
+    for score, tipo, valor, fecha in notas:
+        db.add(models.Calificacion(
+            valor=valor, tipo=tipo, fecha=fecha,
+            student_id=test_student.user_id,
+            score_id=score.score_id,
+            professor_id=test_professor.user_id
+        ))
+    db.commit()
+    return calculo, fisica
+
+
+@pytest.mark.asyncio
+async def test_historial_agregado(test_app, student_token, test_student, historial):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get(f"/usuarios/{test_student.user_id}/historial",
+                             headers={"Authorization": f"Bearer {student_token}"})
+        assert r.status_code == 200
+        data = {d["materia"]: d for d in r.json()}
+        assert sorted(data["Cálculo"]["notas"]) == [60.0, 90.0]
+        assert data["Cálculo"]["promedio"] == 75.0
+        assert data["Cálculo"]["cantidad"] == 2
+        assert data["Cálculo"]["minimo"] == 60.0
+        assert data["Cálculo"]["maximo"] == 90.0
+        assert data["Física"]["notas"] == [75.0]
+
+
+@pytest.mark.asyncio
+async def test_historial_filtros(test_app, student_token, test_student, historial):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {student_token}"}
+        url = f"/usuarios/{test_student.user_id}/historial"
+
+        r = await client.get(url, params={"tipo": "parcial"}, headers=headers)
+        assert {d["materia"]: d["notas"] for d in r.json()} == {"Cálculo": [60.0], "Física": [75.0]}
+
+        r = await client.get(url, params={"desde": "2025-02-15", "hasta": "2025-03-31"}, headers=headers)
+        assert [d["materia"] for d in r.json()] == ["Física"]
+
+
+@pytest.mark.asyncio
+async def test_historial_consultas_constantes(test_app, student_token, test_student, historial):
+    sentencias = []
+
+    def contar(conn, cursor, statement, *args):
+        sentencias.append(statement)
+
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {student_token}"}
+        # Primera petición para calentar la caché del usuario autenticado
+        await client.get(f"/usuarios/{test_student.user_id}/historial", headers=headers)
+        event.listen(engine, "before_cursor_execute", contar)
+        try:
+            r = await client.get(f"/usuarios/{test_student.user_id}/historial", headers=headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", contar)
+        assert r.status_code == 200
+    # Una consulta para el estudiante y otra para el agregado
+    assert len(sentencias) == 2
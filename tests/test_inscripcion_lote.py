@@ -0,0 +1,109 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event, insert
+from sqlmodel import select
+from app import models
+from app.db import engine
+
+
+@pytest.fixture
+def materia(db, test_professor):
+    score = models.Score(materia="Biología", professor_id=test_professor.user_id)
+    db.add(score)
+    db.commit()
+    db.refresh(score)
+    return score
+
+
+@pytest.fixture
+def alumnos(db):
+    users = [
+        models.User(
+            name_complete=f"Alumno {i}", name_user=f"alumno{i}", cedula=f"4000000{i}",
+            email=f"alumno{i}@test.com", gender="male", role="student", hashed_password="x"
+        )
+        for i in range(3)
+    ]
+    db.add_all(users)
+    db.commit()
+    return [u.user_id for u in users]
+
+
+@pytest.mark.asyncio
+async def test_inscripcion_lote(test_app, professor_token, test_professor, materia, alumnos, db):
+    db.add(models.StudentScoreLink(student_id=alumnos[0], score_id=materia.score_id))
+    db.commit()
+
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.post(
+            f"/materias/{materia.score_id}/inscribir_lote",
+            json={"student_ids": alumnos + [test_professor.user_id, 9999, alumnos[1]]},
+            headers={"Authorization": f"Bearer {professor_token}"}
+        )
+        assert r.status_code == 200
+        data = r.json()
+        assert data["inscritos"] == alumnos[1:]
+        assert data["ya_inscritos"] == [alumnos[0]]
+        assert data["invalidos"] == [test_professor.user_id, 9999]
+
+    links = db.exec(
+        select(models.StudentScoreLink.student_id).where(models.StudentScoreLink.score_id == materia.score_id)
+    ).all()
+    assert sorted(links) == alumnos
+
+
+@pytest.mark.asyncio
+async def test_inscripcion_lote_materia_inexistente(test_app, professor_token, alumnos):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.post(
+            "/materias/9999/inscribir_lote",
+            json={"student_ids": alumnos},
+            headers={"Authorization": f"Bearer {professor_token}"}
+        )
+        assert r.status_code == 404
+
+
+@pytest.fixture
+def inscripcion_simultanea():
+    """Inscribe desde otra conexión justo antes del INSERT de la petición, como haría una petición concurrente"""
+    pendientes = []
+
+    def antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+        if pendientes and statement.lower().startswith("insert into studentscorelink"):
+            filas = pendientes.copy()
+            pendientes.clear()
+            with engine.begin() as otra:
+                otra.execute(insert(models.StudentScoreLink), filas)
+
+    event.listen(engine, "before_cursor_execute", antes_de_ejecutar)
+    yield pendientes
+    event.remove(engine, "before_cursor_execute", antes_de_ejecutar)
+
+
+@pytest.mark.asyncio
+async def test_inscripcion_lote_simultanea(test_app, professor_token, materia, alumnos, inscripcion_simultanea):
+    inscripcion_simultanea.append({"student_id": alumnos[1], "score_id": materia.score_id})
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.post(
+            f"/materias/{materia.score_id}/inscribir_lote",
+            json={"student_ids": alumnos},
+            headers={"Authorization": f"Bearer {professor_token}"}
+        )
+        assert r.status_code == 200
+        assert r.json() == {"inscritos": [alumnos[0], alumnos[2]], "ya_inscritos": [alumnos[1]], "invalidos": []}
+
+
+@pytest.mark.asyncio
+async def test_inscripcion_individual_simultanea(test_app, professor_token, materia, alumnos, inscripcion_simultanea):
+    inscripcion_simultanea.append({"student_id": alumnos[0], "score_id": materia.score_id})
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.post(
+            f"/materias/{materia.score_id}/inscribir",
+            params={"student_id": alumnos[0]},
+            headers={"Authorization": f"Bearer {professor_token}"}
+        )
+        assert r.status_code == 409
@@ -0,0 +1,136 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app import models
+from app.db import open_session
+from app.leaderboard import Leaderboards, MateriaRanking, leaderboards
+
+Tipo = models.CalificacionTipo
+
+
+def test_ranking_incremental_y_empates():
+    ranking = MateriaRanking({1: (150.0, 2), 2: (90.0, 1), 3: (80.0, 1)})
+    assert [e["student_id"] for e in ranking.top(3)] == [2, 3, 1]
+    assert ranking.rank(1)["posicion"] == 3
+
+    ranking.apply(1, 100.0, 1)  # 250 / 3 ≈ 83.33
+    assert ranking.rank(1) == {"posicion": 2, "student_id": 1, "promedio": 83.333333, "cantidad": 3}
+    ranking.apply(3, 10.0, 0)  # empata con el estudiante 2
+    assert [e["posicion"] for e in ranking.top(3)] == [1, 1, 3]
+    assert ranking.rank(3)["posicion"] == 1
+
+    ranking.apply(2, -90.0, -1)
+    assert ranking.rank(2) is None and len(ranking) == 2
+
+
+@pytest.mark.asyncio
+async def test_registro_acotado_y_caducidad(db):
+    ahora = [0.0]
+    registro = Leaderboards(maxsize=1, ttl=60, clock=lambda: ahora[0])
+    db.add(models.Calificacion(valor=70, tipo=Tipo.QUIZ, student_id=1, score_id=1, professor_id=1))
+    db.commit()
+
+    async with open_session() as session:
+        assert len(await registro.get(session, 1)) == 1
+        await registro.get(session, 1)
+        assert registro.stats()["hits"] == 1
+
+        registro.apply(1, 2, 90.0, 1)  # cargado: se aplica sin consultar
+        assert (await registro.get(session, 1)).rank(2)["posicion"] == 1
+
+        await registro.get(session, 2)  # expulsa la materia 1
+        assert registro.stats()["materias"] == 1
+        assert len(await registro.get(session, 1)) == 1  # reconstruida: sin la nota aplicada a mano
+
+        ahora[0] = 61
+        await registro.get(session, 1)
+        assert registro.stats()["misses"] == 4
+
+
+@pytest.fixture
+def materia(db, test_professor, test_student):
+    score = models.Score(materia="Ranking", professor_id=test_professor.user_id)
+    db.add(score)
+    db.commit()
+    db.add_all([
+        models.Calificacion(valor=valor, tipo=Tipo.PARCIAL, student_id=student_id, score_id=score.score_id,
+                            professor_id=test_professor.user_id)
+        for student_id, valor in ((100, 95), (101, 80), (test_student.user_id, 70))
+    ])
+    db.commit()
+    return score
+
+
+@pytest.mark.asyncio
+async def test_ranking_se_mantiene_con_las_escrituras(test_app, materia, test_student, professor_token, student_token):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {professor_token}"}
+        url = f"/materias/{materia.score_id}/ranking"
+        r = await client.get(url, headers=headers, params={"limit": 2})
+        assert r.status_code == 200
+        assert r.json()["total"] == 3
+        assert [e["student_id"] for e in r.json()["top"]] == [100, 101]
+
+        propio = f"{url}/{test_student.user_id}"
+        r = await client.get(propio, headers={"Authorization": f"Bearer {student_token}"})
+        assert r.json() == {"posicion": 3, "student_id": test_student.user_id, "promedio": 70.0, "cantidad": 1}
+
+        # Alta, modificación y baja actualizan el ranking cargado sin reconstruirlo
+        r = await client.post("/calificaciones/", headers=headers, json={
+            "valor": 100, "tipo": "quiz", "student_id": test_student.user_id, "score_id": materia.score_id
+        })
+        assert r.status_code == 201
+        nueva = r.json()["calificacion_id"]
+        assert (await client.get(propio, headers=headers)).json()["posicion"] == 2  # promedio 85
+
+        r = await client.patch(f"/calificaciones/{nueva}", headers=headers, json={
+            "valor": 40, "tipo": "quiz", "student_id": test_student.user_id, "score_id": materia.score_id
+        })
+        assert r.status_code == 200
+        assert (await client.get(propio, headers=headers)).json()["promedio"] == 55.0
+
+        assert (await client.delete(f"/calificaciones/{nueva}", headers=headers)).status_code == 204
+        assert (await client.get(propio, headers=headers)).json()["promedio"] == 70.0
+        assert leaderboards.stats()["misses"] == 1
+
+        # El lote invalida la materia y la siguiente lectura la reconstruye
+        r = await client.post("/calificaciones/bulk", headers=headers, json=[
+            {"valor": 100, "tipo": "quiz", "student_id": test_student.user_id, "score_id": materia.score_id}
+        ])
+        assert r.json()["creadas"] == 1
+        assert (await client.get(propio, headers=headers)).json()["posicion"] == 2
+        assert leaderboards.stats()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_ranking_permisos(test_app, materia, test_student, student_token, admin_token):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        estudiante = {"Authorization": f"Bearer {student_token}"}
+        url = f"/materias/{materia.score_id}/ranking"
+        assert (await client.get(url, headers=estudiante)).status_code == 403
+        assert (await client.get(f"{url}/100", headers=estudiante)).status_code == 403
+
+        admin = {"Authorization": f"Bearer {admin_token}"}
+        assert (await client.get(f"{url}/100", headers=admin)).json()["posicion"] == 1
+        assert (await client.get(f"{url}/999", headers=admin)).status_code == 404
+        assert (await client.get("/materias/999/ranking", headers=admin)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_ranking_sin_memoria_con_varios_workers(test_app, monkeypatch, db, materia, test_professor,
+                                                      professor_token):
+    from app.config import settings
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 4)
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {professor_token}"}
+        url = f"/materias/{materia.score_id}/ranking"
+        assert (await client.get(url, headers=headers)).json()["top"][0]["student_id"] == 100
+
+        # Escritura hecha por otro worker: se ve en la siguiente lectura
+        db.add(models.Calificacion(valor=100, tipo=Tipo.PARCIAL, student_id=102, score_id=materia.score_id,
+                                   professor_id=test_professor.user_id))
+        db.commit()
+        assert (await client.get(url, headers=headers)).json()["top"][0]["student_id"] == 102
+    assert leaderboards.stats()["materias"] == 0 and leaderboards.stats()["hits"] == 0
@@ -0,0 +1,91 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app import models
+from app.auth.hashing import hasher
+from app.auth.throttle import LoginThrottle, MemoryBucketStore, login_throttle
+
+
+def test_bucket_rafaga_y_recarga():
+    now = [0.0]
+    store = MemoryBucketStore(max_keys=2, clock=lambda: now[0])
+    assert [store.take("a", 2, 0.5) for _ in range(3)] == [0, 0, 2.0]
+    now[0] = 1.0
+    assert store.take("a", 2, 0.5) == 1.0  # sólo ha recargado medio token
+    now[0] = 3.0
+    assert store.take("a", 2, 0.5) == 0
+
+    store.take("b", 2, 0.5)
+    store.take("c", 2, 0.5)
+    assert len(store) == 2  # "a" era el menos usado
+
+
+def test_ip_bloqueada_no_gasta_cupo_del_usuario():
+    throttle = LoginThrottle(MemoryBucketStore(100), user_burst=1, user_per_minute=1,
+                             ip_burst=1, ip_per_minute=1)
+    assert throttle.check("ana", "10.0.0.1") is None
+    assert throttle.check("Ana ", "10.0.0.1") == pytest.approx(60)
+    assert throttle.check("ana", "10.0.0.2") is not None  # mismo usuario normalizado
+    assert throttle.stats()["rejected"] == {"ip": 1, "user": 1}
+
+
+@pytest.fixture
+def usuario(db):
+    user = models.User(name_complete="Ana", name_user="ana", cedula="12345678", email="ana@x.com",
+                       gender="female", role="student", career="Sistemas",
+                       hashed_password=models.pwd_context.hash("clave"))
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_429_antes_de_verificar(test_app, usuario, monkeypatch):
+    monkeypatch.setattr(login_throttle, "user_burst", 3)
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        for _ in range(3):
+            r = await client.post("/token", data={"username": "ana", "password": "mala"})
+            assert r.status_code == 401
+        verificaciones = hasher.stats()["verify"]["count"]
+
+        r = await client.post("/token", data={"username": "ana", "password": "clave"})
+        assert r.status_code == 429
+        assert int(r.headers["Retry-After"]) >= 1
+        assert hasher.stats()["verify"]["count"] == verificaciones
+
+        # Otros usuarios desde la misma IP siguen pudiendo entrar
+        r = await client.post("/token", data={"username": "otro", "password": "x"})
+        assert r.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_limite_por_ip(test_app, db, monkeypatch):
+    monkeypatch.setattr(login_throttle, "ip_burst", 2)
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        codigos = [(await client.post("/token", data={"username": f"u{i}", "password": "x"})).status_code
+                   for i in range(3)]
+    assert codigos == [401, 401, 429]
+
+
+@pytest.mark.asyncio
+async def test_verificaciones_saturadas(test_app, usuario, monkeypatch):
+    monkeypatch.setattr(hasher, "max_pending_verify", 1)
+    monkeypatch.setattr(hasher, "_verify_pendientes", 1)
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.post("/token", data={"username": "ana", "password": "clave"})
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+
+@pytest.mark.parametrize("variable, valor", [
+    ("LOGIN_RATE_USER_PER_MINUTE", "0"),
+    ("LOGIN_RATE_IP_PER_MINUTE", "-1"),
+    ("LOGIN_RATE_IP_BURST", "0"),
+])
+def test_limites_no_validos(monkeypatch, variable, valor):
+    from app.config import Settings
+    monkeypatch.setenv(variable, valor)
+    with pytest.raises(ValueError):
+        Settings()
@@ -0,0 +1,104 @@
+import threading
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app.metrics import MetricsRegistry, HTTP_REQUESTS, JWT_DECODE_SECONDS
+
+
+def test_contadores_por_hilo_se_suman_al_exportar():
+    registry = MetricsRegistry()
+    contador = registry.counter("demo_total", "demo", ("kind",))
+    histograma = registry.histogram("demo_seconds", "demo", buckets=(0.1, 1.0))
+
+    def trabajo():
+        for _ in range(1000):
+            contador.inc("a")
+            histograma.observe(0.5)
+
+    hilos = [threading.Thread(target=trabajo) for _ in range(4)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    texto = registry.render()
+    assert 'demo_total{kind="a"} 4000' in texto
+    assert 'demo_seconds_bucket{le="0.1"} 0' in texto
+    assert 'demo_seconds_bucket{le="1.0"} 4000' in texto
+    assert 'demo_seconds_bucket{le="+Inf"} 4000' in texto
+    assert "demo_seconds_count 4000" in texto
+    assert "# TYPE demo_seconds histogram" in texto
+
+
+@pytest.mark.asyncio
+async def test_endpoint_metrics(test_app, student_token, test_student):
+    ruta = ("GET", "/usuarios/{user_id}", "200")
+    antes = HTTP_REQUESTS.value(*ruta)
+    decodes = JWT_DECODE_SECONDS.count()
+
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get(
+            f"/usuarios/{test_student.user_id}",
+            headers={"Authorization": f"Bearer {student_token}"}
+        )
+        assert r.status_code == 200
+        await client.get("/no-existe")
+
+        r = await client.get("/metrics")
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+        texto = r.text
+
+    assert HTTP_REQUESTS.value(*ruta) == antes + 1
+    assert JWT_DECODE_SECONDS.count() > decodes
+    # La ruta se etiqueta con la plantilla, no con el ID concreto
+    assert 'route="/usuarios/{user_id}"' in texto
+    assert f'route="/usuarios/{test_student.user_id}"' not in texto
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"}' in texto
+    assert 'db_pool_checked_out{pool="primary"}' in texto
+    assert 'db_pool_checkout_wait_seconds_count{pool="primary"}' in texto
+
+
+@pytest.mark.asyncio
+async def test_tiempo_bcrypt_en_login(test_app, db):
+    from app import models
+    from app.metrics import BCRYPT_SECONDS
+    user = models.User(
+        name_complete="Login Test", name_user="login_metrics", cedula="77777777",
+        email="login@test.com", gender="male", role="student",
+        hashed_password=models.pwd_context.hash("secreto")
+    )
+    db.add(user)
+    db.commit()
+    antes = BCRYPT_SECONDS.count("verify")
+
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.post("/token", data={"username": "login_metrics", "password": "secreto"})
+        assert r.status_code == 200
+
+    assert BCRYPT_SECONDS.count("verify") == antes + 1
+
+
+def test_shards_de_hilos_terminados_se_acumulan():
+    registry = MetricsRegistry()
+    contador = registry.counter("hilos_total", "demo")
+    histograma = registry.histogram("hilos_seconds", "demo", buckets=(1.0,))
+
+    def trabajo():
+        for _ in range(10):
+            contador.inc()
+            histograma.observe(0.5)
+
+    for _ in range(20):
+        hilos = [threading.Thread(target=trabajo) for _ in range(10)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        # Los shards de los hilos ya terminados pasan al total base
+        assert len(contador._shards) <= 1 and len(histograma._shards) <= 1
+
+    assert contador.value() == 2000
+    assert histograma.totals() == (2000, 1000.0)
+    assert 'hilos_seconds_bucket{le="1.0"} 2000' in registry.render()
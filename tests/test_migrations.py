@@ -0,0 +1,69 @@
+import pytest
+from datetime import date
+from sqlalchemy import create_engine, inspect, text
+from app import migrations, models
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migraciones.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_desde_cero_e_idempotente(engine):
+    assert migrations.current_version(engine) is None
+    with pytest.raises(migrations.SchemaOutdatedError):
+        migrations.check_schema(engine)
+
+    assert migrations.upgrade(engine) == [m.VERSION for m in migrations.MIGRATIONS]
+    assert migrations.current_version(engine) == migrations.LATEST_VERSION
+    assert {"user", "score", "calificacion", "schema_version"} <= set(inspect(engine).get_table_names())
+    migrations.check_schema(engine)
+
+    assert migrations.upgrade(engine) == []
+    assert all(m["applied_at"] is not None for m in migrations.status(engine))
+
+
+def test_base_anterior_a_las_migraciones(engine):
+    # Tablas creadas con create_all antes de existir los índices de calificacion
+    models.SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for index in models.Calificacion.__table__.indexes:
+            conn.execute(text(f"DROP INDEX {index.name}"))
+
+    assert migrations.upgrade(engine, target=1) == [1]
+    assert migrations.status(engine)[1]["applied_at"] is None
+
+    assert migrations.upgrade(engine) == [2, 3]
+    nombres = {i["name"] for i in inspect(engine).get_indexes("calificacion")}
+    assert {i.name for i in models.Calificacion.__table__.indexes} <= nombres
+
+
+def test_indice_unico_con_duplicados_previos(engine):
+    models.SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_calificacion_student_score_tipo"))
+        for valor in (10, 20):
+            conn.execute(models.Calificacion.__table__.insert().values(
+                valor=valor, fecha=date.today(), tipo=models.CalificacionTipo.QUIZ,
+                student_id=1, score_id=1, professor_id=2
+            ))
+
+    with pytest.raises(RuntimeError, match="repetidas"):
+        migrations.upgrade(engine)
+    assert migrations.current_version(engine) == 1
+
+
+def test_token_version_en_usuarios_existentes(engine):
+    models.SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text('ALTER TABLE "user" DROP COLUMN token_version'))
+        conn.execute(text(
+            "INSERT INTO \"user\" (name_complete, name_user, cedula, email, gender, role, hashed_password) "
+            "VALUES ('Ana', 'ana', '1234567', 'ana@x.com', 'FEMALE', 'STUDENT', 'h')"
+        ))
+
+    migrations.upgrade(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT token_version FROM "user"')).scalar() == 0
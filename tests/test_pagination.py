@@ -0,0 +1,117 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app import models
+from app.pagination import encode_cursor, decode_cursor
+
+
+@pytest.fixture
+def materias(db, test_professor):
+    scores = [models.Score(materia=f"Materia {i}", professor_id=test_professor.user_id) for i in range(5)]
+    db.add_all(scores)
+    db.commit()
+    return [s.score_id for s in scores]
+
+
+def test_cursor_ida_y_vuelta():
+    assert decode_cursor(encode_cursor(42)) == 42
+    assert decode_cursor(encode_cursor("ana_perez"), str) == "ana_perez"
+
+
+@pytest.mark.asyncio
+async def test_cursor_invalido(test_app):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/materias/", params={"cursor": "%%%no-es-cursor"})
+        assert r.status_code == 400
+        # JSON válido pero de otro tipo que la columna clave
+        for valor in ([1], {"a": 1}, None, "texto", True, 10 ** 30, -2 ** 63 - 1):
+            r = await client.get("/calificaciones/", params={"cursor": encode_cursor(valor)})
+            assert r.status_code == 400, valor
+
+
+@pytest.mark.asyncio
+async def test_materias_recorre_todas_las_paginas(test_app, materias):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        vistos = []
+        params = {"limit": 2, "include_total": True}
+        while True:
+            r = await client.get("/materias/", params=params)
+            assert r.status_code == 200
+            assert r.headers["X-Total-Count"] == "5"
+            vistos.extend(s["score_id"] for s in r.json())
+            cursor = r.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            params = {"limit": 2, "include_total": True, "cursor": cursor}
+        assert vistos == sorted(materias)
+
+
+@pytest.mark.asyncio
+async def test_limite_maximo(test_app):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/materias/", params={"limit": 100000})
+        assert r.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_usuarios_paginados_por_name_user(test_app, admin_token, test_student, test_professor):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        r = await client.get("/usuarios/", params={"limit": 2}, headers=headers)
+        assert r.status_code == 200
+        primera = [u["name_user"] for u in r.json()]
+        assert primera == ["admin_test", "prof_test"]
+
+        r = await client.get("/usuarios/", params={"limit": 2, "cursor": r.headers["X-Next-Cursor"]}, headers=headers)
+        assert [u["name_user"] for u in r.json()] == ["student_test"]
+        assert "X-Next-Cursor" not in r.headers
+
+
+@pytest.mark.asyncio
+async def test_estudiantes_de_materia_paginados(test_app, professor_token, test_professor, db):
+    score = models.Score(materia="Redes", professor_id=test_professor.user_id)
+    db.add(score)
+    alumnos = [
+        models.User(
+            name_complete=f"Alumno {i}", name_user=f"alumno{i}", cedula=f"2000000{i}",
+            email=f"alumno{i}@test.com", gender="male", role="student", hashed_password="x"
+        )
+        for i in range(3)
+    ]
+    db.add_all(alumnos)
+    db.commit()
+    for alumno in alumnos:
+        db.add(models.StudentScoreLink(student_id=alumno.user_id, score_id=score.score_id))
+    db.commit()
+
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {professor_token}"}
+        r = await client.get(f"/materias/{score.score_id}/estudiantes", params={"limit": 2}, headers=headers)
+        assert len(r.json()) == 2
+        r = await client.get(
+            f"/materias/{score.score_id}/estudiantes",
+            params={"limit": 2, "cursor": r.headers["X-Next-Cursor"]},
+            headers=headers
+        )
+        assert len(r.json()) == 1
+
+
+@pytest.mark.asyncio
+async def test_usuarios_conserva_limite_por_defecto(test_app, db, admin_token):
+    db.add_all([
+        models.User(name_complete=f"Usuario {i}", name_user=f"usuario{i:02d}", cedula=f"7000000{i:02d}",
+                    email=f"usuario{i}@test.com", gender="male", role="student", hashed_password="x")
+        for i in range(12)
+    ])
+    db.commit()
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        r = await client.get("/usuarios/", headers=headers)
+        assert len(r.json()) == 10 and "X-Next-Cursor" in r.headers
+        assert (await client.get("/usuarios/", params={"limit": 101}, headers=headers)).status_code == 422
+        assert (await client.get("/materias/", params={"limit": 101})).status_code == 200
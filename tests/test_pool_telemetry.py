@@ -0,0 +1,70 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import create_engine, text
+from app.config import ENGINE_PROFILES, Settings
+from app.db import TimedQueuePool
+from app.pool_telemetry import pool_telemetry
+
+
+def test_perfiles_y_sobreescrituras(monkeypatch):
+    monkeypatch.setenv("DB_PROFILE", "bench")
+    monkeypatch.setenv("DB_POOL_SIZE", "7")
+    opciones = Settings().engine_options()
+    assert opciones["pool_size"] == 7
+    assert opciones["max_overflow"] == ENGINE_PROFILES["bench"]["max_overflow"]
+    assert opciones["pool_pre_ping"] is False
+
+
+def test_perfil_por_defecto_conserva_el_pool_anterior(monkeypatch):
+    monkeypatch.delenv("DB_PROFILE", raising=False)
+    opciones = Settings().engine_options()
+    assert (opciones["pool_size"], opciones["max_overflow"], opciones["pool_timeout"]) == (10, 20, 30)
+
+
+def test_perfil_desconocido(monkeypatch):
+    monkeypatch.setenv("DB_PROFILE", "turbo")
+    with pytest.raises(ValueError):
+        Settings()
+
+
+def test_eventos_del_pool(tmp_path):
+    class PruebaPool(TimedQueuePool):
+        metrics_label = "prueba"
+
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=PruebaPool, pool_size=1, max_overflow=1
+    )
+    telemetry = pool_telemetry("prueba").attach(engine)
+
+    with engine.connect() as c1, engine.connect() as c2:
+        c1.execute(text("SELECT 1"))
+        c2.execute(text("SELECT 1"))
+
+    stats = telemetry.stats()
+    assert stats["events"]["checkout"] == 2
+    assert stats["events"]["checkin"] == 2
+    assert stats["events"]["connect"] == 2
+    assert stats["checkout_wait"]["count"] == 2
+    assert stats["hold"]["count"] == 2
+    assert stats["peak_checked_out"] == 2
+    assert stats["peak_overflow"] == 1
+    assert stats["overflow_checkouts"] == 1
+    assert stats["size"] == 1 and stats["checked_out"] == 0
+    engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_endpoint_pool_solo_admin(test_app, admin_token, student_token):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/sistema/pool", headers={"Authorization": f"Bearer {admin_token}"})
+        assert r.status_code == 200
+        data = r.json()
+        assert data["profile"] == "default"
+        primary = data["pools"]["primary"]
+        assert primary["pool_class"] == "TimedQueuePool"
+        assert primary["events"]["checkout"] >= 1
+        assert primary["checked_out"] >= 1  # la sesión de esta misma petición
+
+        r = await client.get("/sistema/pool", headers={"Authorization": f"Bearer {student_token}"})
+        assert r.status_code == 403
@@ -0,0 +1,103 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app import models
+from app.auth.auth import create_access_token, principal_cache
+from app.cache import TTLCache
+
+
+def test_ttl_cache_expira_y_descarta_lru():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # "b" es la menos usada
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    now[0] = 11
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_me_usa_cache_tras_primera_peticion(test_app, student_token, test_student):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {student_token}"}
+        r1 = await client.get("/usuarios/me", headers=headers)
+        r2 = await client.get("/usuarios/me", headers=headers)
+        assert r1.status_code == r2.status_code == 200
+        assert r1.json() == r2.json()
+
+    stats = principal_cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_update_invalida_cache(test_app, student_token, test_student):
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {student_token}"}
+        await client.get("/usuarios/me", headers=headers)
+        r = await client.patch(
+            f"/usuarios/{test_student.user_id}",
+            json={"name_complete": "Nombre Nuevo"},
+            headers=headers
+        )
+        assert r.status_code == 200
+
+        r = await client.get("/usuarios/me", headers=headers)
+        assert r.json()["name_complete"] == "Nombre Nuevo"
+
+
+@pytest.mark.asyncio
+async def test_delete_invalida_cache(test_app, admin_token, db):
+    student = models.User(
+        name_complete="Borrable",
+        name_user="borrable",
+        cedula="55555555",
+        email="borrable@test.com",
+        gender="female",
+        role="student",
+        hashed_password="hashed"
+    )
+    db.add(student)
+    db.commit()
+    db.refresh(student)
+
+    token = create_access_token({"sub": student.name_user, "role": student.role, "user_id": student.user_id})
+
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/usuarios/me", headers={"Authorization": f"Bearer {token}"})
+        assert r.status_code == 200
+
+        r = await client.delete(f"/usuarios/{student.user_id}", headers={"Authorization": f"Bearer {admin_token}"})
+        assert r.status_code == 204
+
+        r = await client.get("/usuarios/me", headers={"Authorization": f"Bearer {token}"})
+        assert r.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_sin_cache_de_principal_con_varios_workers(test_app, monkeypatch, db, student_token, test_student):
+    from app.config import settings
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 4)
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {student_token}"}
+        assert (await client.get("/usuarios/me", headers=headers)).status_code == 200
+
+        # Un cambio hecho por otro worker (aquí, directo en la base) se ve en la siguiente petición
+        test_student.name_complete = "Nombre Cambiado"
+        db.add(test_student)
+        db.commit()
+        r = await client.get("/usuarios/me", headers=headers)
+        assert r.json()["name_complete"] == "Nombre Cambiado"
+
+    stats = principal_cache.stats()
+    assert stats["size"] == 0 and stats["hits"] == 0
@@ -0,0 +1,48 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlmodel import SQLModel
+from app import models, schemas
+from app.projections import public_columns, select_public
+
+
+def test_select_public_omite_columnas_privadas():
+    sql = str(select_public(models.User, schemas.UserPublic))
+    assert "hashed_password" not in sql
+    assert [c.key for c in public_columns(models.User, schemas.UserPublic)] == list(schemas.UserPublic.model_fields)
+
+
+def test_esquema_con_campos_sin_columna():
+    class Extra(SQLModel):
+        score_id: int
+        promedio: float
+
+    with pytest.raises(ValueError, match="promedio"):
+        public_columns(models.Score, Extra)
+
+
+@pytest.mark.asyncio
+async def test_lecturas_proyectadas(test_app, db, test_student, test_professor, admin_token):
+    score = models.Score(materia="Química", professor_id=test_professor.user_id)
+    db.add(score)
+    db.commit()
+    cal = models.Calificacion(valor=80, tipo=models.CalificacionTipo.PARCIAL, student_id=test_student.user_id,
+                              score_id=score.score_id, professor_id=test_professor.user_id)
+    db.add(cal)
+    db.commit()
+
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        r = await client.get(f"/usuarios/{test_student.user_id}", headers=headers)
+        assert r.status_code == 200
+        assert r.json() == schemas.UserPublic.model_validate(test_student).model_dump(mode="json")
+
+        r = await client.get(f"/materias/{score.score_id}")
+        assert r.json()["materia"] == "Química"
+        r = await client.get(f"/calificaciones/{cal.calificacion_id}")
+        assert r.json()["valor"] == 80.0 and r.json()["tipo"] == "parcial"
+
+        assert (await client.get("/usuarios/9999", headers=headers)).status_code == 404
+        assert (await client.get("/materias/9999")).status_code == 404
+        assert (await client.get("/calificaciones/9999")).status_code == 404
+        assert (await client.get("/calificaciones/por_estudiante/9999", headers=headers)).status_code == 404
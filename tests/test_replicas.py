@@ -0,0 +1,69 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlmodel import Session, SQLModel
+from app import db as app_db, models
+from app.db import ReplicaRouter
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch, db):
+    """Segundo fichero SQLite que hace de réplica, con datos distintos del primario"""
+    router = ReplicaRouter([f"sqlite:///{tmp_path / 'replica.db'}"], retry_seconds=60)
+    engine = router.replicas[0].engine
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(models.Score(score_id=1, materia="Materia en réplica", professor_id=999))
+        session.commit()
+    monkeypatch.setattr(app_db, "replicas", router)
+    yield router
+    engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_lecturas_a_replica_escrituras_al_primario(test_app, replica, professor_token, test_professor):
+    transport = ASGITransport(app=test_app)
+    headers = {"Authorization": f"Bearer {professor_token}"}
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.post("/materias/", json={"materia": "Nueva", "professor_id": test_professor.user_id}, headers=headers)
+        assert r.status_code == 201
+
+        # El detalle se lee de la réplica, que no ve la escritura
+        r = await client.get("/materias/1")
+        assert r.json()["materia"] == "Materia en réplica"
+
+        # El listado lleva ETag: se lee del primario para no etiquetar datos viejos con la versión nueva
+        r = await client.get("/materias/")
+        assert [m["materia"] for m in r.json()] == ["Nueva"]
+
+        # El profesor sólo existe en el primario: la autenticación no va a la réplica
+        r = await client.get("/materias/1/estudiantes", headers=headers)
+        assert r.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_replica_caida_cae_al_primario(test_app, tmp_path, monkeypatch, db, test_professor):
+    score = models.Score(materia="Materia en primario", professor_id=test_professor.user_id)
+    db.add(score)
+    db.commit()
+    router = ReplicaRouter([f"sqlite:///{tmp_path / 'no-existe' / 'replica.db'}"], retry_seconds=60)
+    monkeypatch.setattr(app_db, "replicas", router)
+
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get(f"/materias/{score.score_id}")
+        assert r.status_code == 200
+        assert r.json()["materia"] == "Materia en primario"
+
+    estado, = router.stats()
+    assert estado["healthy"] is False and estado["failures"] == 1
+    # Mientras dure la penalización no se vuelve a elegir
+    assert router.pick() is None
+
+
+def test_round_robin(tmp_path):
+    router = ReplicaRouter([f"sqlite:///{tmp_path / f'r{i}.db'}" for i in range(2)], retry_seconds=60)
+    elegidas = [router.pick().label for _ in range(4)]
+    assert elegidas == ["replica-0", "replica-1", "replica-0", "replica-1"]
+
+    router.mark_down(router.replicas[0], RuntimeError("caída"))
+    assert {router.pick().label for _ in range(4)} == {"replica-1"}
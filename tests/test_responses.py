@@ -0,0 +1,50 @@
+import json
+from datetime import date
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app import models, schemas
+from app.responses import FastJSONResponse, model_response
+
+
+def test_model_response_filtra_campos_privados():
+    user = models.User(user_id=1, name_complete="Ana", name_user="ana", cedula="1234567", email="ana@x.com",
+                       gender="female", role="student", birth_date=date(2000, 1, 2), hashed_password="secreto",
+                       career="Sistemas")
+    r = model_response(schemas.UserPublic, [user])
+    assert r.media_type == "application/json"
+    fila, = json.loads(r.body)
+    assert fila == schemas.UserPublic.model_validate(user).model_dump(mode="json")
+    assert "hashed_password" not in fila
+
+
+def test_render_compacto_y_unicode():
+    assert FastJSONResponse({"materia": "Cálculo", "n": [1, 2.5, None]}).body == \
+        '{"materia":"Cálculo","n":[1,2.5,null]}'.encode()
+
+
+@pytest.mark.asyncio
+async def test_listas_conservan_cabeceras(test_app, db, test_professor, professor_token):
+    score = models.Score(materia="Física", professor_id=test_professor.user_id)
+    db.add(score)
+    db.commit()
+    db.add_all([
+        models.Calificacion(valor=10 * i, tipo=tipo, student_id=1, score_id=score.score_id,
+                            professor_id=test_professor.user_id)
+        for i, tipo in enumerate(list(models.CalificacionTipo)[:3])
+    ])
+    db.commit()
+
+    transport = ASGITransport(app=test_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {professor_token}"}
+        r = await client.get(f"/materias/{score.score_id}/calificaciones", params={"limit": 2}, headers=headers)
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "application/json"
+        assert "X-Next-Cursor" in r.headers and "ETag" in r.headers
+        assert [c["valor"] for c in r.json()] == [0.0, 10.0]
+        assert set(r.json()[0]) == set(schemas.CalificacionPublic.model_fields)
+
+        r = await client.get("/materias/")
+        assert r.json() == [{"materia": "Física", "description": None,
+                             "score_id": score.score_id, "professor_id": test_professor.user_id}]
@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import create_engine, func, select
+from app import models
+from benchmarks.bench_endpoints import parse_args as bench_args
+from seed import dataset_ids, parse_args, seed_database
+
+
+def _cargar(path, **kwargs):
+    engine = create_engine(f"sqlite:///{path}")
+    ids = seed_database(engine, students=40, materias=6, grades=500, seed=7, batch_size=64, **kwargs)
+    return engine, ids
+
+
+def test_seed_determinista(tmp_path):
+    def filas(engine):
+        with engine.connect() as conn:
+            return conn.execute(
+                select(models.Calificacion.student_id, models.Calificacion.score_id,
+                       models.Calificacion.tipo, models.Calificacion.valor, models.Calificacion.fecha)
+                .order_by(models.Calificacion.calificacion_id)
+            ).all()
+
+    a, ids = _cargar(tmp_path / "a.db")
+    b, _ = _cargar(tmp_path / "b.db")
+    try:
+        assert len(filas(a)) == 500 and ids["sizes"]["grades"] == 500
+        assert filas(a) == filas(b)
+        assert dataset_ids(a) == ids
+    finally:
+        a.dispose()
+        b.dispose()
+
+
+def test_seed_cubre_roles_y_tipos(tmp_path):
+    engine, ids = _cargar(tmp_path / "s.db", admins=2)
+    try:
+        with engine.connect() as conn:
+            roles = set(conn.execute(select(models.User.role).distinct()).scalars())
+            tipos = set(conn.execute(select(models.Calificacion.tipo).distinct()).scalars())
+            inscritos = conn.execute(select(func.count()).select_from(models.StudentScoreLink)).scalar()
+        assert roles == set(models.Role)
+        assert tipos == set(models.CalificacionTipo)
+        assert inscritos >= 40
+        assert ids["sizes"]["admins"] == 2 and ids["sizes"]["professors"] == 1
+        # La contraseña común verifica contra el hash compartido
+        with engine.connect() as conn:
+            hashed = conn.execute(select(models.User.hashed_password).limit(1)).scalar()
+        assert models.pwd_context.verify(ids["password"], hashed)
+    finally:
+        engine.dispose()
+
+
+def test_seed_no_sobrescribe_sin_reset(tmp_path):
+    engine, _ = _cargar(tmp_path / "s.db")
+    try:
+        with pytest.raises(RuntimeError):
+            seed_database(engine, students=5, materias=2, grades=10)
+        ids = seed_database(engine, students=5, materias=2, grades=10, reset=True)
+        assert ids["sizes"]["students"] == 5 and ids["sizes"]["grades"] == 10
+    finally:
+        engine.dispose()
+
+
+def test_tamanos_minimos(tmp_path):
+    with pytest.raises(SystemExit):
+        parse_args(["--students", "0"])
+    with pytest.raises(SystemExit):
+        bench_args(["--grades", "0"])
+    assert parse_args(["--students", "1"]).students == 1
+    for argumentos in (["--admins", "-1"], ["--professors", "0"], ["--professors", "-1"]):
+        with pytest.raises(SystemExit):
+            parse_args(argumentos)
+    assert parse_args(["--admins", "0"]).admins == 0
+
+    engine = create_engine(f"sqlite:///{tmp_path / 's.db'}")
+    try:
+        with pytest.raises(ValueError):
+            seed_database(engine, students=0, materias=2, grades=10)
+    finally:
+        engine.dispose()
+
+
+def test_seed_sin_administradores(tmp_path):
+    engine, ids = _cargar(tmp_path / "s.db", admins=0, professors=2)
+    try:
+        assert ids["admin_ids"] == [None, None]
+        assert ids["sizes"]["admins"] == 0 and ids["sizes"]["professors"] == 2
+        with pytest.raises(ValueError):
+            seed_database(engine, students=5, materias=2, grades=10, professors=-1, reset=True)
+    finally:
+        engine.dispose()
@@ -0,0 +1,114 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from app import models
+from app.auth.auth import create_access_token
+from app.auth.token_versions import REVOKED, TokenVersions, token_versions
+from app.config import settings
+from app.db import engine
+
+
+@pytest.fixture
+def stateless(monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_STATELESS", True)
+
+
+@pytest.fixture
+def consultas_usuario():
+    """Sentencias ejecutadas contra la tabla user durante el test"""
+    sentencias = []
+
+    def registrar(conn, cursor, statement, *args):
+        if 'FROM "user"' in statement or "FROM user" in statement:
+            sentencias.append(statement)
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    yield sentencias
+    event.remove(engine, "before_cursor_execute", registrar)
+
+
+def _client(app):
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_roles_sin_consultar_usuario(stateless, test_app, db, test_professor, professor_token, consultas_usuario):
+    score = models.Score(materia="Álgebra", professor_id=test_professor.user_id)
+    db.add(score)
+    db.commit()
+
+    async with _client(test_app) as client:
+        headers = {"Authorization": f"Bearer {professor_token}"}
+        r = await client.patch(f"/materias/{score.score_id}", json={"materia": "Álgebra I", "professor_id": test_professor.user_id},
+                               headers=headers)
+        assert r.status_code == 200
+        del consultas_usuario[:]  # la primera petición carga el mapa de versiones
+
+        r = await client.get(f"/materias/{score.score_id}/calificaciones", headers=headers)
+        assert r.status_code == 200
+        assert consultas_usuario == []
+
+        # El rol viene firmado en el token
+        r = await client.delete(f"/usuarios/{test_professor.user_id}", headers=headers)
+        assert r.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_cambio_de_contrasena_revoca_tokens(stateless, test_app, db):
+    user = models.User(name_complete="Ana", name_user="ana", cedula="12345678", email="ana@x.com",
+                       gender="female", role="student", career="Sistemas",
+                       hashed_password=models.pwd_context.hash("vieja"))
+    db.add(user)
+    db.commit()
+
+    async with _client(test_app) as client:
+        r = await client.post("/token", data={"username": "ana", "password": "vieja"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        r = await client.get("/usuarios/me", headers=headers)
+        assert r.status_code == 200 and r.json()["email"] == "ana@x.com"  # perfil completo
+
+        r = await client.patch(f"/usuarios/{user.user_id}", json={"password": "nueva"}, headers=headers)
+        assert r.status_code == 200
+        assert (await client.get("/usuarios/me", headers=headers)).status_code == 401
+
+        r = await client.post("/token", data={"username": "ana", "password": "nueva"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        assert (await client.get("/usuarios/me", headers=headers)).status_code == 200
+
+    # Sin modo sin estado también se compara la versión
+    settings.AUTH_STATELESS = False
+    viejo = create_access_token({"sub": "ana", "role": "student", "user_id": user.user_id})
+    async with _client(test_app) as client:
+        r = await client.get("/usuarios/me", headers={"Authorization": f"Bearer {viejo}"})
+        assert r.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_usuario_eliminado(stateless, test_app, student_token, test_student, admin_token):
+    async with _client(test_app) as client:
+        headers = {"Authorization": f"Bearer {student_token}"}
+        assert (await client.get(f"/usuarios/{test_student.user_id}", headers=headers)).status_code == 200
+        r = await client.delete(f"/usuarios/{test_student.user_id}", headers={"Authorization": f"Bearer {admin_token}"})
+        assert r.status_code == 204
+        assert (await client.get(f"/usuarios/{test_student.user_id}", headers=headers)).status_code == 401
+    assert await token_versions.current(test_student.user_id) == REVOKED
+
+
+@pytest.mark.asyncio
+async def test_recarga_periodica(db, test_student):
+    now = [0.0]
+    mapa = TokenVersions(refresh_seconds=30, clock=lambda: now[0])
+    assert await mapa.current(test_student.user_id) == 0
+    assert mapa.stats()["refreshes"] == 1
+
+    # Un cambio hecho por otro proceso llega en la siguiente recarga
+    test_student.token_version = 4
+    db.add(test_student)
+    db.commit()
+    assert await mapa.current(test_student.user_id) == 0
+    now[0] = 31
+    assert await mapa.current(test_student.user_id) == 4
+    assert await mapa.current(9999) == REVOKED
+    assert mapa.stats() | {"age_seconds": None} == {
+        "size": 2, "refresh_seconds": 30, "age_seconds": None, "refreshes": 2, "lookups": 1
+    }
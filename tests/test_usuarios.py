@@ -230,10 +230,12 @@ async def test_historial_dentro_de_usuarios(test_app, test_student, test_profess
         session.refresh(score)
         score_id = score.score_id  # 🔁 Ahora sí puedes usarlo
 
-        for val in [70, 80, 90]:
+        # Un tipo distinto por nota: (estudiante, materia, tipo) es único
+        tipos = [models.CalificacionTipo.QUIZ, models.CalificacionTipo.TAREA, models.CalificacionTipo.PARCIAL]
+        for val, tipo in zip([70, 80, 90], tipos):
             cal = models.Calificacion(
                 valor=val,
-                tipo=models.CalificacionTipo.QUIZ,
+                tipo=tipo,
                 fecha=date.today(),
                 student_id=test_student.user_id,
                 score_id=score_id,
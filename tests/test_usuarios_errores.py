@@ -124,3 +124,19 @@ async def test_list_users_no_admin_access(test_app):
     async with AsyncClient(transport=transport, base_url="http://test") as client:
         response = await client.get("/usuarios/", headers={"Authorization": f"Bearer {token}"})
         assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+async def test_crear_usuario_autenticado_solo_admin(test_app, admin_token, student_token):
+    payload = {
+        "name_complete": "Prof Nuevo", "name_user": "prof_nuevo", "cedula": "87654321",
+        "email": "nuevo@example.com", "gender": "female", "password": "pass123",
+        "role": "professor", "specialization": "Física",
+    }
+    transport = ASGITransport(app=test_app)
+    # Un usuario autenticado que no es admin recibe 403 en lugar de tratarse como anónimo
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.post("/usuarios/", json=payload, headers={"Authorization": f"Bearer {student_token}"})
+        assert r.status_code == 403
+        r = await client.post("/usuarios/", json=payload, headers={"Authorization": f"Bearer {admin_token}"})
+        assert r.status_code == 201